@@ -6,7 +6,6 @@ from collections import OrderedDict
 import re
 import importlib
 
-import yaml
 
 from ..core import pawstools
 from ..core import operations as ops
@@ -217,6 +216,16 @@ class PawsAPI(object):
             wfname = self._current_wf_name
         self.get_wf(wfname).set_wf_input(wf_input_name,val) 
 
+    def set_dtype_policy(self,policy,wfname=None):
+        """
+        Set the floating-point precision ('float64' or 'float32')
+        used by the image and integration Operations of a workflow,
+        or None to leave their dtypes unchanged.
+        """
+        if wfname is None:
+            wfname = self._current_wf_name
+        self.get_wf(wfname).set_dtype_policy(policy)
+
     def set_input(self,opname,input_name,val=None,tp=None,wfname=None):
         if wfname is None:
             wfname = self._current_wf_name
@@ -276,6 +285,27 @@ class PawsAPI(object):
         else:
             return op.outputs
 
+    def get_realtime_metrics(self,opname,wfname=None):
+        """
+        Return a dict of the live latency metrics 
+        of a realtime execution Operation (e.g. RealtimeFromFiles),
+        including latency percentiles for each processing stage
+        and the current queue depths.
+        This can be called from another thread while the Operation runs.
+        """
+        op = self.get_op(opname,wfname)
+        if getattr(op,'metrics',None) is None:
+            return None
+        return op.metrics.metrics_dict()
+
+    def image_cache_stats(self):
+        """
+        Return a dict of usage statistics (hits, misses, size)
+        for the process-wide cache of decoded images.
+        """
+        from ..core.tools.image.cache import image_cache
+        return image_cache.stats()
+
     def execute(self,wfname=None):
         if wfname is None:
             wfname = self._current_wf_name
@@ -304,20 +334,26 @@ class PawsAPI(object):
         Save the current workflows and plugins
         to a .wfl (YAML) file,
         specified by wfl_filename.
-        If the given filename does not have the .wfl extension,
+        If the given filename has the .json extension,
+        the state is instead saved as JSON,
+        with any array-valued inputs saved in a .npz file of the same name,
+        which is much faster to save and load for large arrays.
+        Otherwise, if the given filename does not have the .wfl extension,
         it will be appended.
         """
         self.logmethod( 'saving current state to {}'.format(wfl_filename) )
-        if not os.path.splitext(wfl_filename)[1] == '.wfl':
+        if not os.path.splitext(wfl_filename)[1] in ['.wfl','.json']:
             wfl_filename = wfl_filename + '.wfl'
         d = self.wfl_dict()
         #pawstools.update_file(wfl_filename,d)
         pawstools.save_file(wfl_filename,d)
 
     def load_from_wfl(self,wfl_filename):
-        f = open(wfl_filename,'r')
-        d = yaml.load(f)
-        f.close()
+        """
+        Load workflows and plugins from a file saved by save_to_wfl(),
+        either .wfl (YAML) or .json (with .npz arrays).
+        """
+        d = pawstools.load_file(wfl_filename)
         if 'PAWS_VERSION' in d.keys():
             wfl_version = d['PAWS_VERSION']
         else:
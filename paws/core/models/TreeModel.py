@@ -3,6 +3,7 @@ from collections import OrderedDict
 
 from .TreeItem import TreeItem
 from .DictTree import DictTree
+from ..tools.batch.store import BatchStore
 
 class TreeModel(object):
     """
@@ -143,6 +144,18 @@ class TreeModel(object):
             for k,v in d.items():
                 d[k] = self.build_tree(v)
             return d
+        elif isinstance(x,BatchStore):
+            # batch outputs are indexed like a list of dicts,
+            # built from the stored values, without copying them
+            d = OrderedDict()
+            for i in range(len(x)):
+                keys = x.item_keys(i)
+                if keys is None:
+                    d[str(i)] = None
+                else:
+                    d[str(i)] = OrderedDict([(k,self.build_tree(x.stored_value(i,k)))
+                        for k in keys])
+            return d
         else:
             return x
 
@@ -6,6 +6,8 @@ import copy
 from ...Operation import Operation
 from ... import Operation as opmod 
 from ... import optools
+from .... import pawstools
+from ....tools.batch.store import BatchStore
 
 inputs=OrderedDict(
     dir_path=None,
@@ -46,10 +48,10 @@ class BatchFromDirectory(Operation):
         batch_list = glob.glob(os.path.join(dirpath,rx))
         n_batch = len(batch_list)
         self.outputs['batch_inputs'] = [None for ib in range(n_batch)] 
-        self.outputs['batch_outputs'] = [None for ib in range(n_batch)] 
+        self.outputs['batch_outputs'] = BatchStore(n_batch,spill_dir=pawstools.paws_scratch_dir)
         if self.data_callback: 
             self.data_callback('outputs.batch_inputs',[None for ib in range(n_batch)])
-            self.data_callback('outputs.batch_outputs',[None for ib in range(n_batch)])
+            self.data_callback('outputs.batch_outputs',self.outputs['batch_outputs'])
         inps = self.inputs['extra_input_names']
         vals = self.inputs['extra_inputs']
         # Load any additional inputs...
@@ -4,6 +4,8 @@ import copy
 from ...Operation import Operation
 from ... import Operation as opmod 
 from ... import optools
+from .... import pawstools
+from ....tools.batch.store import BatchStore
 
 inputs=OrderedDict(
     file_list=None,
@@ -32,7 +34,8 @@ class BatchFromFiles(Operation):
         self.input_doc['extra_inputs'] = 'data items '\
             'to be set to batch workflow inputs indicated by extra_input_names'
         self.output_doc['batch_inputs'] = 'list of dicts of [input_name:input_value]'
-        self.output_doc['batch_outputs'] = 'list of dicts of [output_name:output_value] for all Workflow outputs'
+        self.output_doc['batch_outputs'] = 'list of dicts of [output_name:output_value] for all Workflow outputs, '\
+            'stored by column (see paws.core.tools.batch.store.BatchStore)'
         self.input_type['workflow'] = opmod.entire_workflow
         self.inputs['extra_input_names'] = []
         self.inputs['extra_inputs'] = []
@@ -43,10 +46,10 @@ class BatchFromFiles(Operation):
         wf = self.inputs['workflow'] 
         n_batch = len(batch_list)
         self.outputs['batch_inputs'] = [None for ib in range(n_batch)] 
-        self.outputs['batch_outputs'] = [None for ib in range(n_batch)] 
+        self.outputs['batch_outputs'] = BatchStore(n_batch,spill_dir=pawstools.paws_scratch_dir)
         if self.data_callback: 
             self.data_callback('outputs.batch_inputs',[None for ib in range(n_batch)])
-            self.data_callback('outputs.batch_outputs',[None for ib in range(n_batch)])
+            self.data_callback('outputs.batch_outputs',self.outputs['batch_outputs'])
         inps = self.inputs['extra_input_names']
         vals = self.inputs['extra_inputs']
         # Load any additional inputs...
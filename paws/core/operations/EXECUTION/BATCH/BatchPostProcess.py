@@ -5,6 +5,8 @@ import copy
 from ...Operation import Operation
 from ... import Operation as opmod 
 from ... import optools
+from .... import pawstools
+from ....tools.batch.store import BatchStore
 
 inputs=OrderedDict(
     batch_outputs=None,
@@ -29,7 +31,8 @@ class BatchPostProcess(Operation):
         self.input_doc['output_keys'] = 'list of keys for harvesting batch outputs'
         self.input_doc['input_keys'] = 'list of keys for setting workflow inputs, in corresponding order to output_keys'
         self.output_doc['batch_inputs'] = 'list of dicts of input_key:input_value for each of the input_keys'
-        self.output_doc['batch_outputs'] = 'list of dicts of workflow outputs'
+        self.output_doc['batch_outputs'] = 'list of dicts of workflow outputs, '\
+            'stored by column (see paws.core.tools.batch.store.BatchStore)'
         self.input_type['workflow'] = opmod.entire_workflow
         self.input_type['batch_outputs'] = opmod.workflow_item
         
@@ -40,10 +43,10 @@ class BatchPostProcess(Operation):
         wf = self.inputs['workflow']
         n_batch = len(b_out)
         self.outputs['batch_inputs'] = [None for ib in range(n_batch)] 
-        self.outputs['batch_outputs'] = [None for ib in range(n_batch)] 
+        self.outputs['batch_outputs'] = BatchStore(n_batch,spill_dir=pawstools.paws_scratch_dir)
         if self.data_callback: 
             self.data_callback('outputs.batch_inputs',[None for ib in range(n_batch)])
-            self.data_callback('outputs.batch_outputs',[None for ib in range(n_batch)])
+            self.data_callback('outputs.batch_outputs',self.outputs['batch_outputs'])
         self.message_callback('STARTING BATCH')
         for i,d_out in zip(range(n_batch),b_out):
             inp_dict = OrderedDict() 
@@ -1,8 +1,15 @@
 from collections import OrderedDict
+import os
+import time
+import tempfile
 
 from ...Operation import Operation
 from ... import Operation as opmod 
 from ... import optools
+from .... import pawstools
+from ....tools.realtime.ingest import WriteCompletionFilter, RealtimeIngest
+from ....tools.realtime.buffer import ResultRingBuffer
+from ....tools.realtime.metrics import LatencyMetrics
 
 inputs=OrderedDict(
     dir_path=None,
@@ -10,8 +17,21 @@ inputs=OrderedDict(
     workflow=None,
     input_name=None,
     new_files_only=True,
-    delay=1000)
-outputs=OrderedDict(realtime_inputs=None,realtime_outputs=None)
+    delay=1000,
+    settle_time=100,
+    header_ext=None,
+    max_pending_time=60000,
+    n_workers=1,
+    buffer_size=1000,
+    spill_path=None,
+    stat_keys=[],
+    metrics_path=None,
+    metrics_interval=10)
+outputs=OrderedDict(
+    realtime_inputs=None,
+    realtime_outputs=None,
+    realtime_stats=None,
+    realtime_metrics=None)
 
 class RealtimeFromFiles(Operation):
     """
@@ -31,49 +51,142 @@ class RealtimeFromFiles(Operation):
             'where the file paths will be used'
         self.input_doc['new_files_only'] = 'if true, '\
             'ignore existing files and only process new arrivals'
-        self.input_doc['delay'] = 'delay in milliseconds '\
-            'before searching again when new files were not found '\
-            'in the previous search'
+        self.input_doc['delay'] = 'time in milliseconds '\
+            'to wait for a new file before counting a delay- '\
+            'execution stops after 1000 consecutive delays'
+        self.input_doc['settle_time'] = 'time in milliseconds '\
+            'that a new file\'s size must hold steady '\
+            'before the file is considered completely written'
+        self.input_doc['header_ext'] = 'optional header file extension, '\
+            'e.g. .txt for SSRL beamline 1-5: if provided, '\
+            'a file is processed as soon as its header file appears, '\
+            'instead of waiting for its size to settle'
+        self.input_doc['max_pending_time'] = 'time in milliseconds '\
+            'after which a file that is still not completely written '\
+            '(e.g. still empty, or without its header file) is skipped- '\
+            'files deleted before they are complete are skipped immediately'
+        self.input_doc['n_workers'] = 'number of files '\
+            'to be processed in parallel, each by its own copy of the workflow- '\
+            'outputs are still collected in order of file arrival'
+        self.input_doc['buffer_size'] = 'number of most recent outputs '\
+            'to be kept in memory'
+        self.input_doc['spill_path'] = 'path to a file where older outputs are saved '\
+            'when they are removed from memory- if None, '\
+            'a new file is created in the paws scratch directory, '\
+            'and deleted when realtime_outputs is closed or garbage-collected'
+        self.input_doc['stat_keys'] = 'list of names of scalar workflow outputs '\
+            'for which running statistics (count, mean, std, min, max) are kept'
+        self.input_doc['metrics_path'] = 'optional path to a .csv or .json file '\
+            'where latency metrics are saved periodically'
+        self.input_doc['metrics_interval'] = 'time in seconds '\
+            'between saves of the latency metrics to metrics_path'
         self.output_doc['realtime_inputs'] = 'list of dicts '\
             'containing [input_name:input_value] '\
             'for each file path used as workflow input'
-        self.output_doc['realtime_outputs'] = 'list of dicts '\
+        self.output_doc['realtime_outputs'] = 'list-like buffer of dicts '\
             'containing [output_name:output_value] '\
-            'for all of the workflow.outputs'
+            'for all of the workflow.outputs- '\
+            'only the latest buffer_size dicts are held in memory'
+        self.output_doc['realtime_stats'] = 'dict of running statistics '\
+            'for each of the stat_keys'
+        self.output_doc['realtime_metrics'] = 'dict of latency percentiles '\
+            '(seconds) for each processing stage, and of queue depths- '\
+            'see paws.core.tools.realtime.metrics.LatencyMetrics'
+        # live metrics of the latest call to run()
+        self.metrics = None
         self.input_type['workflow'] = opmod.entire_workflow
         
     def run(self):
         """
-        This should create an iterator 
-        whose next() gives a {uri:value} dict 
-        built from the latest-arrived file 
+        Watch dir_path for new files matching regex,
+        and execute the workflow once for each arrival.
+        Arrivals are detected through optools.FileSystemIterator,
+        which is event-driven (inotify) where the platform allows it.
+        Files are held back until they are completely written,
+        then processed by n_workers copies of the workflow.
+        Execution stops after 1000 consecutive waits 
+        of `delay` milliseconds without a new file.
         """
         dirpath = self.inputs['dir_path']
         rx = self.inputs['regex']
         wf = self.inputs['workflow'] 
         inpnm = self.inputs['input_name']
-        dly = self.inputs['delay']
+        dly = float(self.inputs['delay'])/1000.
         process_existing_files = not self.inputs['new_files_only']
         it = optools.FileSystemIterator(dirpath,rx,process_existing_files) 
+        max_pending = self.inputs['max_pending_time']
+        if max_pending is not None:
+            max_pending = float(max_pending)/1000.
+        rdy = WriteCompletionFilter(float(self.inputs['settle_time'])/1000.,
+            self.inputs['header_ext'],max_pending)
+        self.metrics = LatencyMetrics()
+        ingest = RealtimeIngest(wf,inpnm,self.inputs['n_workers'],self.metrics)
+        metrics_path = self.inputs['metrics_path']
+        t_dump = time.time()
+        t_detect = {}
         self.outputs['realtime_inputs'] = it
-        self.outputs['realtime_outputs'] = [] 
-        nx = 0 # total number of executions
+        spill_path = self.inputs['spill_path']
+        delete_spill = spill_path is None
+        if spill_path is None:
+            fd,spill_path = tempfile.mkstemp(prefix='realtime_outputs_',
+                suffix='.pkl',dir=pawstools.paws_scratch_dir)
+            os.close(fd)
+        rb = ResultRingBuffer(self.inputs['buffer_size'],spill_path,
+            self.inputs['stat_keys'],delete_spill)
+        self.outputs['realtime_outputs'] = rb
         nd = 0 # number of consecutive delays
+        n_dropped = 0 # number of files skipped before they were complete
         keep_going = True
+        self.message_callback('STARTING REALTIME EXECUTION')
         while keep_going:
-            p = it.next()
-            if p is None:
-                # delay
-                time.sleep(float(dly)/1000.) 
+            busy = rdy.n_pending() > 0 or ingest.n_in_flight() > 0
+            # block for up to dly seconds waiting for a new file,
+            # or only briefly if files are waiting or being processed.
+            # While results are on the way, wait on those instead.
+            res = []
+            if ingest.n_in_flight() > 0 and rdy.n_pending() == 0:
+                res = ingest.collect(0.01)
+                p = it.next()
+            else:
+                p = it.next(0.01 if busy else dly)
+            while p is not None:
+                t_detect[p] = time.time()
+                rdy.add(p)
+                p = it.next()
+            for p in rdy.pop_ready():
+                ts = OrderedDict([('detected',t_detect.pop(p)),('ready',time.time())])
+                idx = ingest.submit(p,ts)
+                self.message_callback('REALTIME RUN {}: {}'.format(idx,p))
+            for p,reason in rdy.pop_dropped():
+                t_detect.pop(p,None)
+                n_dropped += 1
+                self.message_callback('REALTIME SKIPPED {}: {}'.format(p,reason))
+            res.extend(ingest.collect())
+            for inp_dict,out_dict in res:
+                rb.append(out_dict)
+            self.metrics.set_gauge('waiting_for_write',rdy.n_pending())
+            self.metrics.set_gauge('skipped',n_dropped)
+            self.metrics.set_gauge('waiting_for_worker',ingest.n_queued())
+            self.metrics.set_gauge('in_flight',ingest.n_in_flight())
+            if res:
+                self.outputs['realtime_stats'] = rb.stats_dict()
+                self.outputs['realtime_metrics'] = self.metrics.metrics_dict()
+            if metrics_path and time.time() - t_dump > self.inputs['metrics_interval']:
+                self.metrics.dump(metrics_path)
+                t_dump = time.time()
+            if busy or rdy.n_pending() > 0:
+                nd = 0
+            else:
                 nd+=1
                 if nd == 1000:
                     keep_going = False 
-            else:
-                nd = 0
-                wf.set_wf_input(inpname,filename)
-                nx+=1
-                wf.execute()
-                self.outputs['realtime_outputs'].append(wf.wf_outputs_dict())
-                
-
+        ingest.close()
+        for inp_dict,out_dict in ingest.collect():
+            rb.append(out_dict)
+        self.outputs['realtime_stats'] = rb.stats_dict()
+        self.outputs['realtime_metrics'] = self.metrics.metrics_dict()
+        if metrics_path:
+            self.metrics.dump(metrics_path)
+        it.watcher.close()
+        self.message_callback('REALTIME EXECUTION FINISHED')
 
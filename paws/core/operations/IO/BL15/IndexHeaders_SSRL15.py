@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from ... import Operation as opmod
+from ...Operation import Operation
+from ....tools.bl15.headers import HeaderIndex
+
+inputs=OrderedDict(dir_path=None,regex='*.txt',db_path=None,series_key=None)
+outputs=OrderedDict(header_index=None,n_indexed=None,time_series=None)
+
+class IndexHeaders_SSRL15(Operation):
+    """
+    Index the .txt headers from beamline 1-5 at SSRL in a directory.
+
+    All header entries are stored in an indexed SQLite table
+    (see paws.core.tools.bl15.headers.HeaderIndex),
+    with the header time converted to seconds since the epoch,
+    so that headers can be looked up by time, temperature, or filename
+    without re-reading the header files.
+    If db_path is provided, the index is saved there,
+    and later runs only read the headers that are new or modified.
+    """
+
+    def __init__(self):
+        super(IndexHeaders_SSRL15, self).__init__(inputs, outputs)
+        self.input_doc['dir_path'] = 'path to a directory of .txt header files '\
+            'produced by beamline 1-5 at SSRL'
+        self.input_doc['regex'] = 'pattern for the header file names'
+        self.input_doc['db_path'] = 'optional path to an SQLite file for the index- '\
+            'if None, the index is kept in memory'
+        self.input_doc['series_key'] = 'optional header key '\
+            'to be returned as a time series'
+        self.output_doc['header_index'] = 'HeaderIndex object '\
+            'for looking up headers by time, key value, or filename'
+        self.output_doc['n_indexed'] = 'number of header files '\
+            'that were read by this run'
+        self.output_doc['time_series'] = 'n-by-2 array of time (seconds since epoch) '\
+            'and the value of series_key, for all indexed headers, sorted by time'
+
+    def run(self):
+        dir_path = self.inputs['dir_path']
+        db_path = self.inputs['db_path']
+        if db_path is None:
+            db_path = ':memory:'
+        idx = HeaderIndex(db_path)
+        self.outputs['n_indexed'] = idx.update(dir_path,self.inputs['regex'])
+        self.outputs['header_index'] = idx
+        k = self.inputs['series_key']
+        if k is not None:
+            ts = idx.time_series(k)
+            self.outputs['time_series'] = np.array(
+                [(t,v) for t,v,p in ts],dtype=float).reshape(-1,2)
@@ -3,6 +3,7 @@ from os.path import splitext, split
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.bl15.headers import parse_header
 
 inputs=OrderedDict(file_path=None)
 outputs=OrderedDict(header_dict=None,filename=None)
@@ -23,25 +24,5 @@ class ReadHeader_SSRL15(Operation):
         filename = split(file_path)[1]
         filename_noext = splitext(filename)[0]
         self.outputs['filename'] = filename_noext 
-        d = OrderedDict()
-        for l in open(file_path,'r').readlines():
-            try:
-                if not l.strip() == '' and not l.strip()[0] == '#':
-                    kvs = l.split(',')
-                    # special case for the string headers on line 1
-                    if not kvs[0].find('User') == -1:
-                        u_str = kvs[0].split('User:')[1].strip()
-                        t_str = kvs[1].split('time:')[1].strip()
-                        d['User'] = u_str
-                        d['time'] = t_str
-                    # and filter out the redundant temperature line
-                    elif not (len(kvs)==1 and kvs[0].strip()[-1]=='C'):
-                        for kv in kvs:
-                            kv_arr = kv.split('=')
-                            d[kv_arr[0].strip()] = float(kv_arr[1].strip())
-                self.outputs['header_dict'] = d
-            except Exception as e:
-                d['ERROR'] = e.message
-                self.outputs['header_dict'] = d
-                raise e
+        self.outputs['header_dict'] = parse_header(file_path)
 
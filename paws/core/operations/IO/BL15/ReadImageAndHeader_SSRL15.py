@@ -5,8 +5,10 @@ import tifffile
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.image.cache import image_cache
+from ....tools.bl15.headers import parse_header
 
-inputs=OrderedDict(file_path=None)
+inputs=OrderedDict(file_path=None,use_cache=False)
 outputs=OrderedDict(
     image_data=None,
     image_header=None,
@@ -25,6 +27,12 @@ class ReadImageAndHeader_SSRL15(Operation):
             'produced by beamline 1-5 at SSRL. '\
             'A .txt header file is expected '\
             'in the same directory as this .tif file.'
+        self.input_doc['use_cache'] = 'if True, the decoded image is kept in '\
+            'the process-wide image cache, and re-used as long as the file is unchanged- '\
+            'image_data is a copy of the cached image, so it can be modified. '\
+            'Off by default, so that batch and realtime reads of many distinct files '\
+            'do not fill the cache- enable it for interactive use, '\
+            'where the same images are read again'
         self.output_doc['image_data'] = 'the image pixel data as an ndarray'
         self.output_doc['image_header'] = 'the header file as a python dictionary'
         self.output_doc['dir_path'] = 'the directory portion of the input file_path'
@@ -38,26 +46,9 @@ class ReadImageAndHeader_SSRL15(Operation):
         hdr_file_path = path_noext + '.txt'
         self.outputs['dir_path'] = dirpath 
         self.outputs['filename'] = filename_noext 
-        self.outputs['image_data'] = tifffile.imread(tif_path)
-        d = OrderedDict()
-        for l in open(hdr_file_path,'r').readlines():
-            try:
-                if not l.strip() == '' and not l.strip()[0] == '#':
-                    kvs = l.split(',')
-                    # special case for the string headers on line 1
-                    if not kvs[0].find('User') == -1:
-                        u_str = kvs[0].split('User:')[1].strip()
-                        t_str = kvs[1].split('time:')[1].strip()
-                        d['User'] = u_str
-                        d['time'] = t_str
-                    # and filter out the redundant temperature line
-                    elif not (len(kvs)==1 and kvs[0].strip()[-1]=='C'):
-                        for kv in kvs:
-                            kv_arr = kv.split('=')
-                            d[kv_arr[0].strip()] = float(kv_arr[1].strip())
-                self.outputs['image_header'] = d
-            except Exception as e:
-                d['ERROR'] = e.message
-                self.outputs['image_header'] = d
-                raise e
+        if self.inputs['use_cache']:
+            self.outputs['image_data'] = image_cache.load(tif_path,tifffile.imread,copy=True)
+        else:
+            self.outputs['image_data'] = tifffile.imread(tif_path)
+        self.outputs['image_header'] = parse_header(hdr_file_path)
 
@@ -0,0 +1,30 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from ... import Operation as opmod 
+from ...Operation import Operation
+from ....tools.textio.csvread import read_csv_files
+
+inputs=OrderedDict(file_list=None,n_workers=4)
+outputs=OrderedDict(array=None)
+
+class CSVFilesToArray(Operation):
+    """
+    Read a list of csv-formatted files of the same shape
+    (e.g. a set of saved spectra) into one stacked numpy array.
+    The files are read in parallel.
+    """
+
+    def __init__(self):
+        super(CSVFilesToArray, self).__init__(inputs, outputs)
+        self.input_doc['file_list'] = 'list of paths to .csv files, '\
+            'all containing arrays of the same shape'
+        self.input_doc['n_workers'] = 'number of files to read in parallel'
+        self.output_doc['array'] = 'numpy array of shape (n_files,)+file_shape, '\
+            'where array[i] holds the contents of file_list[i]'
+
+    def run(self):
+        self.outputs['array'] = read_csv_files(
+            self.inputs['file_list'],self.inputs['n_workers'])
+
@@ -4,6 +4,7 @@ import numpy as np
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.textio.csvread import read_csv
 
 inputs=OrderedDict(file_path=None)
 outputs=OrderedDict(array=None)
@@ -20,6 +21,6 @@ class CSVToArray(Operation):
 
     def run(self):
         p = self.inputs['file_path']
-        self.outputs['array'] = np.loadtxt(p, dtype=float, delimiter=',')
+        self.outputs['array'] = read_csv(p,ndmin=0)
 
 
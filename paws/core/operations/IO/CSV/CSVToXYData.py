@@ -4,6 +4,7 @@ import numpy as np
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.textio.csvread import read_csv
         
 inputs=OrderedDict(file_path=None)
 outputs=OrderedDict(x=None,y=None,x_y=None)
@@ -23,8 +24,10 @@ class CSVToXYData(Operation):
 
     def run(self):
         p = self.inputs['file_path']
-        x = np.loadtxt(p, dtype=float, delimiter=',', usecols=[0])
-        y = np.loadtxt(p, dtype=float, delimiter=',', usecols=[1])
+        # parse the file once, then take the first two columns
+        a = read_csv(p)
+        x = np.array(a[:,0])
+        y = np.array(a[:,1])
         self.outputs['x'] = x
         self.outputs['y'] = y
         x_y = np.array([x,y]).T
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+
+from ... import Operation as opmod
+from ...Operation import Operation
+from ....tools.hdf5.appender import open_appender
+
+inputs=OrderedDict(
+    data=None,
+    data_name='data',
+    file_path=None,
+    group='entry',
+    chunk_size=16,
+    compression='gzip',
+    flush_interval=5.)
+outputs=OrderedDict(file_path=None,index=None)
+
+class AppendToHDF5(Operation):
+    """
+    Append data to chunked, compressed, resizable datasets in an HDF5 file.
+
+    Intended for use inside a batch or realtime workflow:
+    each execution appends one row to every dataset,
+    so that all results of the batch end up in a single file,
+    instead of one file per result.
+    If the data is a dict (e.g. Operation outputs or fit parameters),
+    each entry is written to a dataset of the same name.
+    The file is kept open and flushed to disk every flush_interval seconds,
+    and is shared by all Operations that write to the same file_path.
+    See paws.core.tools.hdf5.appender.
+    """
+
+    def __init__(self):
+        super(AppendToHDF5,self).__init__(inputs,outputs)
+        self.input_doc['data'] = 'array, scalar, or dict of arrays and scalars '\
+            'to be appended as the next row of the datasets'
+        self.input_doc['data_name'] = 'name of the dataset, if data is not a dict'
+        self.input_doc['file_path'] = 'path to the .h5 file- '\
+            'an existing file is appended to'
+        self.input_doc['group'] = 'name of the group (NeXus NXentry) '\
+            'that holds the datasets'
+        self.input_doc['chunk_size'] = 'maximum number of rows per chunk- '\
+            'chunks are also limited to about 1 MB, '\
+            'so large items such as images are chunked one row at a time'
+        self.input_doc['compression'] = 'HDF5 compression filter: gzip, lzf, or None'
+        self.input_doc['flush_interval'] = 'time in seconds '\
+            'between flushes of the file to disk'
+        self.output_doc['file_path'] = 'path to the .h5 file'
+        self.output_doc['index'] = 'row index of the appended data'
+        self.input_type['data'] = opmod.workflow_item
+
+    def run(self):
+        d = self.inputs['data']
+        if not isinstance(d,dict):
+            d = OrderedDict([(self.inputs['data_name'],d)])
+        app = open_appender(self.inputs['file_path'],
+            chunk_rows=self.inputs['chunk_size'],
+            compression=self.inputs['compression'],
+            flush_interval=float(self.inputs['flush_interval']))
+        self.outputs['file_path'] = app.file_path
+        self.outputs['index'] = app.append(d,self.inputs['group'])
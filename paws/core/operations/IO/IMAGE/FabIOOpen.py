@@ -5,14 +5,19 @@ import fabio
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.image import memmap
+from ....tools.image.cache import image_cache
 
-inputs=OrderedDict(file_path=None)
+inputs=OrderedDict(file_path=None,mmap=False,use_cache=False)
 outputs=OrderedDict(
     image_data=None,
     FabioImage=None,
     dir_path=None,
     filename=None)
 
+def fabio_read(file_path):
+    return fabio.open(file_path).data
+
 class FabIOOpen(Operation):
     """
     Takes a filesystem path and calls fabIO to load it. 
@@ -21,6 +26,16 @@ class FabIOOpen(Operation):
     def __init__(self):
         super(FabIOOpen,self).__init__(inputs,outputs) 
         self.input_doc['file_path'] = 'string representing the path to a .tif image'
+        self.input_doc['mmap'] = 'if True, and if the image is an uncompressed .tif or .edf, '\
+            'image_data is a read-only memory-mapped array, '\
+            'whose pixels are read from disk only when they are accessed, '\
+            'and FabioImage is not produced'
+        self.input_doc['use_cache'] = 'if True, the decoded image is kept in '\
+            'the process-wide image cache, and re-used as long as the file is unchanged- '\
+            'image_data is a copy of the cached image, so it can be modified. '\
+            'Off by default, so that batch and realtime reads of many distinct files '\
+            'do not fill the cache- enable it for interactive use, '\
+            'where the same images are read again'
         self.output_doc['image_data'] = '2D array representing pixel values taken from the input file'
         self.output_doc['FabioImage'] = 'The object generated by fabio.open()'
         self.output_doc['dir_path'] = 'Path to the directory the image came from'
@@ -33,5 +48,13 @@ class FabIOOpen(Operation):
         file_noext = os.path.splitext(file_nopath)[0]
         self.outputs['dir_path'] = dir_path 
         self.outputs['filename'] = file_noext 
-        self.outputs['image_data'] = fabio.open(p).data
+        img = None
+        if self.inputs['mmap']:
+            img = memmap.memmap_image(p)
+        if img is None:
+            if self.inputs['use_cache']:
+                img = image_cache.load(p,fabio_read,copy=True)
+            else:
+                img = fabio_read(p)
+        self.outputs['image_data'] = img
 
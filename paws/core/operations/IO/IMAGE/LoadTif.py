@@ -6,8 +6,10 @@ import numpy as np
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.image import memmap
+from ....tools.image.cache import image_cache
 
-inputs=OrderedDict(file_path=None)
+inputs=OrderedDict(file_path=None,mmap=False,use_cache=False)
 outputs=OrderedDict(image_data=None,dir_path=None,filename=None)
 
 class LoadTif(Operation):
@@ -19,6 +21,15 @@ class LoadTif(Operation):
     def __init__(self):
         super(LoadTif,self).__init__(inputs,outputs)
         self.input_doc['file_path'] = 'path to a .tif image'
+        self.input_doc['mmap'] = 'if True, and if the image is uncompressed, '\
+            'image_data is a read-only memory-mapped array, '\
+            'whose pixels are read from disk only when they are accessed'
+        self.input_doc['use_cache'] = 'if True, the decoded image is kept in '\
+            'the process-wide image cache, and re-used as long as the file is unchanged- '\
+            'image_data is a copy of the cached image, so it can be modified. '\
+            'Off by default, so that batch and realtime reads of many distinct files '\
+            'do not fill the cache- enable it for interactive use, '\
+            'where the same images are read again'
         self.output_doc['image_data'] = '2D array representing pixel values'
         self.output_doc['filename'] = 'Filename for image, path and extension stripped'
         
@@ -29,5 +40,13 @@ class LoadTif(Operation):
         file_noext = os.path.splitext(file_nopath)[0]
         self.outputs['dir_path'] = dir_path 
         self.outputs['filename'] = file_noext 
-        self.outputs['image_data'] = tifffile.imread(p)
+        img = None
+        if self.inputs['mmap']:
+            img = memmap.memmap_tif(p)
+        if img is None:
+            if self.inputs['use_cache']:
+                img = image_cache.load(p,tifffile.imread,copy=True)
+            else:
+                img = tifffile.imread(p)
+        self.outputs['image_data'] = img
 
@@ -0,0 +1,39 @@
+from collections import OrderedDict
+
+from ... import Operation as opmod 
+from ...Operation import Operation
+from ....tools.pif.bulk import PifJSONLWriter
+
+inputs=OrderedDict(pif=None,file_path=None,compress=False,append=True)
+outputs=OrderedDict(file_path=None,n_records=None)
+        
+class SavePIFAsJSONL(Operation):
+    """
+    Save one or more PIF records to a JSON-lines file,
+    one record per line, optionally gzip-compressed.
+    With append=True, records from repeated (e.g. batch or realtime) executions
+    are streamed to the same file.
+    """
+
+    def __init__(self):
+        super(SavePIFAsJSONL,self).__init__(inputs,outputs)
+        self.input_doc['pif'] = 'A pypif.obj.System object or a list thereof'
+        self.input_doc['file_path'] = 'Path to the .jsonl file- '\
+            'for a compressed file, .gz is appended if not provided'
+        self.input_doc['compress'] = 'if True, the file is gzip-compressed'
+        self.input_doc['append'] = 'if True, records are appended to the file, '\
+            'otherwise the file is overwritten'
+        self.output_doc['file_path'] = 'Full path to the .jsonl file'
+        self.output_doc['n_records'] = 'number of records written'
+        self.input_type['pif'] = opmod.workflow_item
+
+    def run(self):
+        p = self.inputs['file_path']
+        cmp = bool(self.inputs['compress'])
+        if cmp and not p.endswith('.gz'):
+            p = p+'.gz'
+        self.outputs['file_path'] = p
+        with PifJSONLWriter(p,cmp,bool(self.inputs['append'])) as w:
+            w.write(self.inputs['pif'])
+            self.outputs['n_records'] = w.n_written
+
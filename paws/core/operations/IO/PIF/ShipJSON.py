@@ -1,14 +1,18 @@
 from collections import OrderedDict
 
+from pypif import pif
+
 from ... import Operation as opmod 
 from ...Operation import Operation
 
-inputs=OrderedDict(json_path=None,client=None,dsid=None,ship_flag=False)
+inputs=OrderedDict(json_path=None,client=None,dsid=None,ship_flag=False,upload_queue=None)
 outputs=OrderedDict(response=None)
 
 class ShipJSON(Operation):
     """
     Take a .json file containing a pif or array of pifs, ship it to a Citrination data set.    
+    If an upload_queue is provided, the pif(s) are queued
+    for upload in the background.
     """
 
     def __init__(self):
@@ -17,9 +21,12 @@ class ShipJSON(Operation):
         self.input_doc['client'] = 'A working Citrination client' 
         self.input_doc['dsid'] = 'Data set ID where the pif will be stored on Citrination' 
         self.input_doc['ship_flag'] = 'Flag for actually shipping the pif' 
+        self.input_doc['upload_queue'] = 'Upload queue of a CitrinationPlugin- '\
+            'if provided, the pif(s) are uploaded in the background'
         self.output_doc['response'] = 'The Citrination server response to the shipment'
         self.input_type['client'] = opmod.plugin_item
         self.input_type['dsid'] = opmod.workflow_item
+        self.input_type['upload_queue'] = opmod.plugin_item
 
     def run(self):
         json_path = self.inputs['json_path']
@@ -27,11 +34,16 @@ class ShipJSON(Operation):
         dsid = self.inputs['dsid'] 
         ship_flag = self.inputs['ship_flag']
         try:
-            if ship_flag:
+            if ship_flag and self.inputs['upload_queue'] is not None:
+                p = pif.load(open(json_path,'r'))
+                self.inputs['upload_queue'].put(p,dsid)
+                n = len(p) if isinstance(p,list) else 1
+                r = 'queued {} record(s) for upload to data set {}'.format(n,dsid)
+            elif ship_flag:
                 r = cl.upload_file(json_path,data_set_id = dsid)
             else:
                 r = 'dry run: no shipment occurred. json path: {}'.format(json_path)
         except Exception as ex:
-            r = 'An error occurred while shipping. Error message: {}'.format(ex.message)
+            r = 'An error occurred while shipping. Error message: {}'.format(ex)
         self.outputs['response'] = r
 
@@ -14,12 +14,16 @@ inputs=OrderedDict(
     json_dirpath=None,
     json_filename=None,
     keep_json=False,
-    ship_flag=False)
+    ship_flag=False,
+    upload_queue=None)
 outputs=OrderedDict(response=None)
         
 class ShipToDataSet(Operation):
     """
     Take a pypif.obj.System object and ship it to a given Citrination data set.    
+    If an upload_queue is provided, the pif(s) are queued
+    for upload in the background, and no json file is written
+    unless keep_json is set.
     """
 
     def __init__(self):
@@ -31,9 +35,12 @@ class ShipToDataSet(Operation):
         self.input_doc['json_filename'] = 'Name of the .json file where the pif(s) will be saved' 
         self.input_doc['keep_json'] = 'Flag for whether or not to keep the json file' 
         self.input_doc['ship_flag'] = 'Flag for shipping the pif- set to False for a dry run' 
+        self.input_doc['upload_queue'] = 'Upload queue of a CitrinationPlugin- '\
+            'if provided, the pif(s) are uploaded in the background'
         self.output_doc['response'] = 'The Citrination server response to the shipment'
         self.input_type['pif'] = opmod.workflow_item
         self.input_type['client'] = opmod.plugin_item
+        self.input_type['upload_queue'] = opmod.plugin_item
 
     def run(self):
         cl = self.inputs['client'] 
@@ -41,12 +48,24 @@ class ShipToDataSet(Operation):
         p = self.inputs['pif']        
         json_dir = self.inputs['json_dirpath']
         json_file = self.inputs['json_filename']
-        if not os.path.splitext(json_file)[1] == 'json':
-            json_file = json_file+'.json'
-        json_file = os.path.join(json_dir,json_file)
-
         json_flag = self.inputs['keep_json']
         ship_flag = self.inputs['ship_flag']
+        q = self.inputs['upload_queue']
+        if json_flag or q is None:
+            if not os.path.splitext(json_file)[1] == 'json':
+                json_file = json_file+'.json'
+            json_file = os.path.join(json_dir,json_file)
+        if q is not None:
+            if json_flag:
+                pif.dump(p, open(json_file,'w'))
+            if ship_flag:
+                q.put(p,dsid)
+                n = len(p) if isinstance(p,(list,tuple)) else 1
+                r = 'queued {} record(s) for upload to data set {}'.format(n,dsid)
+            else:
+                r = 'dry run: no shipment occurred. pif object: {}'.format(pif.dumps(p))
+            self.outputs['response'] = r
+            return
         try:
             # make p an array of pifs to get a big json that has all records
             pif.dump(p, open(json_file,'w'))
@@ -57,7 +76,6 @@ class ShipToDataSet(Operation):
             if not json_flag:
                 os.remove(json_file) 
         except Exception as ex:
-            r = 'An error occurred while shipping. Error message: {}'.format(ex.message)
+            r = 'An error occurred while shipping. Error message: {}'.format(ex)
         self.outputs['response'] = r
 
-
@@ -2,9 +2,9 @@ from collections import OrderedDict
 
 import numpy as np
 
-import yaml
 from ... import Operation as opmod 
 from ...Operation import Operation
+from .... import pawstools
 
 inputs=OrderedDict(file_path=None)
 outputs=OrderedDict(yaml_output=None)
@@ -22,7 +22,7 @@ class LoadYAML(Operation):
     def run(self):
         p = self.inputs['file_path']
         f = open(p,'r')
-        ds = yaml.load(f)
+        ds = pawstools.yaml_load(f)
         f.close()
         self.outputs['yaml_output'] = ds 
 
@@ -52,6 +52,9 @@ class Operation(object):
             self.input_type[name] = basic_type 
         self.message_callback = print
         self.data_callback = None 
+        # floating-point precision policy (None, 'float64' or 'float32'),
+        # set by the Workflow (see paws.core.tools.image.precision)
+        self.dtype_policy = None
     
     def __getitem__(self,key):
         if key == 'inputs':
@@ -103,6 +106,7 @@ class Operation(object):
         """
         new_op = self.clone()
         new_op.load_defaults()
+        new_op.dtype_policy = self.dtype_policy
         for nm,il in self.input_locator.items():
             new_il = InputLocator()
             new_il.tp = copy.copy(il.tp)
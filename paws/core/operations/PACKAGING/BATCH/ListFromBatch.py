@@ -5,6 +5,7 @@ import numpy as np
 from ... import Operation as opmod 
 from ...Operation import Operation
 from ... import optools
+from ....tools.batch.store import batch_column
 
 inputs=OrderedDict(batch_outputs=None,output_key=None)
 outputs=OrderedDict(data_list=None)
@@ -26,5 +27,8 @@ class ListFromBatch(Operation):
     def run(self):
         b_out = self.inputs['batch_outputs']
         k = self.inputs['output_key']
-        self.outputs['data_list'] = [d[k] for d in b_out]
+        vals,present = batch_column(b_out,k)
+        if not all(present):
+            raise KeyError('[{}] output {} is missing from some batch items'.format(__name__,k))
+        self.outputs['data_list'] = list(vals)
 
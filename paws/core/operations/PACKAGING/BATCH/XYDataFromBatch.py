@@ -5,6 +5,7 @@ import numpy as np
 from ... import Operation as opmod 
 from ...Operation import Operation
 from ... import optools
+from ....tools.batch.store import batch_column
        
 inputs = OrderedDict(batch_outputs=None,x_key=None,y_key=None,x_shift_flag=False) 
 outputs = OrderedDict(x=None,y=None,x_y=None,x_y_sorted=None) 
@@ -33,19 +34,19 @@ class XYDataFromBatch(Operation):
         ky = self.inputs['y_key']
         #x_all = np.array([optools.get_uri_from_dict(kx,d) for d in b_out],dtype=float)
         #y_all = np.array([optools.get_uri_from_dict(ky,d) for d in b_out],dtype=float)
-        x_list = []
-        y_list = []
-        for d in b_out:
-            if kx in d and ky in d:
-                x_list.append(d[kx])
-                y_list.append(d[ky])
-        #x_list = [d[kx] if kx in d and ky in d for d in b_out]
-        #y_list = [d[ky] if kx in d and ky in d for d in b_out]
-        #y_0 = b_out[0][kx]
-        #x_0 = b_out[0][ky]
-        x_all = np.array(x_list)
-        y_all = np.array(y_list)
-        x_len = len(x_list)
+        x_vals,x_present = batch_column(b_out,kx)
+        y_vals,y_present = batch_column(b_out,ky)
+        # keep the batch items that have both x and y
+        idx = np.where(x_present & y_present)[0]
+        if isinstance(x_vals,np.ndarray):
+            x_all = x_vals[idx]
+        else:
+            x_all = np.array([x_vals[i] for i in idx])
+        if isinstance(y_vals,np.ndarray):
+            y_all = y_vals[idx]
+        else:
+            y_all = np.array([y_vals[i] for i in idx])
+        x_len = len(idx)
         if x_len > 0:
             xmin = np.min(x_all)
         else:
@@ -55,11 +56,11 @@ class XYDataFromBatch(Operation):
             #xmin = 0 
         self.outputs['x'] = x_all 
         self.outputs['y'] = y_all
-        self.outputs['x_y'] = np.array(zip(x_all,y_all))
+        self.outputs['x_y'] = np.array(list(zip(x_all,y_all)))
         #self.outputs['x_y_sorted'] = np.sort(np.array(zip(x_all,y_all)),0)
         i_xsort = np.argsort(x_all)
         y_xsort = y_all[i_xsort]
         x_sort = x_all[i_xsort] 
-        self.outputs['x_y_sorted'] = np.array(zip(x_sort,y_xsort))
+        self.outputs['x_y_sorted'] = np.array(list(zip(x_sort,y_xsort)))
 
 
@@ -1,11 +1,8 @@
 from collections import OrderedDict
-import datetime
-import time
-
-import tzlocal
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.bl15.headers import header_time
 
 inputs=OrderedDict(image_header=None,time_key=None,temp_key=None)
 outputs=OrderedDict(date_time=None,time=None,temperature=None)
@@ -32,15 +29,9 @@ class TimeTempFromHeader(Operation):
         ktemp = self.inputs['temp_key']
         time_str = str(d[ktime])
         temp = float(d[ktemp])
-        # process the UTC time in seconds assuming %a %b %d %H:%M:%S %Y format
-        # set local time zone for utc-awareness 
-        tz = tzlocal.get_localzone()
-        # use strptime to create a naive datetime object
-        dt = datetime.datetime.strptime(time_str.strip(),"%a %b %d %H:%M:%S %Y")
-        # add in timezone information to make a utc-aware datetime object
-        dt_aware = datetime.datetime(dt.year,dt.month,dt.day,dt.hour,dt.minute,dt.second,dt.microsecond,tz)
-        # interpret the time in UTC milliseconds
-        t_utc = time.mktime(dt_aware.timetuple())
+        # process the UTC time in seconds assuming %a %b %d %H:%M:%S %Y format,
+        # with the time taken to be in the local time zone
+        t_utc = header_time(time_str)
         self.outputs['date_time'] = time_str
         self.outputs['time'] = float(t_utc)
         self.outputs['temperature'] = temp
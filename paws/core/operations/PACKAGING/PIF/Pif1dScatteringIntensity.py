@@ -6,6 +6,7 @@ import pypif.obj as pifobj
 from ... import Operation as opmod 
 from ...Operation import Operation
 from ....tools.saxs import saxs_fit 
+from ....tools.pif import bulk
 
 inputs=OrderedDict(uid=None,q_I=None)
 outputs=OrderedDict(pif=None)
@@ -37,13 +38,5 @@ class Pif1dScatteringIntensity(Operation):
         self.outputs['pif'] = csys
 
     def q_I_property(self,q_I):
-        pI = pifobj.Property()
-        n_qpoints = q_I.shape[0]
-        pI.scalars = [pifobj.Scalar(q_I[i,1]) for i in range(n_qpoints)]
-        pI.units = 'counts'
-        pI.conditions = []
-        pI.conditions.append( pifobj.Value('scattering vector', 
-                            [pifobj.Scalar(q_I[i,0]) for i in range(n_qpoints)],
-                            None,None,None,'1/Angstrom') )
-        return pI 
+        return bulk.q_I_property(q_I,Iunits='counts')
         
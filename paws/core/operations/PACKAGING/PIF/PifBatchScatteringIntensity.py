@@ -0,0 +1,48 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from ... import Operation as opmod 
+from ...Operation import Operation
+from ....tools.pif import bulk
+from ....tools.batch.store import batch_column
+
+inputs=OrderedDict(batch_outputs=None,q_I_key=None,uid_prefix='')
+outputs=OrderedDict(pifs=None)
+
+class PifBatchScatteringIntensity(Operation):
+    """
+    Build a pypif.obj.ChemicalSystem containing the scattering intensity
+    for each spectrum in a batch output, all at once.
+    Spectra that share a q grid are packaged from one (N, nq) array of intensities.
+    """
+
+    def __init__(self):
+        super(PifBatchScatteringIntensity,self).__init__(inputs,outputs)
+        self.input_doc['batch_outputs'] = 'list of dicts produced by a batch execution'
+        self.input_doc['q_I_key'] = 'name of the batch workflow output '\
+            'containing n-by-2 arrays of q values and scattering intensities'
+        self.input_doc['uid_prefix'] = 'prefix for the pif uids- '\
+            'pif uid = uid_prefix+batch index'
+        self.output_doc['pifs'] = 'list of pif objects, one for each batch item'
+        self.input_type['batch_outputs'] = opmod.workflow_item
+
+    def run(self):
+        b_out = self.inputs['batch_outputs']
+        pre = self.inputs['uid_prefix']
+        q_I_all,present = batch_column(b_out,self.inputs['q_I_key'])
+        idx = np.where(present)[0]
+        uids = [pre+str(i) for i in idx]
+        tags = ['unlabeled scattering intensity']
+        if isinstance(q_I_all,np.ndarray) and q_I_all.ndim == 3 \
+        and np.all(q_I_all[idx,:,0] == q_I_all[idx[:1],:,0]):
+            # shared q grid: package the whole stack of intensities at once
+            q = q_I_all[idx[0],:,0] if len(idx) else np.zeros(q_I_all.shape[1])
+            pifs = bulk.scattering_pifs(uids,q,q_I_all[idx,:,1],tags=tags,Iunits='counts')
+        else:
+            pifs = []
+            for uid,i in zip(uids,idx):
+                pifs.extend(bulk.scattering_pifs([uid],q_I_all[i][:,0],
+                    q_I_all[i][:,1][np.newaxis,:],tags=tags,Iunits='counts'))
+        self.outputs['pifs'] = pifs
+
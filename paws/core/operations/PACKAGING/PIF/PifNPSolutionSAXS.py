@@ -6,6 +6,7 @@ import pypif.obj as pifobj
 from ... import Operation as opmod 
 from ...Operation import Operation
 from ....tools.saxs import saxs_fit 
+from ....tools.pif import bulk
 
 inputs=OrderedDict(
     uid_prefix=None,
@@ -154,13 +155,5 @@ class PifNPSolutionSAXS(Operation):
         return pf
 
     def q_I_property(self,q_I,Iunits='arb',qunits='1/Angstrom'):
-        pI = pifobj.Property()
-        n_qpoints = q_I.shape[0]
-        pI.scalars = [pifobj.Scalar(q_I[i,1]) for i in range(n_qpoints)]
-        pI.units = Iunits 
-        pI.conditions = []
-        pI.conditions.append( pifobj.Value('scattering vector', 
-                            [pifobj.Scalar(q_I[i,0]) for i in range(n_qpoints)],
-                            None,None,None,qunits) )
-        return pI 
+        return bulk.q_I_property(q_I,None,Iunits,qunits)
         
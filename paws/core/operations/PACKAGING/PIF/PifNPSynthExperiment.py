@@ -5,6 +5,7 @@ import pypif.obj as pifobj
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.pif import bulk
 
 inputs=OrderedDict(pifs=None,recipe_file=None,reaction_id=None)
 outputs=OrderedDict(master_pif=None)
@@ -35,17 +36,5 @@ class PifNPSynthExperiment(Operation):
         csys.uid = rxnid 
 
     def time_feature_property(self,t_f,fname,funits=''):
-        pf = pifobj.Property()
-        pf.name = fname 
-        npts = t_f.shape[0]
-        pf.scalars = [pifobj.Scalar(t_f[i,1]) for i in range(npts)]
-        if funits:
-            pf.units = funits 
-        pf.conditions = []
-        pf.conditions.append( pifobj.Value('reaction time',
-                        [pifobj.Scalar(t_f[i,0]) for i in range(npts)],
-                        None,None,None,'seconds') )
-        return pf 
-
-
-
+        return bulk.values_property(t_f[:,1],fname,funits or None,
+            t_f[:,0],'reaction time','seconds')
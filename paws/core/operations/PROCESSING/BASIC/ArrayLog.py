@@ -3,6 +3,7 @@ from collections import OrderedDict
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.image import precision
 
 inputs = OrderedDict(x=None)
 outputs = OrderedDict(logx=None)
@@ -11,6 +12,7 @@ class ArrayLog(Operation):
     """
     Take the base-10 logarithm of any array. 
     Any elements with non-positive values are removed. 
+    The result has the floating-point dtype of the workflow dtype policy.
     """
 
     def __init__(self):
@@ -23,9 +25,6 @@ class ArrayLog(Operation):
         x = self.inputs['x']
         # good_vals = elements for which both x and y have defined logarithm
         idx_ok = ((x > 0) & (~np.isnan(x)))
-        logx = np.zeros(x.shape)
-        logx[idx_ok] = np.log10(x[idx_ok])
-        logx[np.invert(idx_ok)] = np.nan
+        logx = np.full(x.shape,np.nan,dtype=precision.float_dtype(self.dtype_policy))
+        np.log10(x,out=logx,where=idx_ok)
         self.outputs['logx'] = logx 
-
-
@@ -3,12 +3,17 @@ from collections import OrderedDict
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.image import precision
 
 inputs=OrderedDict(image_data=None,rotation_deg=90)
 outputs=OrderedDict(image_data=None)
 
 class Rotation(Operation):
-    """Rotate an array by 90, 180, or 270 degrees."""
+    """Rotate an array by 90, 180, or 270 degrees.
+
+    The rotated array is a view of the input,
+    unless a floating-point input must be cast to the workflow dtype policy.
+    """
 
     def __init__(self):
         super(Rotation,self).__init__(inputs,outputs)        
@@ -22,13 +27,8 @@ class Rotation(Operation):
         """Rotate self.inputs['image_data'] and save as self.outputs['image_data']"""
         img = self.inputs['image_data']
         rot_deg = int(self.inputs['rotation_deg'])
-        if rot_deg==90:
-            img_rot = np.rot90(img)
-        elif rot_deg==180:
-            img_rot = np.rot90(np.rot90(img))
-        elif rot_deg==270:
-            img_rot = np.rot90(np.rot90(np.rot90(img)))
-        else:
+        if not rot_deg in [90,180,270]:
             msg = '[{}] expected rot_deg = 90, 180, or 270, got {}'.format(__name__,rot_deg)
             raise ValueError(msg)
-        self.outputs['image_data'] = img_rot
+        img_rot = np.rot90(img,rot_deg//90)
+        self.outputs['image_data'] = precision.cast_float(img_rot,self.dtype_policy)
@@ -5,9 +5,11 @@ import pyFAI
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.image import precision
+from ....tools.integration.lut import pyfai_lut
 
 inputs = OrderedDict(image_data=None,integrator=None,
-    npt=1000,polz_factor=1.,unit='q_A^-1',integrate_args={})
+    npt=1000,polz_factor=1.,unit='q_A^-1',integrate_args={},cache_lut=False,n_threads=1)
 outputs = OrderedDict(q=None,I=None,q_I=None)
         
 class ApplyIntegrator1d(Operation):
@@ -21,6 +23,12 @@ class ApplyIntegrator1d(Operation):
     http://pyfai.readthedocs.io/en/latest/ 
     for supported keyword arguments 
     as well as parameter definitions and defaults.
+
+    With cache_lut, the image is integrated by histogram (no pixel splitting),
+    using a pixel-to-bin lookup table that is saved to the paws scratch directory,
+    so that later runs and other processes with the same geometry reuse it.
+    Only the mask and correctSolidAngle integrate_args apply in this case,
+    and with n_threads > 1 the image is binned in row tiles on a pool of threads.
     """
 
     def __init__(self):
@@ -35,6 +43,10 @@ class ApplyIntegrator1d(Operation):
             'to pass to pyFAI.AzimuthalIntegrator.integrate1d(). '\
             'Where relevant, the values in this dict will be replaced '\
             'by inputs to the operation, e.g. for npt.' 
+        self.input_doc['cache_lut'] = 'if True, integrate with a persisted '\
+            'pixel-to-bin lookup table (histogram method, no pixel splitting)'
+        self.input_doc['n_threads'] = 'number of threads for integration '\
+            'with the lookup table (cache_lut)'
         self.input_type['image_data'] = opmod.workflow_item
         self.input_type['integrator'] = opmod.workflow_item
         self.output_doc['q'] = 'Scattering vector magnitude q in 1/Angstrom.'
@@ -50,7 +62,16 @@ class ApplyIntegrator1d(Operation):
             kw['polarization_factor'] = self.inputs['polz_factor']
         if self.inputs['unit']:
             kw['unit'] = self.inputs['unit']
-        q,I = intgtr.integrate1d(img,npt,**kw)
+        if self.inputs['cache_lut']:
+            lut = pyfai_lut(intgtr,img.shape,npt,kw.get('unit','2th_deg'),
+                kw.get('polarization_factor'),kw.get('mask'),
+                kw.get('correctSolidAngle',True))
+            q = np.array(lut.centers)
+            I = lut.integrate(img,self.inputs['n_threads'],
+                dtype=precision.float_dtype(self.dtype_policy))
+        else:
+            q,I = intgtr.integrate1d(img,npt,**kw)
+            I = precision.as_float(I,self.dtype_policy)
         self.outputs['q'] = q 
         self.outputs['I'] = I
         self.outputs['q_I'] = np.array([q,I]).T
@@ -5,6 +5,7 @@ import pyFAI
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.image import precision
 
 inputs = OrderedDict(image_data=None,integrator=None,
     npt_rad=1000,npt_azim=1000,polz_factor=1.,unit='q_A^-1',integrate_args={})
@@ -54,6 +55,7 @@ class ApplyIntegrator2d(Operation):
             kw['unit'] = self.inputs['unit']
 
         I_at_q_chi,q,chi = intgtr.integrate2d(img,npt_rad,npt_azim,**kw)
+        I_at_q_chi = precision.as_float(I_at_q_chi,self.dtype_policy)
         
         self.outputs['q'] = q
         self.outputs['chi'] = chi
@@ -0,0 +1,58 @@
+import numpy as np
+from collections import OrderedDict
+
+from ... import Operation as opmod 
+from ...Operation import Operation
+from ....tools.image import precision
+from ....tools.integration.lut import pyfai_lut
+from ....tools.integration import masks
+from ....tools.integration.stack import integrate_stack, read_frame
+
+inputs = OrderedDict(image_stack=None,file_list=None,integrator=None,
+    npt=1000,polz_factor=1.,unit='q_A^-1',mask=None,ROI_mask=None,n_threads=4)
+outputs = OrderedDict(q=None,I=None)
+        
+class ApplyIntegratorStack1d(Operation):
+    """Integrate a stack of images using an existing PyFAI.AzimuthalIntegrator.
+
+    Input an (N, H, W) array of images, or a list of N image files.
+    All images are integrated with one pixel-to-bin lookup table
+    (histogram method, no pixel splitting),
+    built from the integrator geometry and saved to the paws scratch directory.
+    The stack is split across threads.
+    The output is an (N, npt) array of intensities on a shared q axis.
+    """
+
+    def __init__(self):
+        super(ApplyIntegratorStack1d,self).__init__(inputs,outputs)
+        self.input_doc['image_stack'] = '3d array of images, stacked along the first axis'
+        self.input_doc['file_list'] = 'list of paths to image files- '\
+            'used if image_stack is not provided (set one of the two, e.g. to a workflow item)'
+        self.input_doc['integrator'] = 'A PyFAI.AzimuthalIntegrator object'
+        self.input_doc['npt'] = 'number of q-points to integrate'
+        self.input_doc['polz_factor'] = 'polarization factor, '\
+            'in case polarization correction is needed'
+        self.input_doc['unit'] = 'choice of unit. See PyFAI documentation for options.' 
+        self.input_doc['mask'] = 'optional mask array, in the pyFAI convention '\
+            '(nonzero pixels are masked)'
+        self.input_doc['ROI_mask'] = 'optional ROI array, nonzero for the pixels to be counted'
+        self.input_doc['n_threads'] = 'number of threads for reading and integration'
+        self.input_type['integrator'] = opmod.workflow_item
+        self.output_doc['q'] = 'Scattering vector magnitude q in 1/Angstrom.'
+        self.output_doc['I'] = 'N-by-npt array of integrated intensities at q.'
+
+    def run(self):
+        frames = self.inputs['image_stack']
+        if frames is None:
+            frames = list(self.inputs['file_list'])
+            shape = np.shape(read_frame(frames[0]))
+        else:
+            shape = np.shape(frames)[1:]
+        mask = masks.combined_mask(shape,valid=self.inputs['ROI_mask'],
+            masked=self.inputs['mask'],invert=True)
+        lut = pyfai_lut(self.inputs['integrator'],shape,self.inputs['npt'],
+            self.inputs['unit'],self.inputs['polz_factor'] or None,mask)
+        self.outputs['q'] = np.array(lut.centers)
+        self.outputs['I'] = integrate_stack(lut,frames,self.inputs['n_threads'],
+            dtype=precision.float_dtype(self.dtype_policy))
+
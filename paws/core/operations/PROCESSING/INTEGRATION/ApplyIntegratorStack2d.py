@@ -0,0 +1,64 @@
+import numpy as np
+from collections import OrderedDict
+
+from ... import Operation as opmod 
+from ...Operation import Operation
+from ....tools.image import precision
+from ....tools.integration.lut import pyfai_lut
+from ....tools.integration import masks
+from ....tools.integration.stack import integrate_stack, read_frame
+
+inputs = OrderedDict(image_stack=None,file_list=None,integrator=None,
+    npt_rad=1000,npt_azim=1000,polz_factor=1.,unit='q_A^-1',mask=None,ROI_mask=None,n_threads=4)
+outputs = OrderedDict(q=None,chi=None,I_at_q_chi=None)
+        
+class ApplyIntegratorStack2d(Operation):
+    """Integrate a stack of images using an existing PyFAI.AzimuthalIntegrator.
+
+    Input an (N, H, W) array of images, or a list of N image files.
+    All images are integrated with one pixel-to-bin lookup table
+    (histogram method, no pixel splitting),
+    built from the integrator geometry and saved to the paws scratch directory.
+    The stack is split across threads.
+    The output is an (N, npt_azim, npt_rad) array of intensities
+    on shared q and chi axes.
+    """
+
+    def __init__(self):
+        super(ApplyIntegratorStack2d,self).__init__(inputs,outputs)
+        self.input_doc['image_stack'] = '3d array of images, stacked along the first axis'
+        self.input_doc['file_list'] = 'list of paths to image files- '\
+            'used if image_stack is not provided (set one of the two, e.g. to a workflow item)'
+        self.input_doc['integrator'] = 'A PyFAI.AzimuthalIntegrator object'
+        self.input_doc['npt_rad'] = 'number of q-points to integrate'
+        self.input_doc['npt_azim'] = 'number of chi-points to integrate'
+        self.input_doc['polz_factor'] = 'polarization factor, '\
+            'in case polarization correction is needed'
+        self.input_doc['unit'] = 'choice of unit. See PyFAI documentation for options.' 
+        self.input_doc['mask'] = 'optional mask array, in the pyFAI convention '\
+            '(nonzero pixels are masked)'
+        self.input_doc['ROI_mask'] = 'optional ROI array, nonzero for the pixels to be counted'
+        self.input_doc['n_threads'] = 'number of threads for reading and integration'
+        self.input_type['integrator'] = opmod.workflow_item
+        self.output_doc['q'] = 'Scattering vector magnitude q array in 1/Angstrom.'
+        self.output_doc['chi'] = 'Azimuthal angle array in degrees.'
+        self.output_doc['I_at_q_chi'] = '3d array of integrated intensity at chi,q, '\
+            'with shape (N,npt_azim,npt_rad).'
+
+    def run(self):
+        frames = self.inputs['image_stack']
+        if frames is None:
+            frames = list(self.inputs['file_list'])
+            shape = np.shape(read_frame(frames[0]))
+        else:
+            shape = np.shape(frames)[1:]
+        mask = masks.combined_mask(shape,valid=self.inputs['ROI_mask'],
+            masked=self.inputs['mask'],invert=True)
+        lut = pyfai_lut(self.inputs['integrator'],shape,self.inputs['npt_rad'],
+            self.inputs['unit'],self.inputs['polz_factor'] or None,mask,
+            npt_azim=self.inputs['npt_azim'])
+        self.outputs['q'] = np.array(lut.centers)
+        self.outputs['chi'] = np.array(lut.azim_centers)
+        self.outputs['I_at_q_chi'] = integrate_stack(lut,frames,self.inputs['n_threads'],
+            dtype=precision.float_dtype(self.dtype_policy))
+
@@ -1,12 +1,11 @@
 import numpy as np
 from collections import OrderedDict
 
-import pyFAI
-
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.integration.registry import get_integrator
 
-inputs = OrderedDict(poni_dict=None) 
+inputs = OrderedDict(poni_dict=None,detector_shape=None,mask=None) 
 outputs = OrderedDict(integrator=None) 
 
 class BuildPyFAIIntegrator(Operation):
@@ -14,6 +13,11 @@ class BuildPyFAIIntegrator(Operation):
 
     Input PONI dict should be similar 
     to the output of PyFAI.AzimuthalIntegrator.getPyFAI()
+
+    Integrators are kept in a process-wide registry,
+    keyed by the calibration, detector shape and mask,
+    so that repeated runs with the same inputs
+    get the same integrator, along with its precomputed arrays.
     """
     def __init__(self):
         super(BuildPyFAIIntegrator,self).__init__(inputs,outputs)
@@ -21,12 +25,15 @@ class BuildPyFAIIntegrator(Operation):
         + 'minimally including keys dist, poni1, poni2, rot1, rot2, rot3, pixel1, pixel2, wavelength;'
         + 'optionally including keys fpolz, detector, splineFile; '
         + 'same specifications as pyFAI .poni format calibration parameters')
+        self.input_doc['detector_shape'] = 'optional (rows,columns) shape of the detector- '\
+            'if provided, the q, chi and solid angle arrays are precomputed'
+        self.input_doc['mask'] = 'optional mask array, in the pyFAI convention '\
+            '(nonzero pixels are masked)'
         self.input_type['poni_dict'] = opmod.workflow_item
         self.output_doc['integrator'] = 'PyFAI.AzimuthalIntegrator object set up with input poni_dict'
 
     def run(self):
         pd = self.inputs['poni_dict']
-        p = pyFAI.AzimuthalIntegrator()
-        p.setPyFAI(**pd)
-        self.outputs['integrator'] = p
+        self.outputs['integrator'] = get_integrator(pd,
+            self.inputs['detector_shape'],self.inputs['mask'])
 
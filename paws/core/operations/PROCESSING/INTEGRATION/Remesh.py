@@ -4,32 +4,49 @@ import numpy as np
 
 from ... import Operation as opmod 
 from ...Operation import Operation
-from ....tools.integration import integration
+from ....tools.image import precision
+from ....tools.integration import remesh
 
-inputs = OrderedDict(image_data=None,geom=None,alpha_i=None)
-outputs = OrderedDict(q_par=None,q_norm=None,I=None)
+inputs = OrderedDict(image_data=None,geom=None,alpha_i=None,order=0,mask=None,n_threads=1)
+outputs = OrderedDict(q_par=None,q_norm=None,I=None,mask=None)
 
 class Remesh(Operation):
-    """Remesh an image for Ewald's sphere corrections under grazing incidence."""
+    """Remesh an image for Ewald's sphere corrections under grazing incidence.
+
+    The pixel map for the geometry, incident angle and image shape
+    is computed once and cached, so remeshing a series of images
+    costs one vectorized gather per image.
+    With n_threads > 1 the gather runs in tiles of grid rows on a pool of threads.
+    """
 
     def __init__(self):
         super(Remesh, self).__init__(inputs, outputs)
         self.input_doc['image_data'] = '2d array representing intensity for each pixel'
         self.input_doc['geom'] = 'pyFAI.Geometry object describing measurement geometry'
-        self.input_doc['alpha_i'] = 'angle of incidence'
+        self.input_doc['alpha_i'] = 'angle of incidence in radians'
+        self.input_doc['order'] = 'interpolation order: '\
+            '0 for the nearest pixel, 1 for bilinear interpolation'
+        self.input_doc['mask'] = 'optional detector mask, in the pyFAI convention '\
+            '(nonzero pixels are masked)'
+        self.input_doc['n_threads'] = 'number of threads for remeshing '\
+            '(tiles of grid rows are gathered in parallel)'
         self.input_type['image_data'] = opmod.workflow_item
         self.input_type['geom'] = opmod.workflow_item
         self.output_doc['q_par'] = 'surface-parallel component of q'
         self.output_doc['q_norm'] = 'surface-normal component of q' 
         self.output_doc['I'] = 'array of intensities corresponding to q_par and q_norm'
+        self.output_doc['mask'] = 'boolean array, True for the points of I to be counted, '\
+            'i.e. points inside the detector whose nearest pixel is not masked'
 
     def run(self):
         img = self.inputs['image_data']
         g = self.inputs['geom']
         a = self.inputs['alpha_i']
-        qpar, qvrt, intensity = integration.remesh(img, g, a)
+        intensity, qpar, qvrt = remesh.remesh(img, g, a, self.inputs['order'],
+            self.inputs['n_threads'], dtype=precision.float_dtype(self.dtype_policy))
         # save results to self.outputs
         self.outputs['q_par'] = qpar
         self.outputs['q_norm'] = qvrt
         self.outputs['I'] = intensity
+        self.outputs['mask'] = remesh.remesh_valid(img.shape, g, a, self.inputs['mask'])
 
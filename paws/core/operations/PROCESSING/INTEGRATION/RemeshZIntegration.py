@@ -3,6 +3,7 @@ from collections import OrderedDict
 
 from ... import Operation as opmod 
 from ...Operation import Operation
+from ....tools.image import precision
 from ....tools.integration import integration
         
 inputs = OrderedDict(image_data=None,mask=None,ROI_mask=None,q_norm=None,q_par=None)
@@ -18,10 +19,14 @@ class RemeshZIntegration(Operation):
     def __init__(self):
         super(RemeshZIntegration, self).__init__(inputs, outputs)
         self.input_doc['image_data'] = '2d array representing intensity for each pixel'
-        self.input_doc['mask'] = '2d array for image mask, same shape as image_data'
-        self.input_doc['ROI_mask'] = '2d array for ROI mask, same shape as image_data'
+        self.input_doc['mask'] = '2d array for image mask, same shape as image_data, '\
+            'nonzero for the pixels to be counted'
+        self.input_doc['ROI_mask'] = '2d array for ROI mask, same shape as image_data, '\
+            'nonzero for the pixels to be counted'
         self.input_doc['q_norm'] = 'q normal component'
         self.input_doc['q_par'] = 'q parallel component'
+        self.input_type['image_data'] = opmod.workflow_item
+        self.input_type['q_norm'] = opmod.workflow_item
         self.output_doc['q_z'] = 'Scattering vector z component in 1/Angstrom.'
         self.output_doc['I'] = 'Integrated intensity at q_z.'
 
@@ -31,7 +36,7 @@ class RemeshZIntegration(Operation):
         cut = self.inputs['ROI_mask']
         qv = self.inputs['q_norm']
         qp = self.inputs['q_par']
-        qz, zprof = integration.remeshzintegrate(data, mask, cut = cut, qvrt = qv, qpar = ap)
-        self.outputs['q_z'] = qz
-        self.outputs['I'] = zprof
-
+        q, I = integration.remeshzintegrate(data, mask, cut, q_norm=qv, q_par=qp,
+            dtype=precision.float_dtype(self.dtype_policy))
+        self.outputs['q_z'] = q
+        self.outputs['I'] = I
@@ -7,6 +7,7 @@ from ... import Operation as opmod
 from ...Operation import Operation
 from ... import optools
 from ....tools.saxs import saxs_fit
+from ....tools.batch.store import BatchStore, batch_column
 
 inputs = OrderedDict(batch_outputs=None,time_key=None,
                     q_I_key=None,q_I_opt_key=None,flags_key=None,
@@ -19,7 +20,8 @@ class PostProcessTimeSeries(Operation):
     def __init__(self):
         super(PostProcessTimeSeries,self).__init__(inputs,outputs)        
         self.input_doc['batch_outputs'] = 'list of dicts '\
-            'of workflow outputs, produced by a batch execution'
+            'of workflow outputs, produced by a batch execution- '\
+            'read by column, and not modified'
         self.input_doc['time_key'] = 'dict key for time stamp in batch_outputs'
         self.input_doc['q_I_key'] = 'dict key for '\
             'measured spectrum data from batch_outputs'
@@ -36,15 +38,19 @@ class PostProcessTimeSeries(Operation):
             'containing time stamps and newly refined parameters'
 
     def run(self):
-        b_out = copy.deepcopy(self.inputs['batch_outputs'])
-        t = np.array([b[self.inputs['time_key']] for b in b_out])
+        b_out = self.inputs['batch_outputs']
+        t = np.asarray(batch_column(b_out,self.inputs['time_key'])[0])
         i_xsort = np.argsort(t)
         t = t[i_xsort]
-        b_out = [b_out[i] for i in i_xsort]
-        q_I = np.array([b[self.inputs['q_I_key']] for b in b_out])
-        f = np.array([b[self.inputs['flags_key']] for b in b_out])
-        p = np.array([b[self.inputs['params_key']] for b in b_out])
-        r = np.array([b[self.inputs['reports_key']] for b in b_out])
+        # read through the columns, in time order, without copying the batch:
+        # values are only copied where they are modified
+        def sorted_column(key):
+            col = batch_column(b_out,key)[0]
+            return [col[i] for i in i_xsort]
+        q_I = sorted_column(self.inputs['q_I_key'])
+        f = sorted_column(self.inputs['flags_key'])
+        p = sorted_column(self.inputs['params_key'])
+        r = sorted_column(self.inputs['reports_key'])
 
         n_batch = len(b_out)
         idx_batch = np.arange(0,n_batch)
@@ -54,10 +60,14 @@ class PostProcessTimeSeries(Operation):
         if self.data_callback: 
             self.data_callback('outputs.new_outputs',empty_outputs)
 
-        for idx,d in zip(idx_batch,b_out):
+        for idx in idx_batch:
             p_i = copy.deepcopy(p[idx])
             rpt_i = copy.deepcopy(r[idx])
-            out_dict = b_out[idx] 
+            # BatchStore items are new dicts already:
+            # plain lists are copied, one (shallow) item at a time
+            out_dict = b_out[i_xsort[idx]]
+            if not isinstance(b_out,BatchStore):
+                out_dict = copy.copy(out_dict)
             if not f[idx]['bad_data'] and not f[idx]['diffraction_peaks']:
                 test_idx = []
                 if not idx==0:
@@ -2,30 +2,45 @@
 Various tools for working with Workflows and Operations
 """
 
-import glob
 import copy
-from collections import Iterator
+try:
+    from collections.abc import Iterator
+except ImportError:
+    from collections import Iterator
 from collections import OrderedDict
 
 from . import Operation as opmod 
+from ..tools.realtime.watcher import FileWatcher
 
 class FileSystemIterator(Iterator):
+    """
+    Iterator over the files arriving in a directory.
+
+    next() returns the earliest-arrived path that has not been returned yet,
+    or None if no new file has arrived.
+    New files are detected by a FileWatcher,
+    which uses inotify where it is available.
+    """
 
     def __init__(self,dirpath,regex,include_existing_files=True):
         self.dirpath = dirpath
         self.rx = regex
+        self.watcher = FileWatcher(dirpath,regex,include_existing_files)
         self.paths_done = []
-        if not include_existing_files:
-            self.paths_done = glob.glob(self.dirpath+'/'+self.rx)
         super(FileSystemIterator,self).__init__()
 
-    def next(self):
-        batch_list = glob.glob(self.dirpath+'/'+self.rx)
-        for path in batch_list:
-            if not path in self.paths_done:
-                self.paths_done.append(path)
-                return path
-        return None
+    def next(self,timeout=0.):
+        """
+        Return the next new path, waiting up to `timeout` seconds 
+        for a file to arrive, or None if no new file was found.
+        """
+        path = self.watcher.next_path(timeout)
+        if path is not None:
+            self.paths_done.append(path)
+        return path
+
+    def __next__(self):
+        return self.next()
 
 class ExecutionError(Exception):
     def __init__(self,msg):
@@ -1,7 +1,15 @@
 import os
+import json
+from collections import OrderedDict
 from datetime import datetime as dt
 
+import numpy as np
 import yaml
+# use the libyaml-based C loader and dumper where available 
+try:
+    from yaml import CLoader as YAMLLoader, CDumper as YAMLDumper
+except ImportError:
+    from yaml import Loader as YAMLLoader, Dumper as YAMLDumper
 
 p = os.path.abspath(__file__)
 # p = (pawsroot)/paws/core/pawstools.py
@@ -58,14 +66,95 @@ def timestr():
     """Return time as a string"""
     return dt.strftime(dt.now(),'%H:%M:%S')
 
+def yaml_load(f):
+    """Load YAML from file object f, with the C loader if available."""
+    return yaml.load(f,Loader=YAMLLoader)
+
+def yaml_dump(d,f):
+    """Dump d as YAML to file object f, with the C dumper if available."""
+    yaml.dump(d,f,Dumper=YAMLDumper)
+
+def json_npz_paths(filename):
+    """
+    Return the paths of the .json setup file 
+    and the .npz array file for a JSON state file.
+    """
+    base = os.path.splitext(filename)[0]
+    return base+'.json',base+'.npz'
+
+def _to_json(x,arrays):
+    # replace numpy arrays by references to entries in arrays
+    if isinstance(x,np.ndarray):
+        k = 'arr_{}'.format(len(arrays))
+        arrays[k] = x
+        return {'__ndarray__':k}
+    elif isinstance(x,dict):
+        return OrderedDict([(str(k),_to_json(v,arrays)) for k,v in x.items()])
+    elif isinstance(x,(list,tuple)):
+        return [_to_json(v,arrays) for v in x]
+    elif isinstance(x,np.generic):
+        return x.item()
+    return x
+
+def _from_json(x,arrays):
+    if isinstance(x,dict):
+        if list(x.keys()) == ['__ndarray__']:
+            return arrays[x['__ndarray__']]
+        return OrderedDict([(k,_from_json(v,arrays)) for k,v in x.items()])
+    elif isinstance(x,list):
+        return [_from_json(v,arrays) for v in x]
+    return x
+
+def save_json_npz(filename,d):
+    """
+    Save dict d as JSON, with any numpy arrays in d 
+    saved alongside in an uncompressed .npz file.
+    """
+    json_path,npz_path = json_npz_paths(filename)
+    arrays = OrderedDict()
+    jd = _to_json(d,arrays)
+    with open(json_path,'w') as f:
+        json.dump(jd,f,indent=1)
+    if arrays:
+        np.savez(npz_path,**arrays)
+    elif os.path.exists(npz_path):
+        os.remove(npz_path)
+
+def load_json_npz(filename):
+    """Load a dict saved by save_json_npz()."""
+    json_path,npz_path = json_npz_paths(filename)
+    with open(json_path,'r') as f:
+        jd = json.load(f,object_pairs_hook=OrderedDict)
+    arrays = {}
+    if os.path.exists(npz_path):
+        with np.load(npz_path) as npz:
+            arrays = dict([(k,npz[k]) for k in npz.files])
+    return _from_json(jd,arrays)
+
 def save_file(filename,d):
     """
     Create or replace file indicated by filename,
-    as a yaml serialization of dict d.
+    as a yaml serialization of dict d,
+    or, if filename has the .json extension,
+    as JSON with numpy arrays in a side-car .npz file.
     """
+    if os.path.splitext(filename)[1] == '.json':
+        save_json_npz(filename,d)
+        return
     f = open(filename, 'w')
-    yaml.dump(d, f)
+    yaml_dump(d, f)
     f.close()
+
+def load_file(filename):
+    """
+    Load a dict saved by save_file().
+    """
+    if os.path.splitext(filename)[1] == '.json':
+        return load_json_npz(filename)
+    f = open(filename,'r')
+    d = yaml_load(f)
+    f.close()
+    return d
     
 def update_file(filename,d):
     """
@@ -73,23 +162,19 @@ def update_file(filename,d):
     without removing members not included in d.
     """
     if os.path.exists(filename):
-        f_old = open(filename,'r')
-        d_old = yaml.load(f_old)
-        f_old.close()
+        d_old = load_file(filename)
         d_old.update(d)
         d = d_old
-    f = open(filename, 'w')
-    yaml.dump(d, f)
-    f.close()
+    save_file(filename,d)
 
 def save_cfg(cfg_data,cfg_file):
     cfg = open(cfg_file,'w')
-    yaml.dump(cfg_data,cfg)
+    yaml_dump(cfg_data,cfg)
     cfg.close()
 
 def load_cfg(cfg_file):
     cfg = open(cfg_file,'r')
-    cfg_data = yaml.load(cfg)
+    cfg_data = yaml_load(cfg)
     cfg.close()
     if not cfg_data:
         cfg_data = OrderedDict() 
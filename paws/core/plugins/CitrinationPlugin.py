@@ -1,4 +1,5 @@
 from __future__ import print_function
+import os
 
 from pypif import pif
 from citrination_client import CitrinationClient 
@@ -6,20 +7,39 @@ from citrination_client import CitrinationClient
 from .. import pawstools
 from .PawsPlugin import PawsPlugin
 from ..operations import Operation as opmod
+from ..tools.citrination.uploads import UploadQueue, open_session_queue, client_upload
+
+# concurrent sessions queue their uploads in separate subdirectories of this
+upload_parent_dir = os.path.join(pawstools.paws_scratch_dir,'citrination_uploads')
 
 class CitrinationPlugin(PawsPlugin):
     """
     Wrapper contains a Citrination client and
     implements the PawsPlugin abc interface.
+    The plugin also runs a background upload queue,
+    which ships batches of pif records through the client,
+    so that Operations do not wait on the Citrination server.
     """
 
     def __init__(self):
-        input_names = ['address','api_key_file']
+        input_names = ['address','api_key_file','upload_dir','batch_size','max_wait','max_retries']
         super(CitrinationPlugin,self).__init__(input_names)
         self.input_doc['address'] = 'web address of citrination instance'
         self.input_doc['api_key_file'] = 'path to a file in the local filesystem containing a valid citrination api key'
+        self.input_doc['upload_dir'] = 'directory where records are queued for upload- '\
+            'records left in this directory are uploaded at the next start. '\
+            'If None, a subdirectory of the paws scratch directory '\
+            'that no other session is using is chosen at start'
+        self.input_doc['batch_size'] = 'maximum number of records per upload'
+        self.input_doc['max_wait'] = 'time in seconds that records may wait for a batch to fill'
+        self.input_doc['max_retries'] = 'number of retries for a failed upload'
         self.inputs['address'] = 'http://citrination.com' 
+        self.inputs['upload_dir'] = None
+        self.inputs['batch_size'] = 100
+        self.inputs['max_wait'] = 2.
+        self.inputs['max_retries'] = 5
         self.ctn_client = None
+        self.uploads = None
         self.return_codes = {} 
 
     def start(self):
@@ -28,12 +48,22 @@ class CitrinationPlugin(PawsPlugin):
         self.api_key = str(f.readline()).strip()
         f.close()
         self.ctn_client = CitrinationClient(api_key = self.api_key, site = self.address)
+        queue_args = dict(batch_size=self.inputs['batch_size'],
+            max_wait=self.inputs['max_wait'],max_retries=self.inputs['max_retries'])
+        if self.inputs['upload_dir'] is None:
+            self.uploads = open_session_queue(client_upload(self.ctn_client),
+                upload_parent_dir,**queue_args)
+        else:
+            self.uploads = UploadQueue(client_upload(self.ctn_client),
+                self.inputs['upload_dir'],**queue_args)
+        self.uploads.start()
 
     def stop(self):
-        pass
+        if self.uploads is not None:
+            self.uploads.close(timeout=30.)
 
     def content(self): 
-        return {'client':self.ctn_client,'inputs':self.inputs}
+        return {'client':self.ctn_client,'uploads':self.uploads,'inputs':self.inputs}
 
     def description(self):
         desc = str('Citrination Client Plugin for Paws: '
@@ -0,0 +1,282 @@
+"""
+Columnar storage for the outputs of batch executions.
+
+A batch produces one dict of workflow outputs per input.
+BatchStore holds these as one column per output name,
+so that the value of one output across the whole batch
+is a single array (or array slice), rather than a walk over dicts.
+The list-of-dicts interface is kept:
+indexing a BatchStore returns the dict of outputs for one batch item.
+"""
+from __future__ import print_function
+import os
+import copy
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+class BatchStore(object):
+    """
+    List-like container of batch outputs, stored by column.
+
+    Numeric scalars and numeric arrays of fixed shape
+    are stored in one preallocated array per output name,
+    of shape (capacity,) or (capacity,)+array.shape.
+    Other values (strings, dicts, arrays of varying shape)
+    are kept in one list per output name.
+    Once the typed columns use more than `max_bytes`,
+    further columns are allocated as memory-mapped files in `spill_dir`.
+
+    BatchStore[i] returns an OrderedDict of (copies of) the outputs of item i
+    (or None, if item i has not been set),
+    and BatchStore.column(key) returns the values of one output for all items.
+
+    Parameters
+    ----------
+    n_items : int
+        number of batch items.
+        The store starts with n_items unset items (None),
+        like a list of [None]*n_items, and grows if items are appended.
+    max_bytes : int
+        size in bytes of typed columns to keep in memory
+    spill_dir : str, optional
+        directory for the memory-mapped column files-
+        defaults to the system temporary directory
+    """
+
+    def __init__(self,n_items=0,max_bytes=1024*2**20,spill_dir=None):
+        super(BatchStore,self).__init__()
+        self.capacity = max(int(n_items),1)
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.n_bytes = 0
+        self._n_items = int(n_items)
+        self._row_set = np.zeros(self.capacity,dtype=bool)
+        # key : array (typed column) or list (object column)
+        self._cols = OrderedDict()
+        # key : boolean array of the rows where key is present
+        self._present = OrderedDict()
+        # key : path of the memory-mapped file behind a typed column
+        self._spill_files = OrderedDict()
+
+    def __len__(self):
+        return self._n_items
+
+    def keys(self):
+        """Item indices as strings, for access by TreeModel uris."""
+        return [str(i) for i in range(self._n_items)]
+
+    def column_keys(self):
+        return list(self._cols.keys())
+
+    def _index(self,idx):
+        idx = int(idx)
+        if idx < 0:
+            idx += self._n_items
+        return idx
+
+    def __getitem__(self,idx):
+        if isinstance(idx,slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        idx = self._index(idx)
+        if idx < 0 or idx >= self._n_items:
+            raise IndexError('batch item index out of range')
+        if not self._row_set[idx]:
+            return None
+        d = OrderedDict()
+        for k,col in self._cols.items():
+            if self._present[k][idx]:
+                d[k] = self._item_value(col[idx])
+        return d
+
+    def item_keys(self,idx):
+        """
+        Names of the outputs of item idx, or None if item idx has not been set.
+        Unlike BatchStore[idx], this reads no values.
+        """
+        idx = self._index(idx)
+        if not self._row_set[idx]:
+            return None
+        return [k for k,msk in self._present.items() if msk[idx]]
+
+    def stored_value(self,idx,key):
+        """
+        The stored value of output key for item idx, without a copy:
+        a row view of a typed column, or the object kept in an object column.
+        The value must not be modified.
+        """
+        return self._cols[key][self._index(idx)]
+
+    @staticmethod
+    def _item_value(val):
+        """
+        Copy of a stored value, so that items never alias the store:
+        array rows of typed columns are copied,
+        and their scalars are returned as python scalars.
+        """
+        if isinstance(val,np.ndarray):
+            return np.array(val)
+        if isinstance(val,np.generic):
+            return val.item()
+        return copy.deepcopy(val)
+
+    def __setitem__(self,idx,item):
+        idx = self._index(idx)
+        if idx < 0:
+            raise IndexError('batch item index out of range')
+        if idx >= self.capacity:
+            self._grow(idx+1)
+        for k,msk in self._present.items():
+            msk[idx] = False
+        if item is not None:
+            for k,v in item.items():
+                self._set_value(k,idx,v)
+        self._row_set[idx] = item is not None
+        self._n_items = max(self._n_items,idx+1)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self,item):
+        self[self._n_items] = item
+
+    def column(self,key):
+        """
+        Return the values of output `key` for all batch items.
+        For a typed column, this is an array view into the store,
+        where the rows of items that lack `key` are zero
+        (see BatchStore.present()).
+        For other columns, this is a list, with None for items that lack `key`.
+        """
+        return self._cols[key][:self._n_items]
+
+    def present(self,key):
+        """Boolean array of the batch items that have a value for `key`."""
+        if not key in self._present:
+            return np.zeros(self._n_items,dtype=bool)
+        return self._present[key][:self._n_items]
+
+    @staticmethod
+    def _typed(val):
+        """Return val as a numeric array, or None if it should be kept as an object."""
+        if isinstance(val,(np.ndarray,np.number,np.bool_,bool,int,float,complex)):
+            a = np.asarray(val)
+            if a.dtype.kind in 'biufc':
+                return a
+        return None
+
+    def _set_value(self,key,idx,val):
+        a = self._typed(val)
+        if not key in self._cols:
+            self._present[key] = np.zeros(self.capacity,dtype=bool)
+            if a is None:
+                self._cols[key] = [None for i in range(self.capacity)]
+            else:
+                self._cols[key] = self._allocate(key,a.shape,a.dtype)
+        col = self._cols[key]
+        if not isinstance(col,list):
+            if a is None or a.shape != col.shape[1:]:
+                col = self._to_objects(key)
+            elif not np.can_cast(a.dtype,col.dtype,'safe'):
+                col = self._retype(key,np.result_type(a.dtype,col.dtype))
+        col[idx] = val
+        self._present[key][idx] = True
+
+    def _allocate(self,key,shape,dtype):
+        shape = (self.capacity,)+tuple(shape)
+        nbytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+        self._release(key)
+        if self.n_bytes + nbytes > self.max_bytes and nbytes > 0:
+            fd,p = tempfile.mkstemp(prefix='batch_',suffix='.npy',dir=self.spill_dir)
+            os.close(fd)
+            col = np.memmap(p,dtype=dtype,mode='w+',shape=shape)
+            self._spill_files[key] = p
+        else:
+            col = np.zeros(shape,dtype=dtype)
+            self.n_bytes += nbytes
+        return col
+
+    def _release(self,key):
+        """Release the storage of the typed column for key, if there is one."""
+        col = self._cols.get(key)
+        if col is None or isinstance(col,list):
+            return
+        if key in self._spill_files:
+            p = self._spill_files.pop(key)
+            self._cols[key] = None
+            del col
+            os.remove(p)
+        else:
+            self.n_bytes -= col.nbytes
+
+    def _retype(self,key,dtype):
+        old = np.array(self._cols[key])
+        col = self._allocate(key,old.shape[1:],dtype)
+        col[:] = old
+        self._cols[key] = col
+        return col
+
+    def _to_objects(self,key):
+        old = self._cols[key]
+        msk = self._present[key]
+        col = [np.array(old[i]) if msk[i] else None for i in range(self.capacity)]
+        self._release(key)
+        self._cols[key] = col
+        return col
+
+    def _grow(self,n):
+        cap = max(n,2*self.capacity)
+        self._row_set = np.concatenate(
+            [self._row_set,np.zeros(cap-self.capacity,dtype=bool)])
+        old_cap = self.capacity
+        self.capacity = cap
+        for k in list(self._cols.keys()):
+            self._present[k] = np.concatenate(
+                [self._present[k],np.zeros(cap-old_cap,dtype=bool)])
+            col = self._cols[k]
+            if isinstance(col,list):
+                col.extend([None for i in range(cap-old_cap)])
+            else:
+                old = np.array(col)
+                col = self._allocate(k,old.shape[1:],old.dtype)
+                col[:old_cap] = old
+                self._cols[k] = col
+
+    def to_list(self):
+        """Return the batch outputs as a list of dicts."""
+        return [self[i] for i in range(len(self))]
+
+    def __deepcopy__(self,memo):
+        new_store = BatchStore(len(self),self.max_bytes,self.spill_dir)
+        for i in range(len(self)):
+            new_store[i] = copy.deepcopy(self[i],memo)
+        return new_store
+
+    def close(self):
+        """Remove any memory-mapped column files."""
+        for k in list(self._spill_files.keys()):
+            self._release(k)
+            self._cols.pop(k)
+            self._present.pop(k)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+def batch_column(batch_outputs,key):
+    """
+    Return (values, present) for output `key` of a batch,
+    where `present` is a boolean array of the items that have `key`.
+    For a BatchStore, values is a column of the store.
+    For a list of dicts, values is a list, with None where `key` is missing.
+    """
+    if isinstance(batch_outputs,BatchStore):
+        if not key in batch_outputs.column_keys():
+            return [None for i in range(len(batch_outputs))],batch_outputs.present(key)
+        return batch_outputs.column(key),batch_outputs.present(key)
+    vals = [d[key] if d is not None and key in d else None for d in batch_outputs]
+    return vals,np.array([v is not None for v in vals],dtype=bool)
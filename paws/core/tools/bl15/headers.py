@@ -0,0 +1,253 @@
+"""
+Tools for the .txt header files written by beamline 1-5 at SSRL.
+
+parse_header() reads one header file into a dict.
+HeaderIndex keeps the contents of many header files
+in an indexed SQLite table, so that files can be looked up
+by time, by the value of any numeric header entry, or by filename,
+without re-reading the headers.
+"""
+from __future__ import print_function
+import os
+import glob
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+time_format = '%a %b %d %H:%M:%S %Y'
+
+def parse_header(file_path):
+    """
+    Read a .txt header from beamline 1-5 at SSRL into a dict.
+
+    The first line contains the user and time strings,
+    which are stored under 'User' and 'time'.
+    All other lines contain comma-separated key=value pairs,
+    whose values are stored as floats.
+
+    Parameters
+    ----------
+    file_path : str
+        path to the header file
+
+    Returns
+    -------
+    d : OrderedDict
+        dict of header keys and values
+    """
+    d = OrderedDict()
+    with open(file_path,'r') as f:
+        lines = f.read().splitlines()
+    for l in lines:
+        l = l.strip()
+        if not l or l[0] == '#':
+            continue
+        kvs = l.split(',')
+        # special case for the string headers on line 1
+        if 'User' in kvs[0]:
+            d['User'] = kvs[0].split('User:')[1].strip()
+            d['time'] = kvs[1].split('time:')[1].strip()
+        # and filter out the redundant temperature line
+        elif not (len(kvs)==1 and l[-1]=='C'):
+            for kv in kvs:
+                k,v = kv.split('=')
+                d[k.strip()] = float(v)
+    return d
+
+def header_time(time_str):
+    """
+    Convert a header time string (Day Mon dd hh:mm:ss yyyy, local time)
+    to seconds since the epoch.
+    """
+    return time.mktime(time.strptime(time_str.strip(),time_format))
+
+class HeaderIndex(object):
+    """
+    Indexed table of the contents of beamline 1-5 header files.
+
+    Each header entry is stored as a (file, key, numeric value, text value) row,
+    with an index on (key, numeric value),
+    so that lookups by the value of any key are index searches.
+    The 'time' entry is stored as its text
+    and as its value in seconds since the epoch.
+
+    Parameters
+    ----------
+    db_path : str
+        path to the SQLite database file.
+        The default ':memory:' keeps the index in memory.
+        An index saved to a file can be re-opened and updated incrementally.
+    """
+
+    def __init__(self,db_path=':memory:'):
+        super(HeaderIndex,self).__init__()
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path,check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE,
+                filename TEXT,
+                mtime REAL);
+            CREATE TABLE IF NOT EXISTS entries (
+                file_id INTEGER,
+                key TEXT,
+                num REAL,
+                txt TEXT);
+            CREATE INDEX IF NOT EXISTS idx_files_filename ON files (filename);
+            CREATE INDEX IF NOT EXISTS idx_entries_key_num ON entries (key, num);
+            CREATE INDEX IF NOT EXISTS idx_entries_file ON entries (file_id);
+            """)
+
+    def add_file(self,file_path,mtime=None):
+        """Parse a header file and add (or replace) its entries in the index."""
+        p = os.path.abspath(file_path)
+        if mtime is None:
+            mtime = os.path.getmtime(p)
+        rows = self._header_rows(p)
+        with self._lock:
+            with self._db:
+                self._insert(p,mtime,rows)
+
+    @staticmethod
+    def _header_rows(p):
+        hdr = parse_header(p)
+        rows = []
+        for k,v in hdr.items():
+            if k == 'time':
+                try:
+                    rows.append((k,header_time(v),v))
+                except ValueError:
+                    rows.append((k,None,v))
+            elif isinstance(v,float):
+                rows.append((k,v,None))
+            else:
+                rows.append((k,None,v))
+        return rows
+
+    def _insert(self,p,mtime,rows):
+        fnm = os.path.splitext(os.path.split(p)[1])[0]
+        self._remove(p)
+        cur = self._db.execute('INSERT INTO files (path,filename,mtime) VALUES (?,?,?)',
+            (p,fnm,mtime))
+        fid = cur.lastrowid
+        self._db.executemany('INSERT INTO entries (file_id,key,num,txt) VALUES (?,?,?,?)',
+            [(fid,)+r for r in rows])
+
+    def _remove(self,p):
+        row = self._db.execute('SELECT id FROM files WHERE path=?',(p,)).fetchone()
+        if row is not None:
+            self._db.execute('DELETE FROM entries WHERE file_id=?',row)
+            self._db.execute('DELETE FROM files WHERE id=?',row)
+
+    def update(self,dir_path,regex='*.txt'):
+        """
+        Index the header files in dir_path that match regex
+        and are new or have changed since they were last indexed.
+
+        Returns
+        -------
+        n_added : int
+            number of header files that were (re-)indexed
+        """
+        with self._lock:
+            known = dict(self._db.execute('SELECT path,mtime FROM files').fetchall())
+        # parse the new files first, then index them all in one transaction
+        new_files = []
+        for p in sorted(glob.glob(os.path.join(dir_path,regex))):
+            p = os.path.abspath(p)
+            mt = os.path.getmtime(p)
+            if known.get(p) != mt:
+                new_files.append((p,mt,self._header_rows(p)))
+        if new_files:
+            with self._lock:
+                with self._db:
+                    for p,mt,rows in new_files:
+                        self._insert(p,mt,rows)
+        return len(new_files)
+
+    def n_files(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def get_header(self,file_path=None,filename=None):
+        """
+        Return the indexed header dict for a header file,
+        specified by its path, or by its filename (no path, no extension).
+        Returns None if the file is not indexed.
+        """
+        with self._lock:
+            if file_path is not None:
+                row = self._db.execute('SELECT id FROM files WHERE path=?',
+                    (os.path.abspath(file_path),)).fetchone()
+            else:
+                row = self._db.execute('SELECT id FROM files WHERE filename=?',
+                    (filename,)).fetchone()
+            if row is None:
+                return None
+            d = OrderedDict()
+            for k,num,txt in self._db.execute(
+            'SELECT key,num,txt FROM entries WHERE file_id=? ORDER BY rowid',row):
+                d[k] = txt if txt is not None else num
+            return d
+
+    def closest(self,key,value):
+        """
+        Return the path of the header file
+        whose value for `key` is closest to `value`,
+        e.g. closest('time',t) or closest('TEMP',25.).
+        Returns None if no file has a numeric value for `key`.
+        """
+        q_lo = ('SELECT files.path,entries.num FROM entries JOIN files ON files.id=entries.file_id '
+            'WHERE entries.key=? AND entries.num<=? ORDER BY entries.num DESC LIMIT 1')
+        q_hi = ('SELECT files.path,entries.num FROM entries JOIN files ON files.id=entries.file_id '
+            'WHERE entries.key=? AND entries.num>=? ORDER BY entries.num ASC LIMIT 1')
+        with self._lock:
+            lo = self._db.execute(q_lo,(key,value)).fetchone()
+            hi = self._db.execute(q_hi,(key,value)).fetchone()
+        if lo is None or (hi is not None and hi[1]-value < value-lo[1]):
+            lo = hi
+        if lo is None:
+            return None
+        return lo[0]
+
+    def in_range(self,key,vmin=None,vmax=None):
+        """
+        Return a list of (path,value) for the header files
+        whose value for `key` is between vmin and vmax (inclusive),
+        sorted by value.
+        """
+        if vmin is None:
+            vmin = float('-inf')
+        if vmax is None:
+            vmax = float('inf')
+        with self._lock:
+            return self._db.execute(
+                'SELECT files.path,entries.num FROM entries JOIN files ON files.id=entries.file_id '
+                'WHERE entries.key=? AND entries.num BETWEEN ? AND ? ORDER BY entries.num',
+                (key,vmin,vmax)).fetchall()
+
+    def time_series(self,key,t_min=None,t_max=None):
+        """
+        Return a list of (time,value,path) for the numeric header entry `key`,
+        for all header files with times between t_min and t_max,
+        sorted by time (in seconds since the epoch).
+        """
+        if t_min is None:
+            t_min = float('-inf')
+        if t_max is None:
+            t_max = float('inf')
+        with self._lock:
+            return self._db.execute(
+                'SELECT t.num,v.num,files.path FROM entries t '
+                'JOIN entries v ON v.file_id=t.file_id '
+                'JOIN files ON files.id=t.file_id '
+                'WHERE t.key=\'time\' AND t.num BETWEEN ? AND ? AND v.key=? '
+                'ORDER BY t.num',(t_min,t_max,key)).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
@@ -0,0 +1,326 @@
+"""
+Background, batched uploads of PIF records to Citrination.
+
+Records are queued with UploadQueue.put(), which returns immediately.
+Each call to put() is persisted as a file in the queue directory,
+so that records that have not been uploaded
+survive a stop() or a crash, and are uploaded at the next start().
+A worker thread collects the queued records for each data set
+into one JSON file of up to batch_size records,
+uploads it with a single client,
+and retries failed uploads with exponential backoff.
+Each queue holds a lock on its directory while it is open,
+so that concurrent sessions never share queue files:
+open_session_queue() opens a queue in a subdirectory
+that no other queue is using.
+"""
+from __future__ import print_function
+import os
+import glob
+import json
+import time
+import shutil
+import threading
+from collections import OrderedDict, deque
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from pypif.util.pif_encoder import PifEncoder
+
+def client_upload(client):
+    """
+    Return an upload function for UploadQueue
+    that ships a file with client.upload_file().
+    """
+    def upload(file_path,dsid):
+        return client.upload_file(file_path,dataset_id=dsid)
+    return upload
+
+class QueueDirInUse(RuntimeError):
+    """Raised when a queue directory is locked by another open UploadQueue."""
+    pass
+
+def lock_dir(dir_path):
+    """
+    Take an exclusive lock on dir_path, through the file dir_path/.lock.
+    Returns the open lock file, which holds the lock until it is closed
+    or the process exits, or None if the lock is held elsewhere-
+    by another process, or by another open lock file in this process.
+    """
+    f = open(os.path.join(dir_path,'.lock'),'a')
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(),fcntl.LOCK_EX|fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(),msvcrt.LK_NBLCK,1)
+    except (IOError,OSError):
+        f.close()
+        return None
+    return f
+
+def open_session_queue(upload_fn,parent_dir,**kwargs):
+    """
+    Open an UploadQueue in a subdirectory of parent_dir
+    (queue_0000, queue_0001, ...) that no other open queue is using.
+    Subdirectories are tried in order, so that records left behind
+    by a session that has stopped are picked up by the next one.
+    Further kwargs are passed to UploadQueue.
+    """
+    i = 0
+    while True:
+        try:
+            return UploadQueue(upload_fn,
+                os.path.join(parent_dir,'queue_{:04d}'.format(i)),**kwargs)
+        except QueueDirInUse:
+            i += 1
+
+class UploadQueue(object):
+    """
+    Queue of PIF records to be uploaded in the background.
+
+    Parameters
+    ----------
+    upload_fn : callable
+        upload_fn(file_path,dsid) uploads a .json file
+        containing an array of records to data set dsid,
+        and returns the server response.
+        It should raise an exception if the upload fails.
+    queue_dir : str
+        directory where queued records are persisted-
+        it is locked until close() is called,
+        and QueueDirInUse is raised if another queue holds the lock
+    batch_size : int
+        maximum number of records per upload
+    max_wait : float
+        time in seconds that records may wait for a batch to fill
+    max_retries : int
+        number of times a failed upload is retried before its records
+        are moved to the 'failed' subdirectory of queue_dir
+    backoff : float
+        wait in seconds before the first retry-
+        the wait doubles with each further retry, up to max_backoff
+    max_backoff : float
+        maximum wait in seconds between retries
+    """
+
+    def __init__(self,upload_fn,queue_dir,batch_size=100,max_wait=2.,
+        max_retries=5,backoff=1.,max_backoff=60.):
+        super(UploadQueue,self).__init__()
+        self.upload_fn = upload_fn
+        self.queue_dir = queue_dir
+        self.failed_dir = os.path.join(queue_dir,'failed')
+        self.batch_size = max(int(batch_size),1)
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.n_uploaded = 0
+        self.n_failed = 0
+        # most recent server responses and upload errors
+        self.responses = deque(maxlen=100)
+        self.errors = deque(maxlen=100)
+        self._cond = threading.Condition()
+        # entries waiting for upload, in order: [file_path, dsid, n_records, t_queued]
+        self._pending = []
+        self._busy = False
+        self._stop = False
+        # number of flush() calls waiting: batches are not held back while > 0
+        self._n_flush = 0
+        self._thread = None
+        if not os.path.exists(self.failed_dir):
+            os.makedirs(self.failed_dir)
+        self._lock_file = lock_dir(queue_dir)
+        if self._lock_file is None:
+            raise QueueDirInUse('upload queue directory {} '
+                'is in use by another upload queue'.format(queue_dir))
+        self._seq = 0
+        self._load_pending()
+
+    def _load_pending(self):
+        t = time.time()
+        for p in sorted(glob.glob(os.path.join(self.queue_dir,'*.jsonl'))):
+            with open(p,'r') as f:
+                hdr = json.loads(f.readline())
+                n = sum(1 for l in f if l.strip())
+            self._pending.append([p,hdr['dsid'],n,t])
+            self._seq = max(self._seq,int(os.path.basename(p).split('.')[0])+1)
+
+    def n_pending(self):
+        """Number of records that have been queued but not uploaded."""
+        with self._cond:
+            return sum(e[2] for e in self._pending)
+
+    def put(self,records,dsid):
+        """
+        Queue a PIF record, or a list of records, for upload to data set dsid.
+        The records are serialized and written to the queue directory
+        before put() returns.
+        """
+        if not isinstance(records,(list,tuple)):
+            records = [records]
+        if not records:
+            return
+        lines = [json.dumps({'dsid':dsid})]
+        lines.extend([json.dumps(r,cls=PifEncoder) for r in records])
+        with self._cond:
+            fname = '{:012d}.jsonl'.format(self._seq)
+            self._seq += 1
+        p = os.path.join(self.queue_dir,fname)
+        # write then rename, so that a partially written file is never queued
+        with open(p+'.tmp','w') as f:
+            f.write('\n'.join(lines)+'\n')
+        os.rename(p+'.tmp',p)
+        with self._cond:
+            self._pending.append([p,dsid,len(records),time.time()])
+            self._cond.notify_all()
+
+    def start(self):
+        """Start the upload thread."""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self,timeout=None):
+        """
+        Stop the upload thread, after uploading the queued records
+        (or until timeout seconds have passed).
+        Records that are still queued remain in queue_dir.
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self,timeout=None):
+        """
+        Stop the upload thread (see stop()),
+        and release the lock on queue_dir.
+        """
+        self.stop(timeout)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def flush(self,timeout=None):
+        """
+        Wait until all queued records have been uploaded (or have failed).
+        Returns True if the queue was emptied before timeout.
+        """
+        t_end = None if timeout is None else time.time()+timeout
+        with self._cond:
+            self._n_flush += 1
+            self._cond.notify_all()
+            try:
+                while (self._pending or self._busy) \
+                and self._thread is not None and self._thread.is_alive():
+                    t_wait = 0.1 if t_end is None else min(t_end-time.time(),0.1)
+                    if t_wait <= 0:
+                        break
+                    self._cond.wait(t_wait)
+            finally:
+                self._n_flush -= 1
+            return not self._pending
+
+    def _next_batch(self):
+        """Pop the oldest entries for one data set, up to batch_size records."""
+        dsid = self._pending[0][1]
+        batch = []
+        n = 0
+        for e in list(self._pending):
+            if e[1] != dsid:
+                continue
+            if batch and n + e[2] > self.batch_size:
+                break
+            batch.append(e)
+            n += e[2]
+            self._pending.remove(e)
+        return dsid,batch
+
+    def _ready(self):
+        if not self._pending:
+            return False
+        if self._n_flush > 0 or sum(e[2] for e in self._pending) >= self.batch_size:
+            return True
+        return time.time() - self._pending[0][3] >= self.max_wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop and not self._ready():
+                    if self._pending:
+                        t_wait = self.max_wait - (time.time() - self._pending[0][3])
+                        self._cond.wait(max(t_wait,0.01))
+                    else:
+                        self._cond.wait()
+                if self._stop:
+                    return
+                dsid,batch = self._next_batch()
+                self._busy = True
+            try:
+                self._upload(dsid,batch)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _upload(self,dsid,batch):
+        recs = []
+        for e in batch:
+            with open(e[0],'r') as f:
+                f.readline()
+                recs.extend([l.strip() for l in f if l.strip()])
+        up_path = os.path.join(self.queue_dir,'upload_{}.json'.format(
+            os.path.basename(batch[0][0]).split('.')[0]))
+        with open(up_path,'w') as f:
+            f.write('['+','.join(recs)+']')
+        n_try = 0
+        wait = self.backoff
+        while True:
+            try:
+                r = self.upload_fn(up_path,dsid)
+                self.responses.append(r)
+                self.n_uploaded += len(recs)
+                for e in batch:
+                    os.remove(e[0])
+                break
+            except Exception as ex:
+                n_try += 1
+                msg = 'upload of {} records to data set {} failed (attempt {}): {}'.format(
+                len(recs),dsid,n_try,ex)
+                self.errors.append(msg)
+                if n_try > self.max_retries:
+                    self.n_failed += len(recs)
+                    for e in batch:
+                        shutil.move(e[0],os.path.join(self.failed_dir,os.path.basename(e[0])))
+                    break
+                with self._cond:
+                    # stop() interrupts the backoff: the batch stays queued on disk
+                    t_end = time.time()+wait
+                    while not self._stop and time.time() < t_end:
+                        self._cond.wait(t_end-time.time())
+                    if self._stop:
+                        self._pending[:0] = batch
+                        break
+                wait = min(2*wait,self.max_backoff)
+        os.remove(up_path)
+
+    def status(self):
+        """Counts of pending, uploaded and failed records, and the latest response and error."""
+        return OrderedDict(
+            n_pending=self.n_pending(),
+            n_uploaded=self.n_uploaded,
+            n_failed=self.n_failed,
+            last_response=self.responses[-1] if self.responses else None,
+            last_error=self.errors[-1] if self.errors else None)
+
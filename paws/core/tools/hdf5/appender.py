@@ -0,0 +1,181 @@
+"""
+Append batch or realtime results to one HDF5 (NeXus-style) file.
+
+Each result is a dict of named values.
+Every name becomes a dataset whose first axis is the result index,
+so that the i-th row of every dataset belongs to the i-th result.
+Datasets are chunked, compressed, and resizable along the first axis.
+Nested dicts (e.g. fit parameters) become groups of datasets.
+"""
+from __future__ import print_function
+import os
+import time
+import atexit
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import h5py
+
+def fill_value(dt):
+    """Value for the rows of a dataset that a result did not provide."""
+    if dt.kind in 'fc':
+        return np.nan
+    elif dt.kind in 'iub':
+        return 0
+    return None
+
+class H5Appender(object):
+    """
+    Append dicts of results, one row at a time, to datasets in an HDF5 file.
+
+    Parameters
+    ----------
+    file_path : str
+        path to the HDF5 file- an existing file is appended to
+    chunk_rows : int
+        maximum number of results per chunk along the first axis
+    max_chunk_bytes : int
+        maximum size of a chunk in bytes: datasets of large items
+        (e.g. images) get fewer rows per chunk, down to one row,
+        so that each append only re-compresses a small chunk
+    compression : str
+        h5py compression filter ('gzip', 'lzf', or None)
+    flush_interval : float
+        time in seconds between flushes of the file to disk
+    """
+
+    def __init__(self,file_path,chunk_rows=16,compression='gzip',flush_interval=5.,
+        max_chunk_bytes=2**20):
+        super(H5Appender,self).__init__()
+        self.file_path = file_path
+        self.chunk_rows = max(int(chunk_rows),1)
+        self.max_chunk_bytes = int(max_chunk_bytes)
+        self.compression = compression
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file = h5py.File(file_path,'a')
+        if not 'NX_class' in self._file.attrs:
+            self._file.attrs['NX_class'] = 'NXroot'
+        self._t_flush = time.time()
+
+    def n_items(self,group='entry'):
+        """Number of results that have been appended to group."""
+        with self._lock:
+            if not group in self._file:
+                return 0
+            return int(self._file[group].attrs.get('n_items',0))
+
+    def append(self,item,group='entry'):
+        """
+        Append one result (a dict of name:value)
+        as the next row of the datasets in group
+        (a NeXus NXentry, created if needed).
+        Returns the row index.
+        Values that cannot be stored as arrays (e.g. None) are skipped.
+        """
+        with self._lock:
+            grp = self._file.require_group(group)
+            if not 'NX_class' in grp.attrs:
+                grp.attrs['NX_class'] = 'NXentry'
+            idx = int(grp.attrs.get('n_items',0))
+            self._write(grp,item,idx)
+            grp.attrs['n_items'] = idx+1
+            if time.time() - self._t_flush >= self.flush_interval:
+                self._file.flush()
+                self._t_flush = time.time()
+        return idx
+
+    def _write(self,grp,item,idx):
+        for name,val in item.items():
+            name = str(name).replace('/','_')
+            if isinstance(val,dict):
+                self._write(grp.require_group(name),val,idx)
+                continue
+            a = self._as_array(val)
+            if a is None:
+                continue
+            if not name in grp:
+                self._create(grp,name,a,idx)
+            ds = grp[name]
+            if ds.shape[1:] != a.shape:
+                raise ValueError('[{}] shape {} of {} does not match dataset shape {}'
+                .format(__name__,a.shape,name,ds.shape[1:]))
+            if ds.shape[0] <= idx:
+                ds.resize(idx+1,axis=0)
+            ds[idx] = a
+
+    def _create(self,grp,name,a,idx):
+        if a.dtype.kind == 'O':
+            dt = h5py.string_dtype()
+        else:
+            dt = a.dtype
+        row_bytes = max(a.size,1)*np.dtype(dt).itemsize
+        n_rows = max(min(self.chunk_rows,self.max_chunk_bytes//row_bytes),1)
+        chunks = (n_rows,)+a.shape
+        comp = self.compression
+        # compression filters need chunks of more than one element
+        if a.dtype.kind == 'O' or a.size == 0:
+            comp = None
+        grp.create_dataset(name,shape=(idx+1,)+a.shape,maxshape=(None,)+a.shape,
+            dtype=dt,chunks=chunks,compression=comp,
+            fillvalue=fill_value(np.dtype(dt)))
+
+    @staticmethod
+    def _as_array(val):
+        if val is None:
+            return None
+        if isinstance(val,str):
+            return np.array(val,dtype=object)
+        try:
+            a = np.asarray(val)
+        except Exception:
+            return None
+        if a.dtype.kind == 'O':
+            return None
+        if a.dtype.kind == 'U':
+            return a.astype(object)
+        return a
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+            self._t_flush = time.time()
+
+    def close(self):
+        with self._lock:
+            if self._file.id.valid:
+                self._file.close()
+
+# open appenders, shared by all Operations (and threads) writing the same file
+_appenders = OrderedDict()
+_appenders_lock = threading.Lock()
+
+def open_appender(file_path,**kwargs):
+    """
+    Return the open H5Appender for file_path,
+    opening it with H5Appender(file_path,**kwargs) if needed.
+    Appenders stay open (and are flushed periodically)
+    until close_appender() is called or the interpreter exits.
+    """
+    p = os.path.abspath(file_path)
+    with _appenders_lock:
+        app = _appenders.get(p)
+        if app is None:
+            app = H5Appender(p,**kwargs)
+            _appenders[p] = app
+        return app
+
+def close_appender(file_path=None):
+    """Close the appender for file_path, or all appenders if file_path is None."""
+    with _appenders_lock:
+        if file_path is None:
+            paths = list(_appenders.keys())
+        else:
+            paths = [os.path.abspath(file_path)]
+        for p in paths:
+            app = _appenders.pop(p,None)
+            if app is not None:
+                app.close()
+
+atexit.register(close_appender)
@@ -0,0 +1,133 @@
+"""
+Process-wide cache of decoded images.
+
+Images are cached under their file path,
+and a cached image is only returned
+if the file size and modification time have not changed since it was read.
+When the total size of the cached images exceeds the byte budget,
+the least-recently-used images are evicted.
+
+Cached arrays are flagged read-only,
+since the same array is shared by every caller of get();
+load() with copy=True returns a private, writeable copy instead.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+class ImageCache(object):
+    """
+    LRU cache of decoded image arrays, keyed by (path, size, mtime).
+
+    Parameters
+    ----------
+    max_bytes : int
+        total size in bytes of the image arrays to be kept in the cache
+    """
+
+    def __init__(self,max_bytes=512*2**20):
+        super(ImageCache,self).__init__()
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # path : (size, mtime, image array)
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_signature(file_path):
+        st = os.stat(file_path)
+        return st.st_size,st.st_mtime
+
+    def get(self,file_path):
+        """
+        Return the cached image for file_path,
+        or None if it is not cached or the file has changed.
+        """
+        p = os.path.abspath(file_path)
+        sz,mt = self.file_signature(p)
+        with self._lock:
+            entry = self._images.pop(p,None)
+            if entry is not None and entry[0] == sz and entry[1] == mt:
+                # re-insert as most recently used
+                self._images[p] = entry
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self.n_bytes -= entry[2].nbytes
+            self.misses += 1
+            return None
+
+    def put(self,file_path,img,signature=None):
+        """
+        Add an image to the cache, evicting old images as needed.
+        Images larger than the whole budget are not cached.
+        Returns the (read-only) cached array.
+        """
+        p = os.path.abspath(file_path)
+        if signature is None:
+            signature = self.file_signature(p)
+        img = np.asarray(img)
+        if img.nbytes > self.max_bytes:
+            return img
+        img.flags.writeable = False
+        with self._lock:
+            old = self._images.pop(p,None)
+            if old is not None:
+                self.n_bytes -= old[2].nbytes
+            self._images[p] = (signature[0],signature[1],img)
+            self.n_bytes += img.nbytes
+            self._evict()
+        return img
+
+    def _evict(self):
+        while self.n_bytes > self.max_bytes and self._images:
+            p,entry = self._images.popitem(last=False)
+            self.n_bytes -= entry[2].nbytes
+            self.evictions += 1
+
+    def load(self,file_path,loader,copy=False):
+        """
+        Return the image for file_path from the cache,
+        or read it by calling loader(file_path) and cache it.
+        If copy is True, a writeable copy of the cached image is returned.
+        """
+        img = self.get(file_path)
+        if img is None:
+            # take the signature before reading,
+            # so that a file modified during the read is re-read next time
+            sig = self.file_signature(file_path)
+            img = self.put(file_path,loader(file_path),sig)
+        if copy:
+            return np.array(img)
+        return img
+
+    def set_max_bytes(self,max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._images = OrderedDict()
+            self.n_bytes = 0
+
+    def stats(self):
+        """Return a dict of cache usage statistics."""
+        with self._lock:
+            d = OrderedDict()
+            d['hits'] = self.hits
+            d['misses'] = self.misses
+            d['evictions'] = self.evictions
+            d['n_images'] = len(self._images)
+            d['n_bytes'] = self.n_bytes
+            d['max_bytes'] = self.max_bytes
+            return d
+
+# the process-wide image cache
+image_cache = ImageCache()
+
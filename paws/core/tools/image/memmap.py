@@ -0,0 +1,120 @@
+"""
+Memory-mapped, read-only access to uncompressed image files.
+
+A memory-mapped image is not read from disk when it is opened:
+pages of the file are read by the operating system
+only when the corresponding pixels are accessed,
+and the pages are shared (through the page cache)
+between all processes that map the same file.
+"""
+import os
+
+import numpy as np
+
+# EDF DataType values and their numpy equivalents
+edf_dtypes = {
+    'unsignedbyte':'u1','signedbyte':'i1',
+    'unsignedshort':'u2','signedshort':'i2',
+    'unsignedinteger':'u4','signedinteger':'i4',
+    'unsignedlong':'u4','signedlong':'i4',
+    'unsigned64':'u8','signed64':'i8',
+    'floatvalue':'f4','float':'f4','floatieee32':'f4',
+    'doublevalue':'f8','double':'f8','doubleieee64':'f8'}
+
+def memmap_tif(file_path):
+    """
+    Memory-map the first image of an uncompressed, contiguous TIFF file.
+
+    Returns
+    -------
+    img : numpy.memmap or None
+        read-only memory-mapped array,
+        or None if the image data cannot be memory-mapped
+        (e.g. if it is compressed or stored in non-contiguous strips)
+    """
+    import tifffile
+    try:
+        return tifffile.memmap(file_path,mode='r')
+    except ValueError:
+        return None
+
+def read_edf_header(file_path):
+    """
+    Read the first header block of an EDF file.
+
+    Returns
+    -------
+    hdr : dict
+        dict of header keys and (string) values
+    data_offset : int
+        byte offset of the first image in the file
+    """
+    with open(file_path,'rb') as f:
+        block = f.read(512)
+        if not block.lstrip().startswith(b'{'):
+            raise ValueError('{} is not an EDF file'.format(file_path))
+        hdr_bytes = block
+        while not b'}' in block:
+            block = f.read(512)
+            if not block:
+                raise ValueError('unterminated EDF header in {}'.format(file_path))
+            hdr_bytes += block
+    i_end = hdr_bytes.index(b'}')
+    data_offset = i_end+1
+    # the closing brace is followed by a newline
+    if hdr_bytes[data_offset:data_offset+1] == b'\r':
+        data_offset += 1
+    if hdr_bytes[data_offset:data_offset+1] == b'\n':
+        data_offset += 1
+    hdr = {}
+    for entry in hdr_bytes[hdr_bytes.index(b'{')+1:i_end].decode('latin-1').split(';'):
+        if '=' in entry:
+            k,v = entry.split('=',1)
+            hdr[k.strip()] = v.strip()
+    return hdr,data_offset
+
+def memmap_edf(file_path):
+    """
+    Memory-map the first image of an uncompressed EDF file.
+
+    Returns
+    -------
+    img : numpy.memmap or None
+        read-only memory-mapped array of shape (Dim_2, Dim_1),
+        or None if the image data cannot be memory-mapped
+        (e.g. if it is compressed or of an unknown data type)
+    """
+    try:
+        hdr,offset = read_edf_header(file_path)
+    except ValueError:
+        return None
+    if hdr.get('Compression','None').lower() not in ['none','nocompression']:
+        return None
+    dt = edf_dtypes.get(hdr.get('DataType','').lower())
+    if dt is None or not 'Dim_1' in hdr or not 'Dim_2' in hdr:
+        return None
+    if hdr.get('ByteOrder','LowByteFirst') == 'HighByteFirst':
+        dt = '>'+dt
+    else:
+        dt = '<'+dt
+    dt = np.dtype(dt)
+    shape = (int(hdr['Dim_2']),int(hdr['Dim_1']))
+    nbytes = shape[0]*shape[1]*dt.itemsize
+    if 'Size' in hdr and int(hdr['Size']) != nbytes:
+        return None
+    if os.path.getsize(file_path) < offset+nbytes:
+        return None
+    return np.memmap(file_path,dtype=dt,mode='r',offset=offset,shape=shape)
+
+def memmap_image(file_path):
+    """
+    Memory-map an uncompressed .tif or .edf image, based on file extension.
+    Returns None if the file cannot be memory-mapped.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in ['.tif','.tiff']:
+        return memmap_tif(file_path)
+    elif ext == '.edf':
+        return memmap_edf(file_path)
+    return None
+
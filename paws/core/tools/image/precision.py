@@ -0,0 +1,51 @@
+"""
+Floating-point precision policy for image pipelines.
+
+Each Workflow has a dtype_policy: None (the default), 'float64' or 'float32'.
+With None, image and integration Operations keep the dtypes
+they produce without a policy: float32 images stay float32,
+rotations stay views, and integrated intensities have the dtype
+of the underlying integrator.
+With 'float64' or 'float32', the floating-point images and results
+of these Operations are cast to that dtype.
+With 'float32', detector-sized arrays take half the memory and bandwidth.
+Sums over many pixels (e.g. integration bins) are still accumulated
+in accum_dtype (float64), and only the results are cast to the policy dtype.
+Integer images are not converted by ops that only rearrange pixels.
+"""
+import numpy as np
+
+dtype_policies = [None,'float64','float32']
+default_policy = None
+accum_dtype = np.float64
+
+def float_dtype(policy=None):
+    """
+    Return the numpy dtype for a dtype policy,
+    or None for the default policy (no conversion).
+    """
+    if not policy in dtype_policies:
+        raise ValueError('[{}] dtype policy {} is not one of {}'
+        .format(__name__,policy,dtype_policies))
+    if policy is None:
+        return None
+    return np.dtype(policy)
+
+def as_float(x,policy=None):
+    """
+    Return x as an array of the policy dtype, copying only if needed.
+    With the default policy, x is returned as an array of its own dtype.
+    """
+    return np.asarray(x,dtype=float_dtype(policy))
+
+def cast_float(x,policy=None):
+    """
+    Return a floating-point array x as an array of the policy dtype,
+    copying only if needed. Non-floating-point arrays,
+    and all arrays under the default policy, are returned unchanged.
+    """
+    x = np.asarray(x)
+    dtype = float_dtype(policy)
+    if dtype is not None and np.issubdtype(x.dtype,np.floating):
+        return x.astype(dtype,copy=False)
+    return x
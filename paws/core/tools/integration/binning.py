@@ -0,0 +1,275 @@
+"""
+Pure-numpy radial and azimuthal binning engine.
+
+The pixel positions (q or two-theta, and chi) and the solid angle
+and polarization corrections are computed in numpy
+from pyFAI-style calibration parameters (a poni_dict),
+following the pyFAI geometry conventions.
+The pixel-to-bin matrix is then built once per geometry, mask and binning
+(see paws.core.tools.integration.lut),
+after which integrating a frame is a single sparse matrix-vector product,
+and integrating a stack of N frames is a single matrix-matrix product.
+This is a fallback for when pyFAI or its compiled integrators are not available:
+the results equal pyFAI's histogram integration without pixel splitting.
+"""
+from __future__ import print_function
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .keys import integrator_key, mask_digest
+from . import lut as lutmod
+
+# radial units: (name of the position array, scale factor)
+radial_units = {
+    'q_A^-1':('q_nm^-1',0.1),
+    'q_nm^-1':('q_nm^-1',1.),
+    '2th_deg':('2th',180./np.pi),
+    '2th_rad':('2th',1.),
+    'r_mm':('r',1.E3),
+    'r_m':('r',1.)}
+
+def geometry_arrays(poni_dict,shape,polz_factor=None):
+    """
+    Compute pixel-center positions and corrections for a detector geometry.
+
+    Parameters
+    ----------
+    poni_dict : dict
+        calibration parameters, as from pyFAI.AzimuthalIntegrator.getPyFAI():
+        dist, poni1, poni2, rot1, rot2, rot3 (meters, radians),
+        pixel1, pixel2 (meters), and wavelength (meters)
+    shape : tuple
+        detector shape (rows, columns)
+    polz_factor : float, optional
+        polarization factor- if given, the polarization correction is computed
+
+    Returns
+    -------
+    arrs : dict
+        arrays of shape `shape`: '2th' and 'chi' (radians), 'q_nm^-1',
+        'r' (meters from the beam center, in the detector plane),
+        'solid_angle' (relative to the point of normal incidence),
+        and 'polarization' if polz_factor is given
+    """
+    for k in ['dist','poni1','poni2','pixel1','pixel2']:
+        if poni_dict.get(k) is None:
+            raise ValueError('[{}] poni_dict needs a value for {}'.format(__name__,k))
+    L = float(poni_dict['dist'])
+    p1 = (np.arange(shape[0])+0.5)*float(poni_dict['pixel1'])-float(poni_dict['poni1'])
+    p2 = (np.arange(shape[1])+0.5)*float(poni_dict['pixel2'])-float(poni_dict['poni2'])
+    p1 = p1[:,np.newaxis]
+    p2 = p2[np.newaxis,:]
+    rots = [float(poni_dict.get(k) or 0.) for k in ['rot1','rot2','rot3']]
+    c1,c2,c3 = [np.cos(r) for r in rots]
+    s1,s2,s3 = [np.sin(r) for r in rots]
+    t1 = p1*c2*c3 + p2*(c3*s1*s2 - c1*s3) - L*(c1*c3*s2 + s1*s3)
+    t2 = p1*c2*s3 + p2*(c1*c3 + s1*s2*s3) - L*(-c3*s1 + c1*s2*s3)
+    t3 = p1*s2 - p2*c2*s1 + L*c1*c2
+    rho = np.sqrt(t1**2+t2**2)
+    tth = np.arctan2(rho,t3)
+    arrs = {}
+    arrs['2th'] = tth
+    arrs['chi'] = np.arctan2(t1,t2)
+    arrs['r'] = L*np.tan(tth)
+    if poni_dict.get('wavelength'):
+        arrs['q_nm^-1'] = 4.E-9*np.pi/float(poni_dict['wavelength'])*np.sin(tth/2)
+    arrs['solid_angle'] = (L/np.sqrt(L**2+p1**2+p2**2))**3
+    if polz_factor is not None:
+        arrs['polarization'] = 0.5*(1.+np.cos(tth)**2
+            -polz_factor*np.cos(2*arrs['chi'])*np.sin(tth)**2)
+    return arrs
+
+def radial_positions(arrs,unit):
+    """Radial position of each pixel in the given unit."""
+    if not unit in radial_units:
+        raise ValueError('[{}] unit {} is not one of {}'
+        .format(__name__,unit,list(radial_units.keys())))
+    nm,scl = radial_units[unit]
+    if not nm in arrs:
+        raise ValueError('[{}] unit {} needs a wavelength'.format(__name__,unit))
+    return arrs[nm]*scl
+
+class BinningEngine(object):
+    """
+    Radial (and optionally azimuthal) integration for one geometry,
+    detector shape, mask, binning and set of corrections.
+
+    The pixel-to-bin lookup table is built on the first use,
+    or loaded (memory-mapped) from the paws scratch directory
+    if another engine has already saved it.
+
+    Parameters
+    ----------
+    poni_dict : dict
+        calibration parameters (see geometry_arrays())
+    shape : tuple
+        detector shape
+    npt_rad : int
+        number of radial bins
+    npt_azim : int, optional
+        number of azimuthal bins, for 2d integration
+    unit : str
+        radial unit- one of the keys of radial_units
+    polz_factor : float, optional
+        polarization factor
+    mask : array, optional
+        mask in the pyFAI convention (nonzero pixels are masked)
+    correct_solid_angle : bool
+        whether to normalize by the pixel solid angles
+    persist : bool
+        whether to save and load the lookup table in the scratch directory
+    """
+
+    def __init__(self,poni_dict,shape,npt_rad,npt_azim=None,unit='q_A^-1',
+        polz_factor=None,mask=None,correct_solid_angle=True,persist=True):
+        super(BinningEngine,self).__init__()
+        self.poni_dict = dict(poni_dict)
+        self.shape = tuple(int(s) for s in shape)
+        self.npt_rad = int(npt_rad)
+        self.npt_azim = None if npt_azim is None else int(npt_azim)
+        self.unit = unit
+        self.polz_factor = polz_factor
+        self.mask = mask
+        self.correct_solid_angle = correct_solid_angle
+        self.persist = persist
+        self._lut = None
+
+    def key(self):
+        return lutmod.lut_key('binning',integrator_key(self.poni_dict,self.shape,self.mask),
+            self.npt_rad,self.npt_azim,str(self.unit),self.polz_factor,
+            bool(self.correct_solid_angle))
+
+    def build(self):
+        """Build the pixel-to-bin lookup table."""
+        arrs = geometry_arrays(self.poni_dict,self.shape,self.polz_factor)
+        rad = radial_positions(arrs,self.unit)
+        w = np.ones(self.shape)
+        if self.correct_solid_angle:
+            w = w*arrs['solid_angle']
+        if self.polz_factor is not None:
+            w = w*arrs['polarization']
+        if self.npt_azim is None:
+            return lutmod.build_lut(rad,self.npt_rad,w,self.mask)
+        return lutmod.build_lut2d(rad,self.npt_rad,np.rad2deg(arrs['chi']),
+            self.npt_azim,w,self.mask)
+
+    @property
+    def lut(self):
+        if self._lut is None:
+            if self.persist:
+                self._lut = lutmod.cached_lut(self.key(),self.build)
+            else:
+                self._lut = self.build()
+        return self._lut
+
+    @property
+    def radial(self):
+        """Radial bin centers."""
+        return np.array(self.lut.centers)
+
+    @property
+    def azimuthal(self):
+        """Azimuthal bin centers in degrees, for 2d integration."""
+        if self.lut.azim_centers is None:
+            return None
+        return np.array(self.lut.azim_centers)
+
+    def integrate(self,data,n_threads=1,tile_rows=None,dtype=None):
+        """
+        Integrate an image, or a stack of images, of shape (...,)+shape.
+        Returns intensities of shape (...,npt_rad) for 1d integration,
+        or (...,npt_azim,npt_rad) for 2d integration.
+        With n_threads > 1 (or a tile_rows), the images are binned
+        in row tiles on a pool of threads (see lut.PixelLUT.bin_sums()).
+        Bins are summed in float64, and the result is cast to dtype, if given.
+        """
+        data = np.asarray(data)
+        if data.shape[-2:] != self.shape:
+            raise ValueError('[{}] data of shape {} does not match detector shape {}'
+            .format(__name__,data.shape,self.shape))
+        return self.lut.integrate(data,n_threads,tile_rows,dtype)
+
+    def integrate1d(self,data,n_threads=1,tile_rows=None,dtype=None):
+        """Return (radial, I) for an image or stack of images."""
+        return self.radial,self.integrate(data,n_threads,tile_rows,dtype)
+
+    def integrate2d(self,data,n_threads=1,tile_rows=None,dtype=None):
+        """Return (I, radial, azimuthal) for an image or stack of images, like pyFAI."""
+        return self.integrate(data,n_threads,tile_rows,dtype),self.radial,self.azimuthal
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+max_engines = 8
+
+def get_engine(poni_dict,shape,npt_rad,npt_azim=None,unit='q_A^-1',
+    polz_factor=None,mask=None,correct_solid_angle=True):
+    """
+    Return a shared BinningEngine for the given arguments,
+    keeping the most recently used engines in memory.
+    """
+    eng = BinningEngine(poni_dict,shape,npt_rad,npt_azim,unit,
+        polz_factor,mask,correct_solid_angle)
+    k = eng.key()
+    with _engines_lock:
+        eng = _engines.pop(k,eng)
+        _engines[k] = eng
+        while len(_engines) > max_engines:
+            _engines.popitem(last=False)
+    return eng
+
+_pixel_luts = OrderedDict()
+
+def _cached_pixel_lut(key,build_fn):
+    with _engines_lock:
+        l = _pixel_luts.pop(key,None)
+    if l is None:
+        l = build_fn()
+    with _engines_lock:
+        _pixel_luts[key] = l
+        while len(_pixel_luts) > max_engines:
+            _pixel_luts.popitem(last=False)
+    return l
+
+def radial_pixel_lut(shape,center_index,mask=None):
+    """
+    LUT that bins pixels by integer distance (in pixels) from center_index.
+    Here mask is nonzero for the pixels to be counted.
+    """
+    shape = tuple(int(s) for s in shape)
+    key = (shape,tuple(float(c) for c in center_index),mask_digest(mask))
+    def build():
+        x = np.arange(shape[0])[:,np.newaxis]-center_index[0]
+        y = np.arange(shape[1])[np.newaxis,:]-center_index[1]
+        r = np.sqrt(x**2+y**2).astype(np.int64)
+        valid = np.ones(r.size,dtype=bool) if mask is None else np.asarray(mask).astype(bool).ravel()
+        return lutmod.lut_from_bins(shape,r.ravel(),valid,int(r.max())+1)
+    return _cached_pixel_lut(key,build)
+
+def azimuthal_pixel_lut(shape,center_index,r_idx_limits=None,mask=None,chires=30):
+    """
+    LUT that bins pixels by azimuthal angle about center_index,
+    in bins of 1/chires radians, from -pi/2 to pi/2,
+    counting only pixels with r_idx_limits[0] < radius < r_idx_limits[1].
+    Here mask is nonzero for the pixels to be counted.
+    """
+    shape = tuple(int(s) for s in shape)
+    lims = None if r_idx_limits is None else tuple(float(l) for l in r_idx_limits)
+    key = (shape,tuple(float(c) for c in center_index),lims,mask_digest(mask),float(chires))
+    def build():
+        x = np.arange(shape[0])[:,np.newaxis]-center_index[0]+np.zeros(shape)
+        y = np.arange(shape[1])[np.newaxis,:]-center_index[1]+np.zeros(shape)
+        valid = np.ones(shape,dtype=bool) if mask is None else np.asarray(mask).astype(bool)
+        if lims is not None:
+            r = np.sqrt(x**2+y**2)
+            valid = valid & (r > lims[0]) & (r < lims[1])
+        with np.errstate(divide='ignore',invalid='ignore'):
+            chi = np.arctan(y/x)
+        # the center pixel
+        chi[np.isnan(chi)] = 0.
+        chi_idx = np.round(chires*(chi+np.pi/2)).astype(np.int64)
+        n_chi = int(np.round(chires*np.pi))+1
+        return lutmod.lut_from_bins(shape,chi_idx.ravel(),valid.ravel(),n_chi)
+    return _cached_pixel_lut(key,build)
+
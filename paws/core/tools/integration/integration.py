@@ -1,6 +1,15 @@
+import threading
+from collections import OrderedDict
+
 import numpy as np
 import pyFAI
 
+from .registry import get_integrator
+from .keys import integrator_key
+from . import binning
+from . import masks
+from . import remesh
+
 def radial_index(image_data,center_index):
     """Compute radial indices for an array about a given center.
 
@@ -19,15 +28,20 @@ def radial_index(image_data,center_index):
     """
     x, y = np.indices(image_data.shape)
     idx_rad = np.sqrt((x-center_index[0])**2+(y-center_index[1])**2)
-    return idx_rad.astype(np.int)
+    return idx_rad.astype(int)
 
-def radial_pixel_bin(image_data, center_index, mask=None):
+def radial_pixel_bin(image_data, center_index, mask=None, dtype=None):
     """Compute the radial intensity profile of an image.
 
+    The pixel-to-bin table for the image shape, center and mask
+    is computed once and cached (see binning.radial_pixel_lut),
+    so profiles of a series of images cost one pass over each image.
+
     Parameters
     ----------
     image_data : array
-        2d array of image data
+        2d array of image data,
+        or a 3d array (stack) of images of the same shape
     center_index : array 
         1d array containing two values: x and y indices 
         of the pixel to be used as the center of image_data 
@@ -35,156 +49,227 @@ def radial_pixel_bin(image_data, center_index, mask=None):
         array of same shape as image_data,
         where a value of true indicates
         that the pixel is to be counted
+    dtype : numpy dtype, optional
+        dtype of I_rad (default float64)- bins are summed in float64
  
     Returns
     -------
     idx_rad : array
         1d array of radial indices generated for the image
     I_rad : array
-        1d array of intensity values corresponding to idx_rad 
+        1d array of intensity values corresponding to idx_rad,
+        or 2d array (one row per image) for a stack.
+        Bins with no counted pixels are zero.
     """
-    if mask is None:
-        mask = np.ones_like(image_data)
-    dmsk = image_data * (mask)
-    
-    # index the image radially, then bin-count intensity
-    r = radial_index(dmsk,center_index)
-    I_rad = np.bincount(r.ravel(), dmsk.ravel())
-    # normalize counted intensity by the number of contributing pixels
-    npts = np.bincount(r.ravel(), (mask).ravel())
-    I_rad = I_rad / npts
-    return np.range(0,len(I_rad),1),I_rad 
+    lut = binning.radial_pixel_lut(np.shape(image_data)[-2:],center_index,mask)
+    return np.arange(lut.n_bins),lut.integrate(image_data,dtype=dtype)
 
+def azimuthal_pixel_bin(image_data, center_index, r_idx_limits=None, mask=None, chires=30, dtype=None):
+    """Compute the azimuthal intensity profile of an image.
 
-def azimuthal_pixel_bin(image_data, center_pixel, r_idx_limits=None, mask=None, chires=30):
-    if mask is None:
-        mask = np.ones_like(image_data)
-    
-    r = radial_index(dmsk,center_index)
-    #rmask = ((r>rlo) & (r<rhi) & (x < cen[0])).astype(np.int)
-    # NOTE: LAP removed this x<center limit.
-    # was it there to speed up x-symmetric processing?
-    rmask = ((r>r_idx_limits[0]) & (r<r_idx_limits[1])).astype(np.int)
-    mask *= rmask
-    dmsk = image_data * (mask)
-
-    chi = azimuthal_index()
-
-    chi = chires * np.arctan((y - cen[1]) / (x - cen[0]))
-    chi += chires * np.pi / 2.
-    chi = np.round(chi).astype(np.int)
-    chi *= (chi > 0)
-
-    tbin = np.bincount(chi.ravel(), data.ravel())
-    npts = np.bincount(chi.ravel(), rmask.ravel())
-    I_chi = I_chi / npts 
-    return np.range(0,len(I_chi),1),I_chi 
-
-    # vimodel = pymodelfit.builtins.GaussianModel()
-    # vimodel.mu = np.pi / 2 * 100
-    # vimodel.A = np.nanmax(angleprofile)
-    # vimodel.fitData(x=np.arange(np.size(angleprofile)), y=angleprofile, weights=angleprofile)
-    # vimodel.plot(lower=0, upper=np.pi * 100)
-    # print ('len:',len(angleprofile))
-
-    #x, y = np.indices(data.shape).astype(np.float)
-    #r = np.sqrt((x - center_pixel[0]) ** 2 + (y - center_pixel[1]) ** 2)
-    #r = r.astype(np.int)
+    Parameters
+    ----------
+    image_data : array
+        2d array of image data,
+        or a 3d array (stack) of images of the same shape
+    center_index : array 
+        1d array containing two values: x and y indices 
+        of the pixel to be used as the center of image_data 
+    r_idx_limits : array, optional
+        minimum and maximum radial index (exclusive) of the pixels to be counted
+    mask : array, optional
+        array of same shape as image_data,
+        where a value of true indicates
+        that the pixel is to be counted
+    chires : float
+        number of azimuthal bins per radian
+    dtype : numpy dtype, optional
+        dtype of I_chi (default float64)- bins are summed in float64
 
+    Returns
+    -------
+    idx_chi : array
+        1d array of azimuthal indices-
+        bin i is centered at i/chires-pi/2 radians
+    I_chi : array
+        1d array of intensity values corresponding to idx_chi,
+        or 2d array (one row per image) for a stack.
+        Bins with no counted pixels are zero.
+    """
+    lut = binning.azimuthal_pixel_lut(np.shape(image_data)[-2:],center_index,
+        r_idx_limits,mask,chires)
+    return np.arange(lut.n_bins),lut.integrate(image_data,dtype=dtype)
 
 def radialintegratepyFAI(data, mask=None, AIdict=None, cut=None, color=[255, 255, 255], requestkey = None, q_norm = None, q_par = None, nq=None):
-    AI = pyFAI.AzimuthalIntegrator()
-    AI.setPyFAI(**AIdict)
-
-    if mask is not None:
-        mask = mask.copy()
+    """Radial (q) profile of an image, integrated with pyFAI.
 
-    if not mask.shape == data.shape:
-        mask = np.ones_like(data)
-
-    if cut is not None and type(cut) is np.ndarray:
-        mask = mask.astype(bool) & cut.astype(bool)
-
-    (q, radialprofile) = AI.integrate1d(data.T, nbins, mask=1 - mask.T, method='cython')  #pyfai uses 0-valid mask
+    data is indexed (column, row), so it is transposed for pyFAI.
+    mask and cut are nonzero for the pixels to be counted,
+    and are ignored if their shape differs from that of data.
+    nq is the number of q points (default 1000).
+    Returns q (1/Angstrom), the profile, color and requestkey.
+    """
+    AI = get_integrator(AIdict)
+    if nq is None:
+        nq = 1000
+    valid = _valid_lines(np.shape(data), mask, cut)
+    # pyfai masks are nonzero for the excluded pixels
+    pyfai_mask = None if valid is None else np.logical_not(valid).T
+    q, radialprofile = AI.integrate1d(data.T, nq, mask=pyfai_mask, method='cython')
     q = q/10.
-    #return q.tolist(), radialprofile.tolist(), color, requestkey
+    return q.tolist(), radialprofile.tolist(), color, requestkey
 
 
 def chiintegratepyFAI(data, mask, AIdict, cut=None, color=[255, 255, 255], requestkey = None, q_norm = None, q_par = None, nq = None, nchi = None):
-    AI = pyFAI.AzimuthalIntegrator()
-    AI.setPyFAI(**AIdict)
-    # Always do mask with 1-valid, 0's excluded
-
-    if mask is not None:
-        mask = mask.copy()
-
-
-    if not mask.shape == data.shape:
-        mask = np.ones_like(data)
-
-    if cut is not None:
-        mask &= cut.astype(bool)
-    # data *= cut
-
-
-    cake, q, chi = AI.integrate2d(data.T, xres, yres, method='cython')
-    mask, q, chi = AI.integrate2d(mask.T, xres, yres, method='cython')
-
-    maskedcake = np.ma.masked_array(cake, mask=mask<=0)
-
+    """Azimuthal (chi) profile of an image, integrated with pyFAI.
+
+    data is indexed (column, row), so it is transposed for pyFAI.
+    mask and cut are nonzero for the pixels to be counted,
+    and are ignored if their shape differs from that of data.
+    The image is caked onto nq (default 1000) q points
+    and nchi (default 360) chi points, and the cake is averaged over q,
+    leaving out the bins with no counted pixels.
+    Returns chi (degrees), the profile, color and requestkey.
+    """
+    AI = get_integrator(AIdict)
+    if nq is None:
+        nq = 1000
+    if nchi is None:
+        nchi = 360
+    valid = _valid_lines(np.shape(data), mask, cut)
+    if valid is None:
+        valid = np.ones(np.shape(data), dtype=bool)
+    cake, q, chi = AI.integrate2d(data.T, nq, nchi, mask=np.logical_not(valid).T, method='cython')
+    # fraction of counted pixels in each bin
+    counted, q, chi = AI.integrate2d(valid.T.astype(float), nq, nchi, method='cython')
+    maskedcake = np.ma.masked_array(cake, mask=counted<=0)
     chiprofile = np.ma.average(maskedcake, axis=1)
-
     return chi.tolist(), chiprofile.tolist(), color, requestkey
 
-def xintegrate(data, mask, AIdict, cut=None, color=[255, 255, 255], requestkey = None, q_norm = None, q_par = None):
-    if mask is not None:
-        mask = mask.copy()
-
-
-    if not mask.shape == data.shape:
-        mask = np.ones_like(data)
-
-    if cut is not None:
-        mask &= cut.astype(bool)
-    # data *= cut
-
-
-    maskeddata = np.ma.masked_array(data, mask=1-mask)
-
-    xprofile = np.ma.average(maskeddata, axis=1)
-
-    AI = pyFAI.AzimuthalIntegrator()
-    AI.setPyFAI(**AIdict)
-    qx = AI.qArray(data.shape[::-1])[int(AI.getFit2D()['centerY']),:]/10
-    qx[:qx.argmin()]*=-1
-
-    return qx.tolist(), xprofile.tolist(), color, requestkey
-
-
-def zintegrate(data, mask, AIdict, cut=None, color=[255, 255, 255], requestkey = None, q_norm = None, q_par = None):
-    if mask is not None:
-        mask = mask.copy()
-
+def _valid_lines(shape, mask=None, cut=None):
+    """
+    The cached combination (see masks.combined_mask) of an image mask
+    and an ROI cut (both nonzero for counted pixels) of the given image shape,
+    or None if neither is given. Arrays of another shape are ignored.
+    """
+    shape = tuple(shape)
+    return masks.combined_mask(shape,
+        valid=[m for m in [mask, cut] if m is not None and np.shape(m) == shape])
 
-    if not mask.shape == data.shape:
-        mask = np.ones_like(data)
-
-    if cut is not None:
-        mask &= cut.astype(bool)
-    # data *= cut
+def line_mean(data, axis, mask=None, cut=None, dtype=None):
+    """Average the counted pixels of an image along one of its axes.
 
+    Parameters
+    ----------
+    data : array
+        2d array of image data,
+        or an array (stack) of images with the image axes last
+    axis : int
+        image axis (0 for rows, 1 for columns) to average over
+    mask : array, optional
+        array of the image shape, nonzero for the pixels to be counted
+    cut : array, optional
+        ROI array of the image shape, nonzero for the pixels to be counted
+    dtype : numpy dtype, optional
+        dtype of the result (default float64)-
+        the pixels are summed in float64 in any case
 
-    maskeddata = np.ma.masked_array(data, mask=1-mask)
+    Returns
+    -------
+    I : array
+        average of the counted pixels along the other image axis,
+        with one row per image for a stack.
+        Lines with no counted pixels are zero.
+    """
+    data = np.asarray(data)
+    ax = axis-2
+    valid = _valid_lines(data.shape[-2:], mask, cut)
+    if valid is None:
+        I = np.add.reduce(data, axis=ax, dtype=np.float64)/float(data.shape[ax])
+    else:
+        # einsum multiplies and reduces without a temporary image
+        sums = np.einsum('...ij,ij->...'+('j' if axis == 0 else 'i'), data, valid,
+            dtype=np.float64)
+        counts = np.add.reduce(valid, axis=ax)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            I = sums/counts
+        I[..., counts == 0] = 0.
+    if dtype is not None:
+        I = I.astype(dtype, copy=False)
+    return I
+
+# q axes through the beam center, keyed by geometry and image shape
+_line_axes = OrderedDict()
+_line_axes_lock = threading.Lock()
+max_line_axes = 8
+
+def line_axes(AIdict, shape):
+    """
+    Signed q (1/Angstrom) along the image row and the image column
+    through the beam center, for pyFAI calibration parameters AIdict.
+    q is negative on the low-index side of the beam center.
+    The axes are computed once per geometry and image shape.
+    """
+    shape = tuple(int(s) for s in shape)
+    key = integrator_key(AIdict, shape)
+    with _line_axes_lock:
+        axes = _line_axes.pop(key, None)
+    if axes is None:
+        arrs = binning.geometry_arrays(AIdict, shape)
+        q = arrs['q_nm^-1']/10.
+        r0, c0 = np.unravel_index(np.argmin(arrs['2th']), shape)
+        q_row = q[r0, :].copy()
+        q_row[:c0] *= -1
+        q_col = q[:, c0].copy()
+        q_col[:r0] *= -1
+        axes = (q_row, q_col)
+        for a in axes:
+            a.flags.writeable = False
+    with _line_axes_lock:
+        _line_axes[key] = axes
+        while len(_line_axes) > max_line_axes:
+            _line_axes.popitem(last=False)
+    return axes
+
+def xintegrate(data, mask=None, AIdict=None, cut=None, dtype=None):
+    """Horizontal line cut: average an image over its rows.
 
-    xprofile = np.ma.average(maskeddata, axis=0)
+    Parameters
+    ----------
+    data : array
+        2d array of image data, or a stack of images
+    mask : array, optional
+        nonzero for the pixels to be counted
+    AIdict : dict
+        pyFAI calibration parameters (pyFAI.AzimuthalIntegrator.getPyFAI())
+    cut : array, optional
+        ROI, nonzero for the pixels to be counted
+    dtype : numpy dtype, optional
+        dtype of the intensities (see line_mean())
 
-    AI = pyFAI.AzimuthalIntegrator()
-    AI.setPyFAI(**AIdict)
-    qz = AI.qArray(data.shape[::-1])[:,int(AI.getFit2D()['centerX'])]/10
-    qz[:qz.argmin()]*=-1
+    Returns
+    -------
+    qx : array
+        signed q (1/Angstrom) along the row through the beam center
+    I_qx : array
+        average intensity in each column
+    """
+    qx = line_axes(AIdict, np.shape(data)[-2:])[0]
+    return qx, line_mean(data, 0, mask, cut, dtype)
 
-    return qz.tolist(), xprofile.tolist(), color, requestkey
+def zintegrate(data, mask=None, AIdict=None, cut=None, dtype=None):
+    """Vertical line cut: average an image over its columns.
+    Arguments are as for xintegrate().
 
+    Returns
+    -------
+    qz : array
+        signed q (1/Angstrom) along the column through the beam center
+    I_qz : array
+        average intensity in each row
+    """
+    qz = line_axes(AIdict, np.shape(data)[-2:])[1]
+    return qz, line_mean(data, 1, mask, cut, dtype)
 
 def cake(imgdata, experiment, mask=None,  xres=None, yres=None):
     if mask is None:
@@ -195,18 +280,11 @@ def cake(imgdata, experiment, mask=None,  xres=None, yres=None):
 
 
 def GetArc(Imagedata, center, radius1, radius2, angle1, angle2):
-    mask = np.zeros_like(Imagedata)
-
-    centerx = center[0]
-    centery = center[1]
-    y, x = np.indices(Imagedata.shape)
-    r = np.sqrt((x - centerx) ** 2 + (y - centery) ** 2)
-    mask = (r > radius1) & (r < radius2)
-    theta = np.arctan2(y - centery, x - centerx) / 2 / np.pi * 360
-    mask &= (theta > angle1) & (theta < angle2)
-
-    mask = np.flipud(mask)
-    return mask * Imagedata
+    """Mask an image to an arc about center (column, row),
+    using the cached arc ROI (see masks.arc_roi).
+    The ROI is flipped vertically: rows are counted from the bottom of the image."""
+    roi = masks.arc_roi(np.shape(Imagedata), center, radius1, radius2, angle1, angle2)
+    return roi[::-1] * Imagedata
 
 def qintegrate(*args,**kwargs):
     # if dimg.cakemode:
@@ -214,114 +292,67 @@ def qintegrate(*args,**kwargs):
     # else:
     return radialintegratepyFAI(*args,**kwargs)
 
-def cakexintegrate(data, mask=None, cut=None, q_norm = None, q_par = None, npts_chi = None):
-    if mask is None: 
-        mask = np.ones_like(data)
-    if cut is not None:
-        mask &= cut.astype(bool)
-
-    chi = np.arange(-180,180,360./npts_chi)
-    maskeddata = np.ma.masked_array(data, mask=1-mask)
-    xprofile = np.ma.average(maskeddata, axis=1)
-
-    return chi.tolist(), xprofile.tolist(), color, requestkey
-
-def cakezintegrate(data, mask=None, cut=None, q_norm = None, q_par = None, npts_q=None):
-    if mask is None: 
-        mask = np.ones_like(data)
-    if cut is not None:
-        mask &= cut.astype(bool)
-    q = np.arange(npts_q)*np.max(q_par)/ 10./npts_q
+def cakexintegrate(data, mask=None, cut=None, chi=None, dtype=None):
+    """Azimuthal profile of a cake (an image in (chi, q), as from pyFAI integrate2d).
 
-    maskeddata = np.ma.masked_array(data, mask=1-mask)
-    zprofile = np.ma.average(maskeddata, axis=0)
+    Parameters
+    ----------
+    data : array
+        2d cake of shape (n_chi, n_q), or a stack of cakes
+    mask : array, optional
+        nonzero for the cake pixels to be counted
+    cut : array, optional
+        ROI, nonzero for the cake pixels to be counted
+    chi : array, optional
+        chi (degrees) of each cake row-
+        defaults to n_chi equal steps from -180 degrees
+    dtype : numpy dtype, optional
+        dtype of the intensities (see line_mean())
 
-    return q, zprofile
+    Returns
+    -------
+    chi : array
+        chi of each cake row
+    I_chi : array
+        average intensity over q in each cake row
+    """
+    n_chi = np.shape(data)[-2]
+    if chi is None:
+        chi = np.arange(n_chi)*360./n_chi-180.
+    return np.asarray(chi), line_mean(data, 1, mask, cut, dtype)
 
-def calc_q_range(image_shape, pixel_shape, image_center, geom_pyfai, alpha_i):
-    """Compute the q-range represented by an image, given geometric parameters.
+def cakezintegrate(data, mask=None, cut=None, q=None, dtype=None):
+    """Radial profile of a cake (an image in (chi, q), as from pyFAI integrate2d).
 
     Parameters
     ----------
-    image_shape : array
-        array of two integers, representing 
-        the horizontal and vertical image dimensions
-    pixel_shape : array
-        array of two floats, representing
-        the horizontal and vertical pixel shape,
-        in meters
-    image_center : array
-        array of two integers, representing
-        the indices of the central pixel of the image
-    geom_pyfai : PyFAI.Geometry
-        a PyFAI.Geometry object 
-        defining the sample/detector geometry.
-    alpha_i : float
-        beam-to-surface incident angle
+    data : array
+        2d cake of shape (n_chi, n_q), or a stack of cakes
+    mask : array, optional
+        nonzero for the cake pixels to be counted
+    cut : array, optional
+        ROI, nonzero for the cake pixels to be counted
+    q : array, optional
+        q of each cake column (default: column indices)
+    dtype : numpy dtype, optional
+        dtype of the intensities (see line_mean())
 
     Returns
     -------
-    q_range : array
-        four floats representing the minima and maxima
-        of the q-ranges represented by the image:
-        [min(q_par),max(q_par),min(q_norm),max(q_norm)]
+    q : array
+        q of each cake column
+    I_q : array
+        average intensity over chi in each cake column
     """
-
-    # PyFAI geometry params are in meters, radians 
-    sdd = geom_pyfai.get_dist() 
-    wavelen = geometry.get_wavelength() 
-    pixel1 = geometry.get_pixel1() 
-    pixel2 = geometry.get_pixel2() 
-
-    # calculate q-range for the image
-    y = np.array([0, image_shape[1] - 1], dtype=np.float) * pixel_shape[1] 
-    z = np.array([0, image_shape[0] - 1], dtype=np.float) * pixel_shape[2]
-    y, z = np.meshgrid(y, z)
-    y -= cen[0]
-    z -= cen[1]
-
-    # calculate angles 
-    tmp = np.sqrt(y ** 2 + sdd ** 2)
-    cos2theta = sdd / tmp
-    sin2theta = y / tmp
-    tmp = np.sqrt(z ** 2 + y ** 2 + sdd ** 2)
-    cosalpha = sdd / tmp
-    sinalpha = z / tmp
-    k0 = 2. * np.pi / wavelen
-
-    # calculate q-values of each corner
-    qx = k0 * (cosalpha * cos2theta - np.cos(alpha_i))
-    qy = k0 * cosalpha * sin2theta
-    qz = k0 * (sinalpha + np.sin(alpha_i))
-    qp = np.sign(qy) * np.sqrt(qx ** 2 + qy ** 2)
-    q_range = [qp.min(), qp.max(), qz.min(), qz.max()]
-    return q_range
+    if q is None:
+        q = np.arange(np.shape(data)[-1])
+    return np.asarray(q), line_mean(data, 0, mask, cut, dtype)
 
 def remeshqarray(image, geometry, alpha_i):
-    shape = image.shape
-    center = np.zeros(2, dtype=np.float)
-    pixel = np.zeros(2, dtype=np.float)
-
-    # get calibrated parameters
-    nanometer = 1.0E+09
-    pixel[0] = geometry.get_pixel1() * nanometer
-    pixel[1] = geometry.get_pixel2() * nanometer
-    center[0] = geometry.get_poni2() * nanometer
-    center[1] = shape[0] * pixel[0] - geometry.get_poni1() * nanometer
-
-    # calculate q values
-    qrange = calc_q_range(image.shape, geometry, alpha_i, center)
-
-    # uniformly spaced q-values for remeshed image
-    nqz = image.shape[0]
-    dqz = (qrange[3] - qrange[2]) / (nqz - 1)
-    nqp = np.int((qrange[1] - qrange[0]) / dqz)
-    qvrt = np.linspace(qrange[2], qrange[3], nqz)
-    qpar = qrange[0] + np.arange(nqp) * dqz
-    qpar, qvrt = np.meshgrid(qpar, qvrt)
-
-    return np.rot90(qpar, 3), np.rot90(qvrt, 3)
-
+    """q_par and q_norm (1/nm) at each pixel of the remeshed image
+    (see remesh.remesh())."""
+    m = remesh.remesh_map(np.shape(image), geometry, alpha_i)
+    return np.rot90(m.qpar, 3), np.rot90(m.qvrt, 3)
 
 def remeshqintegrate(data, AIdict, mask=None, cut=None, q_norm = None, q_par = None, alpha_i = None):
 
@@ -342,7 +373,7 @@ def remeshqintegrate(data, AIdict, mask=None, cut=None, q_norm = None, q_par = N
     qsquared=q_par**2 + q_norm**2
     remeshcenter=np.unravel_index(qsquared.argmin(),qsquared.shape)
 
-    print 'center?:',remeshcenter
+    print('center?:',remeshcenter)
 
     f2d=AI.getFit2D()
     f2d['centerX']=remeshcenter[0]
@@ -374,34 +405,53 @@ def remeshchiintegrate(data, AIdict, mask=None,cut=None, q_norm = None, q_par =
 
     return chiintegratepyFAI(data,mask,AIdict,cut,color,requestkey, q_norm = None, q_par = None)
 
-def remeshxintegrate(data, mask, AIdict, cut=None, color=[255, 255, 255], requestkey=None, q_norm = None, q_par = None):
-    AI = pyFAI.AzimuthalIntegrator()
-    AI.setPyFAI(**AIdict)
+def _remesh_axis(q, axis):
+    # q_par varies along the rows of a remeshed image, q_norm along its columns
+    q = np.asarray(q)
+    if q.ndim == 2:
+        q = q[:, 0] if axis == 0 else q[0, :]
+    return q/10.
 
-    if not mask.shape == data.shape:
-        mask = np.ones_like(data)
+def remeshxintegrate(data, mask=None, cut=None, q_norm=None, q_par=None, dtype=None):
+    """q_par line cut of a remeshed GIXS image (see remesh.remesh()):
+    average over q_norm, i.e. over the columns of the image.
 
-    if cut is not None:
-        mask &= cut.astype(bool)
-
-    center = np.where(np.abs(q_par) == np.abs(q_par).min())
-    qx = q_par[:,center[0][0]]/10.
-
-    maskeddata = np.ma.masked_array(data, mask=1 - mask)
-    xprofile = np.ma.average(maskeddata, axis=1)
-
-    return qx.tolist(), xprofile.tolist(), color, requestkey
-
-def remeshzintegrate(image_data, mask=None, cut=None, q_norm=None, q_par=None):
+    Parameters
+    ----------
+    data : array
+        2d remeshed image, or a stack of remeshed images
+    mask : array, optional
+        nonzero for the pixels to be counted
+    cut : array, optional
+        ROI, nonzero for the pixels to be counted
+    q_norm : array, optional
+        unused- accepted for symmetry with remeshzintegrate()
+    q_par : array
+        q_par (1/nm) of the remeshed image, either at each pixel
+        or as a 1d axis along the image rows (see remesh.remesh_axes())
+    dtype : numpy dtype, optional
+        dtype of the intensities (see line_mean())
 
-    if mask is None: 
-        mask = np.ones_like(image_data)
-    if cut is not None:
-        mask &= cut.astype(bool)
-    center = np.where(np.abs(q_norm) == np.abs(q_norm).min())
-    qx = -q_norm[center[1][0]]#/10.
+    Returns
+    -------
+    q_x : array
+        q_par of each image row in 1/Angstrom
+    I_qx : array
+        average intensity in each image row
+    """
+    return _remesh_axis(q_par, 0), line_mean(data, 1, mask, cut, dtype)
 
-    maskeddata = np.ma.masked_array(data, mask=1 - mask)
-    I_qx = np.ma.average(maskeddata, axis=0)
+def remeshzintegrate(data, mask=None, cut=None, q_norm=None, q_par=None, dtype=None):
+    """q_norm line cut of a remeshed GIXS image (see remesh.remesh()):
+    average over q_par, i.e. over the rows of the image.
+    Arguments are as for remeshxintegrate(),
+    with q_norm either at each pixel or as a 1d axis along the image columns.
 
-    return qx, I_qx 
+    Returns
+    -------
+    q_z : array
+        q_norm of each image column in 1/Angstrom
+    I_qz : array
+        average intensity in each image column
+    """
+    return _remesh_axis(q_norm, 1), line_mean(data, 0, mask, cut, dtype)
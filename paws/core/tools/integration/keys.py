@@ -0,0 +1,85 @@
+"""
+Canonical hashes of integration geometries and masks,
+used as keys for cached integrators and lookup tables.
+"""
+from __future__ import print_function
+import json
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+def _canonical(x):
+    """Convert x to plain python types, for a stable json representation."""
+    if isinstance(x,dict):
+        return OrderedDict([(str(k),_canonical(x[k])) for k in sorted(x.keys(),key=str)])
+    if isinstance(x,(list,tuple)):
+        return [_canonical(v) for v in x]
+    if isinstance(x,np.ndarray):
+        return _canonical(x.tolist())
+    if isinstance(x,(bool,np.bool_)):
+        return bool(x)
+    if isinstance(x,(int,np.integer)):
+        return int(x)
+    if isinstance(x,(float,np.floating)):
+        return repr(float(x))
+    if x is None:
+        return None
+    return str(x)
+
+# digests of read-only mask arrays with known content (see masks.py), by id
+_digests = {}
+_digests_lock = threading.Lock()
+
+def packed_digest(shape,bits):
+    """Digest of a boolean mask of the given shape, from its np.packbits() bits."""
+    h = hashlib.sha1(str(tuple(shape)).encode('utf-8'))
+    h.update(bits.tobytes())
+    return h.hexdigest()
+
+def register_digest(mask,digest):
+    """
+    Record the digest of a read-only mask array,
+    so that mask_digest() does not recompute it.
+    The record is dropped when the array is garbage-collected.
+    """
+    if mask.flags.writeable:
+        raise ValueError('[{}] only read-only arrays can be registered'.format(__name__))
+    k = id(mask)
+    def _drop(ref):
+        with _digests_lock:
+            if k in _digests and _digests[k][0] is ref:
+                del _digests[k]
+    with _digests_lock:
+        _digests[k] = (weakref.ref(mask,_drop),digest)
+
+def known_digest(mask):
+    """The registered digest of mask, or None."""
+    with _digests_lock:
+        e = _digests.get(id(mask))
+    if e is not None and e[0]() is mask:
+        return e[1]
+    return None
+
+def mask_digest(mask):
+    """Digest of the content of a (boolean) mask array, or None if mask is None."""
+    if mask is None:
+        return None
+    d = known_digest(mask)
+    if d is not None:
+        return d
+    m = np.asarray(mask).astype(bool)
+    return packed_digest(m.shape,np.packbits(m))
+
+def integrator_key(poni_dict,shape=None,mask=None):
+    """
+    Canonical hash of a calibration (poni_dict),
+    detector shape, and mask content.
+    """
+    k = [_canonical(poni_dict),
+        None if shape is None else [int(s) for s in shape],
+        mask_digest(mask)]
+    return hashlib.sha1(json.dumps(k).encode('utf-8')).hexdigest()
+
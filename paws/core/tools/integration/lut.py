@@ -0,0 +1,427 @@
+"""
+Pixel-to-bin lookup tables (LUTs) for histogram integration,
+persisted to the paws scratch directory.
+
+A LUT is a sparse pixel-to-bin matrix in compressed sparse row (CSR) form:
+`indices` lists the (flat) pixel indices that fall in each bin, sorted by bin,
+and `indptr` gives the start of each bin in `indices`.
+`norm` holds the sum of the normalization weights
+(e.g. solid angle and polarization corrections) of the pixels in each bin.
+Integrating an image is then a single pass over `indices`,
+and integrating a stack of images is a single pass over the stack.
+For 2d (radial, azimuthal) binning, the bins are numbered
+azimuthal index * n_radial + radial index.
+
+For very large detectors, a frame can also be binned in row tiles
+on a pool of threads (numpy releases the GIL for the gathers and sums):
+each tile is binned into a partial histogram, and the partials are summed,
+so that the temporary memory is bounded by the tile size.
+
+LUTs are saved as .npy files, keyed by a hash of the geometry, mask and binning,
+and loaded as memory-mapped arrays,
+so that processes (e.g. batch workers) that integrate with the same geometry
+share one copy of the LUT instead of each recomputing it.
+"""
+from __future__ import print_function
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from ... import pawstools
+from .keys import integrator_key
+from . import masks
+
+lut_dir = os.path.join(pawstools.paws_scratch_dir,'integration_luts')
+
+# increment when the LUT layout or binning changes, to invalidate saved LUTs
+lut_version = 1
+lut_arrays = ['indptr','indices','norm','centers']
+
+# maximum number of image rows per tile, for tiled binning
+max_tile_rows = 256
+
+# thread pools for tiled binning, by number of threads
+_pools = {}
+_pools_lock = threading.Lock()
+
+def thread_pool(n_threads):
+    """Return a shared pool of n_threads threads."""
+    with _pools_lock:
+        pool = _pools.get(n_threads)
+        if pool is None:
+            pool = ThreadPool(n_threads)
+            _pools[n_threads] = pool
+    return pool
+
+class PixelLUT(object):
+    """
+    Pixel-to-bin lookup table in CSR form.
+
+    Parameters
+    ----------
+    shape : tuple
+        shape of the images to be integrated
+    indptr : array
+        (n_bins+1,) start of each bin in indices
+    indices : array
+        flat indices of the pixels in each bin, sorted by bin
+    norm : array
+        (n_bins,) sum of the pixel normalization weights in each bin
+    centers : array
+        bin centers- for 2d binning, the radial bin centers
+    azim_centers : array, optional
+        azimuthal bin centers, for 2d binning
+    """
+
+    def __init__(self,shape,indptr,indices,norm,centers,azim_centers=None):
+        super(PixelLUT,self).__init__()
+        self.shape = tuple(shape)
+        self.indptr = indptr
+        self.indices = indices
+        self.norm = norm
+        self.centers = centers
+        self.azim_centers = azim_centers
+        self._tiles = {}
+        self._tiles_lock = threading.Lock()
+
+    @property
+    def bin_shape(self):
+        """Shape of the binned result: (n_bins,) or (n_azimuthal,n_radial)."""
+        if self.azim_centers is None:
+            return (self.n_bins,)
+        return (len(self.azim_centers),len(self.centers))
+
+    @property
+    def n_bins(self):
+        return self.indptr.shape[0]-1
+
+    def bin_sums(self,data,n_threads=1,tile_rows=None):
+        """
+        Sum the pixels of data (an image, or a stack of images) in each bin.
+        The pixels are gathered in the dtype of data,
+        and summed in float64.
+        Returns an array of shape (n_bins,) or (n_images,n_bins),
+        with bins numbered as described in the module docstring.
+        If n_threads > 1 or tile_rows is given,
+        the images are binned in tiles of tile_rows rows
+        (see tile_tables()) on n_threads threads.
+        """
+        data = np.asarray(data)
+        flat = data.reshape(data.shape[:-2]+(-1,))
+        if n_threads > 1 or tile_rows is not None:
+            return self._tiled_bin_sums(flat,max(int(n_threads),1),tile_rows)
+        vals = np.take(flat,self.indices,axis=-1)
+        sums = np.zeros(data.shape[:-2]+(self.n_bins,),dtype=np.result_type(vals.dtype,np.float64))
+        filled = self.indptr[1:] > self.indptr[:-1]
+        if vals.shape[-1] > 0:
+            # np.add.reduceat is only defined for non-empty bins
+            sums[...,filled] = np.add.reduceat(vals,self.indptr[:-1][filled],axis=-1,
+                dtype=np.float64)
+        return sums
+
+    def tile_tables(self,tile_rows):
+        """
+        Lookup tables for binning row tiles of tile_rows image rows.
+        Returns a list of (pixel_start, pixel_stop, indices, bins, starts) per tile:
+        indices are the flat pixel indices (relative to pixel_start) in the tile,
+        sorted by bin, bins are the bins present in the tile,
+        and starts gives the start of each of these bins in indices.
+        The tables are computed once per tile size.
+        """
+        tile_rows = max(int(tile_rows),1)
+        with self._tiles_lock:
+            tables = self._tiles.get(tile_rows)
+        if tables is not None:
+            return tables
+        tile_px = tile_rows*self.shape[1]
+        n_px = self.shape[0]*self.shape[1]
+        idx = np.asarray(self.indices,dtype=np.int64)
+        b = np.repeat(np.arange(self.n_bins),np.diff(self.indptr))
+        tile_id = idx//tile_px
+        # stable: within each tile, pixels stay sorted by bin
+        order = np.argsort(tile_id,kind='stable')
+        bounds = np.zeros(n_px//tile_px+2,dtype=np.int64)
+        bounds[1:] = np.cumsum(np.bincount(tile_id,minlength=bounds.shape[0]-1))
+        tables = []
+        for t in range(bounds.shape[0]-1):
+            p0 = t*tile_px
+            if p0 >= n_px:
+                break
+            o = order[bounds[t]:bounds[t+1]]
+            tb = b[o]
+            starts = np.flatnonzero(np.r_[True,tb[1:] != tb[:-1]]) if tb.size else tb
+            tables.append((p0,min(p0+tile_px,n_px),(idx[o]-p0).astype(np.int32),
+                tb[starts],starts))
+        with self._tiles_lock:
+            self._tiles[tile_rows] = tables
+        return tables
+
+    def _tiled_bin_sums(self,flat,n_threads,tile_rows):
+        if tile_rows is None:
+            # at least one tile per thread, and at most max_tile_rows rows per tile
+            tile_rows = min(max_tile_rows,-(-self.shape[0]//n_threads))
+        tables = self.tile_tables(tile_rows)
+
+        def work(tbl):
+            p0,p1,idx,bins,starts = tbl
+            if idx.shape[0] == 0:
+                return bins,None
+            vals = np.take(flat[...,p0:p1],idx,axis=-1)
+            return bins,np.add.reduceat(vals,starts,axis=-1,dtype=np.float64)
+
+        n_threads = min(n_threads,len(tables))
+        if n_threads > 1:
+            partials = thread_pool(n_threads).map(work,tables)
+        else:
+            partials = [work(tbl) for tbl in tables]
+        sums = np.zeros(flat.shape[:-1]+(self.n_bins,),
+            dtype=np.result_type(flat.dtype,np.float64))
+        for bins,part in partials:
+            if part is not None:
+                sums[...,bins] += part
+        return sums
+
+    def integrate(self,data,n_threads=1,tile_rows=None,dtype=None):
+        """
+        Integrated (normalized) intensity in each bin
+        for an image, or a stack of images.
+        The result has shape bin_shape, or (n_images,)+bin_shape,
+        and dtype float64, or dtype if given.
+        Empty bins are zero.
+        See bin_sums() for n_threads and tile_rows.
+        """
+        sums = self.bin_sums(data,n_threads,tile_rows)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            I = sums/self.norm
+        I[...,self.norm == 0] = 0.
+        if dtype is not None:
+            I = I.astype(dtype,copy=False)
+        return I.reshape(I.shape[:-1]+self.bin_shape)
+
+def _bin_index(pos,n_bins,valid,pos_range=None):
+    """
+    Equal-width bin index of each valid pixel position.
+    Pixels outside pos_range are removed from `valid` (in place).
+    Returns the bin indices of all pixels and the bin centers.
+    """
+    if pos_range is None:
+        pos_range = (pos[valid].min(),pos[valid].max())
+    lo,hi = float(pos_range[0]),float(pos_range[1])
+    with np.errstate(invalid='ignore'):
+        valid &= (pos >= lo) & (pos <= hi)
+    scl = n_bins/(hi-lo) if hi > lo else 0.
+    b = np.zeros(pos.shape,dtype=np.int64)
+    b[valid] = np.clip(((pos[valid]-lo)*scl).astype(np.int64),0,n_bins-1)
+    centers = lo+(np.arange(n_bins)+0.5)*(hi-lo)/n_bins
+    return b,centers
+
+def _valid_pixels(pos,mask):
+    valid = np.isfinite(pos)
+    if mask is not None:
+        valid &= np.logical_not(np.asarray(mask).ravel())
+    return valid
+
+def lut_from_bins(shape,bins,valid,n_bins,weights=None,centers=None,azim_centers=None):
+    """
+    Build a PixelLUT from the bin index of each pixel.
+
+    Parameters
+    ----------
+    shape : tuple
+        image shape
+    bins : array
+        flat array of the bin index of each pixel
+    valid : array
+        flat boolean array of the pixels to be binned
+    n_bins : int
+        number of bins
+    weights : array, optional
+        normalization weight of each pixel (default 1)
+    centers, azim_centers : array, optional
+        bin centers (default: bin indices)
+    """
+    idx = np.nonzero(valid)[0]
+    b = np.asarray(bins).ravel()[idx]
+    order = np.argsort(b,kind='stable')
+    b = b[order]
+    indices = idx[order]
+    indptr = np.zeros(n_bins+1,dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(b,minlength=n_bins))
+    if weights is None:
+        norm = np.bincount(b,minlength=n_bins).astype(np.float64)
+    else:
+        norm = np.bincount(b,np.asarray(weights,dtype=np.float64).ravel()[indices],n_bins)
+    if centers is None:
+        centers = np.arange(n_bins,dtype=np.float64)
+    if indices.size and indices.max() < 2**31:
+        indices = indices.astype(np.int32)
+    return PixelLUT(shape,indptr,indices,norm,centers,azim_centers)
+
+def build_lut(pos,n_bins,weights=None,mask=None,pos_range=None):
+    """
+    Build a PixelLUT that bins pixels by position.
+
+    Parameters
+    ----------
+    pos : array
+        position (e.g. q) of each pixel
+    n_bins : int
+        number of equal-width bins
+    weights : array, optional
+        normalization weight of each pixel (default 1)
+    mask : array, optional
+        pixels where mask is nonzero are excluded (pyFAI convention)
+    pos_range : tuple, optional
+        (min, max) positions of the binning range-
+        defaults to the range of the unmasked pixels
+    """
+    pos = np.asarray(pos)
+    flat_pos = pos.ravel()
+    valid = _valid_pixels(flat_pos,mask)
+    b,centers = _bin_index(flat_pos,n_bins,valid,pos_range)
+    return lut_from_bins(pos.shape,b,valid,n_bins,weights,centers)
+
+def build_lut2d(rad,n_rad,azim,n_azim,weights=None,mask=None,rad_range=None,azim_range=None):
+    """
+    Build a PixelLUT that bins pixels by radial and azimuthal position.
+    Arguments are as for build_lut(), for each of the two positions.
+    """
+    rad = np.asarray(rad)
+    flat_rad = rad.ravel()
+    flat_azim = np.asarray(azim).ravel()
+    valid = _valid_pixels(flat_rad,mask) & np.isfinite(flat_azim)
+    b_rad,c_rad = _bin_index(flat_rad,n_rad,valid,rad_range)
+    b_azim,c_azim = _bin_index(flat_azim,n_azim,valid,azim_range)
+    return lut_from_bins(rad.shape,b_azim*n_rad+b_rad,valid,n_rad*n_azim,
+        weights,c_rad,c_azim)
+
+def lut_key(*args):
+    """Hash of the json representation of args."""
+    return hashlib.sha1(json.dumps([lut_version]+list(args)).encode('utf-8')).hexdigest()
+
+def save_lut(lut,key,dir_path=None):
+    """
+    Save lut to dir_path (default lut_dir) under key.
+    Files are written under temporary names and renamed,
+    so that concurrent readers never see a partially written LUT.
+    """
+    dir_path = dir_path or lut_dir
+    if not os.path.exists(dir_path):
+        try:
+            os.makedirs(dir_path)
+        except OSError:
+            # created by another process
+            pass
+    nms = list(lut_arrays)
+    if lut.azim_centers is not None:
+        nms.append('azim_centers')
+    for nm in nms:
+        fd,tmp = tempfile.mkstemp(suffix='.npy',dir=dir_path)
+        with os.fdopen(fd,'wb') as f:
+            np.save(f,getattr(lut,nm))
+        os.rename(tmp,os.path.join(dir_path,'{}_{}.npy'.format(key,nm)))
+    with open(os.path.join(dir_path,'{}.json'.format(key)),'w') as f:
+        json.dump({'shape':list(lut.shape)},f)
+
+def load_lut(key,dir_path=None):
+    """
+    Load the LUT saved under key as memory-mapped arrays,
+    or return None if there is no such LUT.
+    """
+    dir_path = dir_path or lut_dir
+    hdr = os.path.join(dir_path,'{}.json'.format(key))
+    if not os.path.exists(hdr):
+        return None
+    with open(hdr,'r') as f:
+        shape = json.load(f)['shape']
+    arrs = [np.load(os.path.join(dir_path,'{}_{}.npy'.format(key,nm)),mmap_mode='r')
+        for nm in lut_arrays]
+    p_azim = os.path.join(dir_path,'{}_azim_centers.npy'.format(key))
+    if os.path.exists(p_azim):
+        arrs.append(np.load(p_azim))
+    return PixelLUT(shape,*arrs)
+
+# LUTs already loaded or built in this process
+_luts = OrderedDict()
+_luts_lock = threading.Lock()
+max_luts = 8
+
+def cached_lut(key,build_fn,dir_path=None):
+    """
+    Return the LUT for key: from memory, from disk, or by calling build_fn()
+    (and saving the result to disk).
+    """
+    with _luts_lock:
+        lut = _luts.pop(key,None)
+        if lut is not None:
+            _luts[key] = lut
+            return lut
+    lut = load_lut(key,dir_path)
+    if lut is None:
+        lut = build_fn()
+        save_lut(lut,key,dir_path)
+    with _luts_lock:
+        _luts[key] = lut
+        while len(_luts) > max_luts:
+            _luts.popitem(last=False)
+    return lut
+
+def pyfai_lut(integrator,shape,npt,unit='q_A^-1',polz_factor=None,mask=None,
+    correct_solid_angle=True,dir_path=None,npt_azim=None):
+    """
+    Return the LUT for integration with a pyFAI.AzimuthalIntegrator,
+    equivalent to its histogram integration without pixel splitting:
+    npt bins of the chosen unit over the range of the unmasked pixels,
+    normalized by solid angle and (if polz_factor is given) polarization.
+
+    Parameters
+    ----------
+    integrator : pyFAI.AzimuthalIntegrator
+        integrator that defines the geometry
+    shape : tuple
+        shape of the images
+    npt : int
+        number of (radial) bins
+    unit : str
+        pyFAI unit of the radial axis
+    polz_factor : float, optional
+        polarization factor
+    mask : array, optional
+        mask in the pyFAI convention (nonzero pixels are masked),
+        combined with the mask of the integrator, if any
+    correct_solid_angle : bool
+        whether to normalize by the pixel solid angles
+    dir_path : str, optional
+        directory of the saved LUTs (default lut_dir)
+    npt_azim : int, optional
+        number of azimuthal (chi, in degrees) bins, for 2d integration
+    """
+    shape = tuple(int(s) for s in shape)
+    ai_mask = getattr(integrator,'mask',None)
+    if ai_mask is not None and tuple(ai_mask.shape) != shape:
+        ai_mask = None
+    # cached, so that the combined mask is not rebuilt (or rehashed) per call
+    mask = masks.combined_mask(shape,masked=[mask,ai_mask],invert=True)
+    key_args = [integrator_key(integrator.getPyFAI(),shape,mask),
+        int(npt),str(unit),polz_factor,bool(correct_solid_angle)]
+    if npt_azim is not None:
+        key_args.append(int(npt_azim))
+    key = lut_key(*key_args)
+    def build():
+        pos = integrator.array_from_unit(shape,'center',unit,scale=True)
+        w = np.ones(shape)
+        if correct_solid_angle:
+            w = w*integrator.solidAngleArray(shape)
+        if polz_factor is not None:
+            w = w*integrator.polarization(shape,polz_factor)
+        if npt_azim is None:
+            return build_lut(pos,int(npt),w,mask)
+        chi = np.rad2deg(integrator.chiArray(shape))
+        return build_lut2d(pos,int(npt),chi,int(npt_azim),w,mask)
+    return cached_lut(key,build,dir_path)
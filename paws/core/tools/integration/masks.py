@@ -0,0 +1,302 @@
+"""
+Process-wide cache of detector masks, beamstop masks and ROIs.
+
+Integration and remeshing need, for every frame, one boolean array
+that combines the detector mask, the beamstop mask and any ROI cuts.
+Combining them (and computing the polar coordinates behind an arc ROI)
+on every frame allocates several detector-sized arrays per frame.
+The masks are combined once, keyed by a hash of the content of their inputs,
+and kept bit-packed (one bit per pixel), with the most recently used masks
+also kept unpacked, as read-only boolean arrays.
+The digests of the cached arrays are registered (see keys.register_digest()),
+so that integrators and lookup tables keyed by these masks
+do not hash them again.
+Other read-only input arrays are hashed the first time they are seen,
+and then recognized by identity (see content_key()),
+so that passing the same read-only mask with every frame costs no hashing.
+Writeable arrays may be edited in place, so they are hashed on every call.
+"""
+from __future__ import print_function
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from .keys import packed_digest, register_digest, known_digest
+
+class PackedMask(object):
+    """
+    Boolean mask stored with one bit per pixel.
+
+    Parameters
+    ----------
+    mask : array
+        boolean mask (nonzero values are True)
+    """
+
+    def __init__(self,mask):
+        super(PackedMask,self).__init__()
+        m = np.asarray(mask).astype(bool)
+        self.shape = m.shape
+        self.bits = np.packbits(m)
+        self.n_true = int(np.count_nonzero(m))
+        self.digest = packed_digest(self.shape,self.bits)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def unpack(self):
+        """Return the mask as a boolean array."""
+        n = int(np.prod(self.shape))
+        return np.unpackbits(self.bits)[:n].view(bool).reshape(self.shape)
+
+# content keys of input arrays already hashed, by id (see content_key())
+_seen = {}
+_seen_lock = threading.Lock()
+
+def _is_frozen(a):
+    """True if neither a nor any array it is a view of is writeable."""
+    while isinstance(a,np.ndarray):
+        if a.flags.writeable:
+            return False
+        a = a.base
+    return True
+
+def _array_state(a):
+    """Buffer address, shape, strides and dtype of an array."""
+    return (a.__array_interface__['data'][0],a.shape,a.strides,a.dtype.str)
+
+def _hash_array(a):
+    if a.dtype == bool:
+        return packed_digest(a.shape,np.packbits(a))
+    h = hashlib.sha1('{}{}'.format(a.dtype.str,a.shape).encode('utf-8'))
+    h.update(np.ascontiguousarray(a).data)
+    return h.hexdigest()
+
+def content_key(a):
+    """
+    Hash of the shape, dtype and content of an array, or None if a is None.
+    For boolean arrays this equals keys.mask_digest(a).
+
+    The content of a read-only ndarray (one that is not a view
+    of a writeable array) is hashed the first time it is seen.
+    Later calls with the same array object (and the same buffer, shape
+    and dtype) return the recorded key, until the array is garbage-collected.
+    Writeable arrays are hashed on every call,
+    so that masks edited in place get new keys.
+    """
+    if a is None:
+        return None
+    if not isinstance(a,np.ndarray):
+        return _hash_array(np.asarray(a))
+    d = known_digest(a)
+    if d is not None:
+        return d
+    if not _is_frozen(a):
+        return _hash_array(a)
+    k = id(a)
+    state = _array_state(a)
+    with _seen_lock:
+        e = _seen.get(k)
+    if e is not None and e[0]() is a and e[1] == state:
+        return e[2]
+    d = _hash_array(a)
+    def _drop(ref):
+        with _seen_lock:
+            if k in _seen and _seen[k][0] is ref:
+                del _seen[k]
+    with _seen_lock:
+        _seen[k] = (weakref.ref(a,_drop),state,d)
+    return d
+
+class MaskManager(object):
+    """
+    Least-recently-used cache of masks.
+
+    Parameters
+    ----------
+    max_packed : int
+        maximum number of bit-packed masks to keep
+    max_unpacked : int
+        maximum number of unpacked (boolean) masks to keep
+    """
+
+    def __init__(self,max_packed=64,max_unpacked=4):
+        super(MaskManager,self).__init__()
+        self.max_packed = max_packed
+        self.max_unpacked = max_unpacked
+        self.n_hits = 0
+        self.n_misses = 0
+        self._lock = threading.Lock()
+        self._packed = OrderedDict()
+        self._unpacked = OrderedDict()
+
+    def __len__(self):
+        return len(self._packed)
+
+    def get(self,key,build_fn):
+        """
+        Return the mask for key as a read-only boolean array,
+        calling build_fn() to build it if it is not cached.
+        """
+        with self._lock:
+            m = self._unpacked.pop(key,None)
+            pm = self._packed.pop(key,None)
+            if pm is not None:
+                self.n_hits += 1
+                self._packed[key] = pm
+                if m is not None:
+                    self._unpacked[key] = m
+                    return m
+            else:
+                self.n_misses += 1
+        if pm is None:
+            # build outside the lock: combining large masks takes a while
+            m = np.array(build_fn(),dtype=bool)
+            pm = PackedMask(m)
+        else:
+            m = pm.unpack()
+        m.flags.writeable = False
+        register_digest(m,pm.digest)
+        with self._lock:
+            self._packed[key] = pm
+            self._unpacked[key] = m
+            while len(self._packed) > self.max_packed:
+                self._packed.popitem(last=False)
+            while len(self._unpacked) > self.max_unpacked:
+                self._unpacked.popitem(last=False)
+        return m
+
+    def packed(self,key,build_fn):
+        """Return the mask for key as a PackedMask."""
+        with self._lock:
+            pm = self._packed.get(key)
+        if pm is None:
+            self.get(key,build_fn)
+            with self._lock:
+                pm = self._packed[key]
+        return pm
+
+    def nbytes(self):
+        """Memory held by the cached masks, in bytes."""
+        with self._lock:
+            return sum(pm.nbytes for pm in self._packed.values()) \
+                + sum(m.nbytes for m in self._unpacked.values())
+
+    def clear(self):
+        with self._lock:
+            self._packed.clear()
+            self._unpacked.clear()
+
+_manager = MaskManager()
+
+def cached_mask(key,build_fn):
+    """
+    Return the read-only boolean mask for key from the process-wide cache,
+    calling build_fn() to build it if it is not cached.
+    """
+    return _manager.get(key,build_fn)
+
+def _as_list(x):
+    if x is None:
+        return []
+    if isinstance(x,(list,tuple)):
+        return [a for a in x if a is not None]
+    return [x]
+
+def combined_mask(shape,valid=None,masked=None,invert=False):
+    """
+    Combine masks and ROIs into one cached, read-only boolean array.
+
+    Parameters
+    ----------
+    shape : tuple
+        image shape
+    valid : array or list of arrays, optional
+        masks or ROIs that are nonzero for the pixels to be counted
+    masked : array or list of arrays, optional
+        masks that are nonzero for the pixels to be excluded
+        (the pyFAI convention), e.g. detector or beamstop masks
+    invert : bool
+        if True, return the combined mask in the pyFAI convention
+        (True for excluded pixels)
+
+    Returns
+    -------
+    mask : array
+        True for the pixels to be counted
+        (or excluded, if invert is True),
+        or None if no masks are given
+    """
+    shape = tuple(int(s) for s in shape)
+    valid = _as_list(valid)
+    masked = _as_list(masked)
+    if not valid and not masked:
+        return None
+    for a in valid+masked:
+        if tuple(np.shape(a)) != shape:
+            raise ValueError('[{}] mask of shape {} does not match image shape {}'
+            .format(__name__,np.shape(a),shape))
+    key = ('combined',shape,tuple(content_key(a) for a in valid),
+        tuple(content_key(a) for a in masked),bool(invert))
+    def build():
+        m = np.ones(shape,dtype=bool)
+        for a in valid:
+            m &= np.asarray(a).astype(bool)
+        for a in masked:
+            m &= np.logical_not(a)
+        if invert:
+            np.logical_not(m,out=m)
+        return m
+    return cached_mask(key,build)
+
+# polar coordinates (radius, angle in degrees) about a pixel, for arc ROIs
+_polar = OrderedDict()
+_polar_lock = threading.Lock()
+max_polar = 2
+
+def polar_coords(shape,center):
+    """
+    Radius (in pixels) and angle (in degrees, from -180 to 180)
+    of each pixel about center (column, row).
+    The arrays are computed once per shape and center.
+    """
+    key = (tuple(int(s) for s in shape),tuple(float(c) for c in center))
+    with _polar_lock:
+        rth = _polar.pop(key,None)
+    if rth is None:
+        y,x = np.indices(key[0],dtype=float)
+        x -= key[1][0]
+        y -= key[1][1]
+        rth = (np.hypot(x,y),np.degrees(np.arctan2(y,x)))
+        for a in rth:
+            a.flags.writeable = False
+    with _polar_lock:
+        _polar[key] = rth
+        while len(_polar) > max_polar:
+            _polar.popitem(last=False)
+    return rth
+
+def arc_roi(shape,center,radius1,radius2,angle1,angle2):
+    """
+    Cached, read-only arc ROI: True for the pixels with
+    radius1 < radius < radius2 and angle1 < angle < angle2
+    about center (column, row), with angles in degrees.
+    """
+    key = ('arc',tuple(int(s) for s in shape),tuple(float(c) for c in center),
+        float(radius1),float(radius2),float(angle1),float(angle2))
+    def build():
+        r,theta = polar_coords(shape,center)
+        return (r > radius1) & (r < radius2) & (theta > angle1) & (theta < angle2)
+    return cached_mask(key,build)
+
+def clear_masks():
+    """Remove all masks from the process-wide cache."""
+    _manager.clear()
+    with _seen_lock:
+        _seen.clear()
+    with _polar_lock:
+        _polar.clear()
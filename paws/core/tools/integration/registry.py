@@ -0,0 +1,100 @@
+"""
+Process-wide registry of pyFAI.AzimuthalIntegrator objects.
+
+A pyFAI.AzimuthalIntegrator caches the arrays it computes for a geometry
+(pixel positions, q, chi, solid angles) and the lookup tables of its integration engines.
+Building a new integrator for every image or every workflow run throws these away.
+get_integrator() returns one shared integrator for each combination of
+calibration (poni_dict), detector shape and mask,
+keeping the most recently used integrators in memory.
+"""
+from __future__ import print_function
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pyFAI
+
+from .keys import integrator_key
+
+class IntegratorRegistry(object):
+    """
+    Least-recently-used cache of pyFAI.AzimuthalIntegrator objects.
+
+    Parameters
+    ----------
+    max_size : int
+        maximum number of integrators to keep
+    """
+
+    def __init__(self,max_size=8):
+        super(IntegratorRegistry,self).__init__()
+        self.max_size = max_size
+        self.n_hits = 0
+        self.n_misses = 0
+        self._lock = threading.Lock()
+        self._integrators = OrderedDict()
+
+    def __len__(self):
+        return len(self._integrators)
+
+    def get(self,poni_dict,shape=None,mask=None):
+        """
+        Return the integrator for poni_dict, shape and mask,
+        building (and warming) it if it is not in the registry.
+        """
+        key = integrator_key(poni_dict,shape,mask)
+        with self._lock:
+            ai = self._integrators.pop(key,None)
+            if ai is None:
+                self.n_misses += 1
+            else:
+                self.n_hits += 1
+                self._integrators[key] = ai
+                return ai
+        # build outside the lock: warming a large detector takes a while
+        ai = build_integrator(poni_dict,shape,mask)
+        with self._lock:
+            # another thread may have built the same integrator in the meantime
+            ai = self._integrators.pop(key,ai)
+            self._integrators[key] = ai
+            while len(self._integrators) > self.max_size:
+                self._integrators.popitem(last=False)
+        return ai
+
+    def clear(self):
+        with self._lock:
+            self._integrators.clear()
+
+def build_integrator(poni_dict,shape=None,mask=None):
+    """
+    Build a pyFAI.AzimuthalIntegrator from poni_dict.
+    If a detector shape is given, the q, chi and solid angle arrays
+    are computed up front, so that the integrator is ready to use.
+    The mask follows the pyFAI convention: nonzero pixels are masked.
+    """
+    ai = pyFAI.AzimuthalIntegrator()
+    ai.setPyFAI(**poni_dict)
+    if mask is not None:
+        ai.set_mask(np.asarray(mask).astype(np.int8))
+    if shape is not None:
+        shape = tuple(int(s) for s in shape)
+        ai.qArray(shape)
+        ai.chiArray(shape)
+        ai.solidAngleArray(shape)
+    return ai
+
+_registry = IntegratorRegistry()
+
+def get_integrator(poni_dict,shape=None,mask=None):
+    """
+    Return the shared pyFAI.AzimuthalIntegrator for poni_dict, shape and mask
+    from the process-wide registry.
+    The integrator is shared: callers should not change its geometry.
+    """
+    return _registry.get(poni_dict,shape,mask)
+
+def clear_integrators():
+    """Remove all integrators from the process-wide registry."""
+    _registry.clear()
+
@@ -1,45 +1,112 @@
 #! /usr/bin/env python
+"""
+Remeshing of grazing-incidence (GIXS) images onto a uniform (q_par, q_norm) grid.
+
+The map from the (q_par, q_norm) grid back to detector pixels
+depends only on the geometry, the incident angle, and the image shape.
+It is computed once, as a table of pixel indices (and interpolation weights),
+and cached, so that remeshing each frame is a single vectorized gather.
+"""
+from __future__ import print_function
+import threading
+from collections import OrderedDict
 
 import numpy as np
 from pyFAI import geometry
 
-import msg
+from .keys import integrator_key
+from . import masks
+from .lut import thread_pool
+
+def calc_q_range(lims, geometry, alphai, cen):
+    """Compute the q-range represented by an image.
 
+    Parameters
+    ----------
+    lims : tuple
+        image shape (rows, columns)
+    geometry : pyFAI.Geometry
+        sample/detector geometry
+    alphai : float
+        beam-to-surface incident angle in radians
+    cen : array
+        horizontal and vertical beam center in nanometers
 
-try:
-    from cWarpImage import warp_image
-except ImportError:
-    msg.logMessage("Remeshing C extension is NOT LOADED!",msg.ERROR)
+    Returns
+    -------
+    q_range : list
+        [min(q_par),max(q_par),min(q_norm),max(q_norm)] in 1/nm
+    k0 : float
+        wavenumber in 1/nm
+    """
+    nanometer = 1.0E+09
+    sdd = geometry.dist * nanometer
+    wavelen = geometry.wavelength * nanometer
+    pixel1 = geometry.pixel1 * nanometer
+    pixel2 = geometry.pixel2 * nanometer
 
+    # calculate q-range for the image
+    y = np.array([0, lims[1] - 1], dtype=float) * pixel1
+    z = np.array([0, lims[0] - 1], dtype=float) * pixel2
+    y, z = np.meshgrid(y, z)
+    y -= cen[0]
+    z -= cen[1]
 
-def remesh(image, geometry, alphai):
-    shape = image.shape
-    center = np.zeros(2, dtype=np.float)
-    pixel = np.zeros(2, dtype=np.float)
+    # calculate angles
+    tmp = np.sqrt(y ** 2 + sdd ** 2)
+    cos2theta = sdd / tmp
+    sin2theta = y / tmp
+    tmp = np.sqrt(z ** 2 + y ** 2 + sdd ** 2)
+    cosalpha = sdd / tmp
+    sinalpha = z / tmp
+    k0 = 2. * np.pi / wavelen
 
-    # get calibrated parameters
-    nanometer = 1.0E+09
-    sdd = geometry.get_dist() * nanometer
-    pixel[0] = geometry.get_pixel1() * nanometer
-    pixel[1] = geometry.get_pixel2() * nanometer
-    center[0] = geometry.get_poni2() * nanometer
-    center[1] = shape[0] * pixel[0] - geometry.get_poni1() * nanometer
-
-    # calculate q values
-    qrange, k0 = calc_q_range(image.shape, geometry, alphai, center)
-
-    # uniformly spaced q-values for remeshed image
-    nqz = image.shape[0]
-    dqz = (qrange[3] - qrange[2]) / (nqz - 1)
-    nqp = np.int((qrange[1] - qrange[0]) / dqz)
-    qvrt = np.linspace(qrange[2], qrange[3], nqz)
-    qpar = qrange[0] + np.arange(nqp) * dqz
-    qpar, qvrt = np.meshgrid(qpar, qvrt)
-
-    try:
-        qimg = warp_image(image, qpar, qvrt, pixel, center, alphai, k0, sdd, 0)
-        return np.rot90(qimg, 3), np.rot90(qpar, 3), np.rot90(qvrt, 3)
-    except Exception:
+    # calculate q-values of each corner
+    qx = k0 * (cosalpha * cos2theta - np.cos(alphai))
+    qy = k0 * cosalpha * sin2theta
+    qz = k0 * (sinalpha + np.sin(alphai))
+    qp = np.sign(qy) * np.sqrt(qx ** 2 + qy ** 2)
+    q_range = [qp.min(), qp.max(), qz.min(), qz.max()]
+    return q_range, k0
+
+class RemeshMap(object):
+    """
+    Inverse map from a uniform (q_par, q_norm) grid to detector pixels.
+
+    Attributes
+    ----------
+    qpar, qvrt : array
+        q_par and q_norm (1/nm) at each point of the grid
+    map_x, map_y : array
+        (fractional) detector column and row of each grid point
+    mask : array
+        True for grid points that fall outside the detector
+    """
+
+    def __init__(self, shape, geometry, alphai):
+        super(RemeshMap, self).__init__()
+        self.shape = tuple(shape)
+        center = np.zeros(2, dtype=float)
+        pixel = np.zeros(2, dtype=float)
+
+        # get calibrated parameters
+        nanometer = 1.0E+09
+        sdd = geometry.dist * nanometer
+        pixel[0] = geometry.pixel1 * nanometer
+        pixel[1] = geometry.pixel2 * nanometer
+        center[0] = geometry.poni2 * nanometer
+        center[1] = shape[0] * pixel[0] - geometry.poni1 * nanometer
+
+        # calculate q values
+        qrange, k0 = calc_q_range(shape, geometry, alphai, center)
+
+        # uniformly spaced q-values for remeshed image
+        nqz = shape[0]
+        dqz = (qrange[3] - qrange[2]) / (nqz - 1)
+        nqp = int((qrange[1] - qrange[0]) / dqz)
+        qvrt = np.linspace(qrange[2], qrange[3], nqz)
+        qpar = qrange[0] + np.arange(nqp) * dqz
+        qpar, qvrt = np.meshgrid(qpar, qvrt)
 
         # find inverse map
         cosi = np.cos(alphai)
@@ -54,34 +121,197 @@ def remesh(image, geometry, alphai):
         t2 = 2. * cosa * cosi
         cost = t1 / t2
         cost[t1 > t2] = 0
-        with np.errstate(divide='ignore'):
+        with np.errstate(divide='ignore', invalid='ignore'):
             tant = np.sign(qpar) * np.sqrt(1. - cost ** 2) / cost
             tant[cost == 0] = 0
 
         # F : (qp,qz) --> (x,y)
         map_x = (tant * sdd + center[0]) / pixel[0]
         cost[cost < 0] = 1
-        with np.errstate(divide='ignore'):
+        with np.errstate(divide='ignore', invalid='ignore'):
             map_y = (tana * sdd / cost + center[1]) / pixel[1]
 
-
         # compute null space
-        nrow, ncol = image.shape
+        nrow, ncol = shape
         m1 = t1 > t2
-        m2 = np.logical_or(map_x < 0, map_x > ncol - 1)
-        m3 = np.logical_or(map_y < 0, map_y > nrow - 1)
-
+        with np.errstate(invalid='ignore'):
+            m2 = np.logical_or(map_x < 0, map_x > ncol - 1)
+            m3 = np.logical_or(map_y < 0, map_y > nrow - 1)
         mask = np.logical_or(np.logical_or(m1, m2), m3)
-        map_x[mask] = -1
-        map_y[mask] = -1
+        mask |= ~(np.isfinite(map_x) & np.isfinite(map_y))
+        map_x[mask] = 0
+        map_y[mask] = 0
+
+        self.qpar = qpar
+        self.qvrt = qvrt
+        self.map_x = map_x
+        self.map_y = map_y
+        self.mask = mask
+
+        # flat pixel index of each grid point, for nearest-pixel remeshing
+        # (pixel index truncated toward zero, as in the original warp)
+        self.idx = (map_y.astype(np.int64) * ncol + map_x.astype(np.int64)).ravel()
+        self._bilinear = None
+        for a in [self.qpar, self.qvrt, self.map_x, self.map_y, self.mask]:
+            a.flags.writeable = False
+
+    def bilinear_table(self):
+        """Corner pixel indices and weights for bilinear interpolation."""
+        if self._bilinear is None:
+            nrow, ncol = self.shape
+            x0 = np.minimum(np.floor(self.map_x).astype(np.int64), ncol - 2)
+            y0 = np.minimum(np.floor(self.map_y).astype(np.int64), nrow - 2)
+            x0 = np.maximum(x0, 0)
+            y0 = np.maximum(y0, 0)
+            fx = self.map_x - x0
+            fy = self.map_y - y0
+            i00 = (y0 * ncol + x0).ravel()
+            idx = np.stack([i00, i00 + 1, i00 + ncol, i00 + ncol + 1])
+            w = np.stack([((1 - fx) * (1 - fy)).ravel(), (fx * (1 - fy)).ravel(),
+                ((1 - fx) * fy).ravel(), (fx * fy).ravel()])
+            w[:, self.mask.ravel()] = 0.
+            self._bilinear = (idx, w)
+        return self._bilinear
 
-        qsize = map_x.size
-        qshape = map_x.shape
-        qimg = np.fromiter((image[i, j] for i, j in np.nditer([map_y.astype(int),
-                                                               map_x.astype(int)])), dtype=np.float,
-                           count=qsize).reshape(qshape)
-        qimg[mask] = 0.
-        return np.rot90(qimg, 3), np.rot90(qpar, 3), np.rot90(qvrt, 3)
+    def warp(self, image, order=0, n_threads=1, tile_rows=256, dtype=None):
+        """
+        Remesh an image (same shape as the map) onto the q grid.
+
+        Parameters
+        ----------
+        image : array
+            2d detector image
+        order : int
+            0 for the nearest (truncated) pixel, 1 for bilinear interpolation
+        n_threads : int
+            number of threads, each gathering tiles of grid rows-
+            the threads are taken from the pools shared with
+            the integration lookup tables (lut.thread_pool())
+        tile_rows : int
+            number of grid rows per tile
+        dtype : numpy dtype, optional
+            dtype of the remeshed image- defaults to the dtype of image,
+            promoted to at least float32
+
+        Returns
+        -------
+        qimg : array
+            remeshed image, zero outside the detector
+        """
+        flat = np.ascontiguousarray(image).ravel()
+        nq = self.qpar.shape[1]
+        if dtype is None:
+            dtype = np.result_type(flat.dtype, np.float32)
+        qimg = np.empty(self.qpar.size, dtype=dtype)
+        if order == 1:
+            idx, w = self.bilinear_table()
+        msk = self.mask.ravel()
+
+        def gather(rows):
+            sl = slice(rows[0] * nq, rows[1] * nq)
+            if order == 1:
+                out = np.take(flat, idx[:, sl]) * w[:, sl]
+                qimg[sl] = out.sum(axis=0)
+            else:
+                qimg[sl] = np.take(flat, self.idx[sl])
+                qimg[sl][msk[sl]] = 0.
+
+        nrow = self.qpar.shape[0]
+        tiles = [(r, min(r + tile_rows, nrow)) for r in range(0, nrow, max(int(tile_rows), 1))]
+        n_threads = max(min(int(n_threads), len(tiles)), 1)
+        if n_threads == 1:
+            for t in tiles:
+                gather(t)
+        else:
+            thread_pool(n_threads).map(gather, tiles)
+        return qimg.reshape(self.qpar.shape)
+
+# remesh maps, keyed by geometry, incident angle and image shape
+_maps = OrderedDict()
+_maps_lock = threading.Lock()
+max_maps = 4
+
+def remesh_map(shape, geometry, alphai):
+    """Return the (cached) RemeshMap for an image shape, geometry and incident angle."""
+    key = (integrator_key(geometry.getPyFAI(), shape), repr(float(alphai)))
+    with _maps_lock:
+        m = _maps.pop(key, None)
+    if m is None:
+        m = RemeshMap(shape, geometry, alphai)
+    with _maps_lock:
+        _maps[key] = m
+        while len(_maps) > max_maps:
+            _maps.popitem(last=False)
+    return m
+
+def remesh_axes(shape, geometry, alphai):
+    """q_par (1/nm) along the rows and q_norm (1/nm) along the columns
+    of an image remeshed by remesh()."""
+    m = remesh_map(shape, geometry, alphai)
+    return m.qpar[0, :], m.qvrt[::-1, 0]
+
+def remesh_valid(shape, geometry, alphai, mask=None):
+    """Cached, read-only mask of the pixels of a remeshed image to be counted.
+
+    Parameters
+    ----------
+    shape : tuple
+        detector image shape
+    geometry : pyFAI.Geometry
+        sample/detector geometry
+    alphai : float
+        incident angle in radians
+    mask : array, optional
+        detector mask in the pyFAI convention (nonzero pixels are masked)
+
+    Returns
+    -------
+    valid : array
+        boolean array, oriented as the images returned by remesh(),
+        False for grid points outside the detector
+        or whose nearest detector pixel is masked
+    """
+    m = remesh_map(shape, geometry, alphai)
+    key = ('remesh', integrator_key(geometry.getPyFAI(), shape),
+        repr(float(alphai)), masks.content_key(mask))
+    def build():
+        valid = np.logical_not(m.mask)
+        if mask is not None:
+            det = np.asarray(mask).astype(bool).ravel()
+            valid &= np.logical_not(det[m.idx]).reshape(valid.shape)
+        return np.rot90(valid, 3)
+    return masks.cached_mask(key, build)
+
+def remesh(image, geometry, alphai, order=0, n_threads=1, dtype=None):
+    """Remesh a GIXS image onto a uniform (q_par, q_norm) grid.
+
+    Parameters
+    ----------
+    image : array
+        2d detector image
+    geometry : pyFAI.Geometry
+        sample/detector geometry
+    alphai : float
+        incident angle in radians
+    order : int
+        0 for the nearest (truncated) pixel, 1 for bilinear interpolation
+    n_threads : int
+        number of threads for the gather
+    dtype : numpy dtype, optional
+        dtype of the remeshed image (see RemeshMap.warp())
+
+    Returns
+    -------
+    qimg : array
+        remeshed image
+    qpar : array
+        q_par (1/nm) at each point of qimg
+    qvrt : array
+        q_norm (1/nm) at each point of qimg
+    """
+    m = remesh_map(image.shape, geometry, alphai)
+    qimg = m.warp(image, order, n_threads, dtype=dtype)
+    return np.rot90(qimg, 3), np.rot90(m.qpar, 3), np.rot90(m.qvrt, 3)
 
 
 if __name__ == "__main__":
@@ -89,7 +319,6 @@ if __name__ == "__main__":
     import fabio
     import pylab as plt
     import time
-    import pdb
 
     filename = '/Users/dkumar/Data/examples/Burst/calibration/AGB_5S_USE_2_2m.edf'
     image = fabio.open(filename).data
@@ -101,15 +330,14 @@ if __name__ == "__main__":
     geo.set_wavelength(1.23984E-10)
     geo.set_pixel1(0.172E-03)
     geo.set_pixel2(0.172E-03)
-    t0 = time.clock()
+    t0 = time.time()
     alphai = np.deg2rad(0.14)
-    qimg, qpar, qvrt = remesh(image, filename, geo, alphai)
+    qimg, qpar, qvrt = remesh(image, geo, alphai)
     qimg.tofile("img.bin")
     qpar.tofile("qpar.bin")
     qvrt.tofile("qvrt.bin")
-    t1 = time.clock() - t0
-    msg.logMessage("remesh clock time = %f" % t1,msg.DEBUG)
+    t1 = time.time() - t0
+    print("remesh clock time = %f" % t1)
     plt.imshow(np.log(qimg + 5), cmap=plt.cm.autumn_r, interpolation='Nearest',
                extent=[qpar.min(), qpar.max(), -1 * qvrt.max(), -1 * qvrt.min()])
     plt.show()
-
@@ -0,0 +1,79 @@
+"""
+Integration of stacks of frames on a pool of threads.
+
+A stack is an (N, H, W) array, or a list of N image files.
+All frames are integrated with one lookup table
+(see paws.core.tools.integration.lut),
+so the geometry and correction arrays are computed once for the whole stack.
+The stack is split into chunks of frames, which are integrated in parallel:
+numpy releases the GIL for the gathers and sums that do the binning.
+For a list of files, each chunk is read by the thread that integrates it,
+so reading the next frames overlaps with integrating the previous ones.
+"""
+from __future__ import print_function
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+import fabio
+
+from ..image import memmap
+
+def read_frame(file_path):
+    """Read an image file, memory-mapped where possible."""
+    img = memmap.memmap_image(file_path)
+    if img is None:
+        img = fabio.open(file_path).data
+    return img
+
+def integrate_stack(lut,frames,n_threads=4,chunk_size=8,reader=read_frame,dtype=None):
+    """
+    Integrate a stack of frames with a PixelLUT.
+
+    Parameters
+    ----------
+    lut : PixelLUT
+        lookup table for the frame shape
+    frames : array or list of str
+        (N, H, W) array of frames, or list of N image file paths
+    n_threads : int
+        number of threads
+    chunk_size : int
+        number of frames per task
+    reader : callable
+        function that reads an image file into an array
+    dtype : numpy dtype, optional
+        dtype of the result (default float64)-
+        bins are summed in float64 in any case
+
+    Returns
+    -------
+    I : array
+        (N,)+lut.bin_shape array of integrated intensities
+    """
+    n = len(frames)
+    if n == 0:
+        return np.zeros((0,)+lut.bin_shape,dtype=dtype)
+    chunk_size = max(int(chunk_size),1)
+    chunks = [(i,min(i+chunk_size,n)) for i in range(0,n,chunk_size)]
+    is_files = not isinstance(frames,np.ndarray) \
+        and all(isinstance(f,str) for f in frames)
+
+    def work(rng):
+        if is_files:
+            data = np.stack([reader(p) for p in frames[rng[0]:rng[1]]])
+        else:
+            data = np.asarray(frames[rng[0]:rng[1]])
+        return lut.integrate(data,dtype=dtype)
+
+    n_threads = max(min(int(n_threads),len(chunks)),1)
+    if n_threads == 1:
+        res = [work(c) for c in chunks]
+    else:
+        pool = ThreadPool(n_threads)
+        try:
+            res = pool.map(work,chunks)
+        finally:
+            pool.close()
+            pool.join()
+    return np.concatenate(res)
+
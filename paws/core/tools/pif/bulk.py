@@ -0,0 +1,204 @@
+"""
+Bulk construction and serialization of PIF records.
+
+Building a pypif.obj.Scalar for every point of a spectrum
+means validating and serializing thousands of small objects per record.
+ScalarArray stands in for such a list of Scalars:
+it holds the values as one numpy array,
+and serializes them all at once when the record is dumped.
+
+The public `scalars` setter of pypif.obj.Value would convert a ScalarArray
+back into a list, so set_scalars() stores it in the private Value._scalars
+attribute, where pypif 2.x (tested with 2.1) keeps the scalars
+and from where it serializes them.
+This is checked when the module is imported (see pypif_scalars_ok):
+with a pypif that stores scalars differently,
+set_scalars() falls back to the public setter and one Scalar per value.
+PifJSONLWriter streams records to a JSON-lines file, one record per line,
+optionally gzip-compressed.
+"""
+from __future__ import print_function
+import gzip
+import json
+
+import numpy as np
+import pypif.obj as pifobj
+from pypif.util.pif_encoder import PifEncoder
+
+class ScalarArray(object):
+    """
+    Read-only, list-like stand-in for a list of pypif.obj.Scalar objects.
+
+    Indexing or iterating yields pypif.obj.Scalar objects,
+    but serialization (as_dictionary()) converts the whole array at once.
+
+    Parameters
+    ----------
+    values : array
+        1d array of numbers
+    """
+
+    def __init__(self,values):
+        super(ScalarArray,self).__init__()
+        self.values = np.asarray(values).ravel()
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __getitem__(self,idx):
+        if isinstance(idx,slice):
+            return [pifobj.Scalar(v) for v in self.values[idx].tolist()]
+        return pifobj.Scalar(self.values[idx].item())
+
+    def __iter__(self):
+        for v in self.values.tolist():
+            yield pifobj.Scalar(v)
+
+    def as_dictionary(self):
+        # tolist() converts the whole array to python numbers in one call
+        return [{'value':v} for v in self.values.tolist()]
+
+def _check_pypif_scalars():
+    """Check that a ScalarArray in Value._scalars is read and serialized by pypif."""
+    try:
+        v = pifobj.Value()
+        sa = ScalarArray([1.5])
+        v._scalars = sa
+        d = json.loads(json.dumps(v,cls=PifEncoder))
+        return v.scalars is sa and d.get('scalars') == [{'value':1.5}]
+    except Exception:
+        return False
+
+pypif_scalars_ok = _check_pypif_scalars()
+
+def set_scalars(obj,vals):
+    """
+    Set the scalars of a pypif.obj.Value (or Property) to an array of values.
+    vals may be a ScalarArray, e.g. to be shared between records.
+    """
+    if not isinstance(vals,ScalarArray):
+        vals = ScalarArray(vals)
+    if pypif_scalars_ok:
+        obj._scalars = vals
+    else:
+        obj.scalars = list(vals)
+
+def values_property(vals,name=None,units=None,cond_vals=None,cond_name=None,cond_units=None):
+    """
+    Build a pypif.obj.Property holding an array of values,
+    with (optionally) a condition holding an array of the same length,
+    e.g. a spectrum I(q) with condition q.
+    A ScalarArray can be given for cond_vals, to be shared between records.
+    """
+    p = pifobj.Property()
+    p.name = name
+    set_scalars(p,vals)
+    p.units = units
+    p.conditions = []
+    if cond_vals is not None:
+        c = pifobj.Value(cond_name,None,None,None,None,cond_units)
+        set_scalars(c,cond_vals)
+        p.conditions.append(c)
+    return p
+
+def q_I_property(q_I,name=None,Iunits='arb',qunits='1/Angstrom'):
+    """
+    Build a pypif.obj.Property for an n-by-2 array of q and I(q),
+    with the intensities as scalars and q as the 'scattering vector' condition.
+    """
+    q_I = np.asarray(q_I)
+    return values_property(q_I[:,1],name,Iunits,q_I[:,0],'scattering vector',qunits)
+
+def scattering_pifs(uids,q,I,name='SAXS intensity',tags=None,Iunits='arb',qunits='1/Angstrom'):
+    """
+    Build one pypif.obj.ChemicalSystem per spectrum
+    for a batch of spectra on a shared q grid.
+
+    Parameters
+    ----------
+    uids : list of str
+        uid of each record
+    q : array
+        1d array of nq scattering vector values
+    I : array
+        (N, nq) array of intensities
+    name : str
+        name of the intensity Property
+    tags : list of str, optional
+        tags for every record
+
+    Returns
+    -------
+    pifs : list
+        list of N pypif.obj.ChemicalSystem objects
+    """
+    I = np.asarray(I)
+    if I.ndim != 2 or I.shape[1] != np.size(q):
+        raise ValueError('[{}] intensities of shape {} do not match {} q values'
+        .format(__name__,I.shape,np.size(q)))
+    # the q condition is shared by all records
+    q_scl = ScalarArray(q)
+    pifs = []
+    for uid,I_i in zip(uids,I):
+        csys = pifobj.ChemicalSystem()
+        csys.uid = uid
+        csys.tags = list(tags or [])
+        csys.properties = [values_property(I_i,name,Iunits,q_scl,'scattering vector',qunits)]
+        pifs.append(csys)
+    return pifs
+
+class PifJSONLWriter(object):
+    """
+    Write PIF records to a JSON-lines file, one record per line.
+
+    Parameters
+    ----------
+    file_path : str
+        path to the output file
+    compress : bool
+        if True, the file is gzip-compressed
+    append : bool
+        if True, records are appended to an existing file.
+        A compressed file is appended to as a new gzip member,
+        which gzip readers handle transparently.
+    """
+
+    def __init__(self,file_path,compress=False,append=False):
+        super(PifJSONLWriter,self).__init__()
+        self.file_path = file_path
+        self.n_written = 0
+        mode = 'a' if append else 'w'
+        if compress:
+            self._file = gzip.open(file_path,mode+'b',compresslevel=6)
+        else:
+            self._file = open(file_path,mode+'b')
+
+    def write(self,pifs):
+        """Write one record, or a list of records."""
+        if not isinstance(pifs,(list,tuple)):
+            pifs = [pifs]
+        lines = [json.dumps(p,cls=PifEncoder) for p in pifs]
+        if lines:
+            self._file.write(('\n'.join(lines)+'\n').encode('utf-8'))
+        self.n_written += len(lines)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+def read_jsonl(file_path):
+    """Load a list of records written by PifJSONLWriter."""
+    from pypif import pif
+    if file_path.endswith('.gz'):
+        f = gzip.open(file_path,'rb')
+    else:
+        f = open(file_path,'rb')
+    try:
+        return [pif.loads(l.decode('utf-8')) for l in f if l.strip()]
+    finally:
+        f.close()
@@ -0,0 +1,184 @@
+"""
+Bounded storage for results collected during realtime execution.
+"""
+from __future__ import print_function
+import os
+import threading
+import pickle
+import struct
+from collections import deque, OrderedDict
+
+class RunningStats(object):
+    """
+    Count, mean, variance, min and max of a stream of scalars.
+
+    Each update is O(1) (Welford's algorithm),
+    so the statistics can be kept for the whole length of a run.
+    """
+
+    def __init__(self):
+        super(RunningStats,self).__init__()
+        self.count = 0
+        self.mean = 0.
+        self.min = None
+        self.max = None
+        self._m2 = 0.
+
+    def update(self,x):
+        x = float(x)
+        self.count += 1
+        dx = x - self.mean
+        self.mean += dx/self.count
+        self._m2 += dx*(x - self.mean)
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+
+    def variance(self):
+        if self.count < 2:
+            return 0.
+        return self._m2/(self.count-1)
+
+    def as_dict(self):
+        d = OrderedDict()
+        d['count'] = self.count
+        d['mean'] = self.mean
+        d['std'] = self.variance()**0.5
+        d['min'] = self.min
+        d['max'] = self.max
+        return d
+
+class ResultRingBuffer(object):
+    """
+    List-like container that keeps only the latest results in memory.
+
+    The last `capacity` results are held in full.
+    When an older result is pushed out of memory,
+    it is pickled onto the end of `spill_path`, if one is given,
+    from where it can still be fetched by index (slowly).
+    The file offsets of the spilled results are kept
+    in an index file (`spill_path`+'.idx', 8 bytes per result),
+    so memory use does not grow with the number of results.
+    If `spill_path` is None, results pushed out of memory are discarded.
+
+    Running statistics (see RunningStats) are kept
+    for the entries of each result named in `stat_keys`,
+    whenever those entries can be cast to float.
+
+    Parameters
+    ----------
+    capacity : int
+        number of results to keep in memory
+    spill_path : str, optional
+        path of a file where older results are written
+    stat_keys : list, optional
+        keys of scalar result entries to keep statistics for
+    delete_spill : bool
+        if True, the spill file and its index are deleted by close()
+    """
+
+    def __init__(self,capacity=1000,spill_path=None,stat_keys=[],delete_spill=False):
+        super(ResultRingBuffer,self).__init__()
+        self.capacity = max(int(capacity),1)
+        self.spill_path = spill_path
+        self.delete_spill = delete_spill
+        self.stats = OrderedDict([(k,RunningStats()) for k in stat_keys])
+        self._buffer = deque()
+        self._n_total = 0
+        self._spill_file = None
+        self._index_file = None
+        self._lock = threading.Lock()
+        if spill_path is not None:
+            # start a new spill file
+            self._spill_file = open(spill_path,'w+b')
+            self._index_file = open(spill_path+'.idx','w+b')
+
+    def append(self,result):
+        with self._lock:
+            self._buffer.append(result)
+            self._n_total += 1
+            if len(self._buffer) > self.capacity:
+                self._spill(self._buffer.popleft())
+            for k,st in self.stats.items():
+                if k in result:
+                    try:
+                        st.update(result[k])
+                    except (TypeError,ValueError):
+                        pass
+
+    def _spill(self,result):
+        if self._spill_file is None:
+            return
+        f = self._spill_file
+        f.seek(0,os.SEEK_END)
+        self._index_file.seek(0,os.SEEK_END)
+        self._index_file.write(struct.pack('<q',f.tell()))
+        pickle.dump(result,f,pickle.HIGHEST_PROTOCOL)
+
+    def _load_spilled(self,idx):
+        if self._spill_file is None:
+            raise IndexError('result {} was discarded '\
+            '(no spill file was provided, or the buffer was closed)'.format(idx))
+        self._index_file.seek(8*idx)
+        offset = struct.unpack('<q',self._index_file.read(8))[0]
+        self._spill_file.seek(offset)
+        return pickle.load(self._spill_file)
+
+    def close(self):
+        """
+        Close the spill file (and delete it, if delete_spill is True).
+        Results that were spilled can no longer be fetched.
+        """
+        with self._lock:
+            for f in [self._spill_file,self._index_file]:
+                if f is not None:
+                    f.close()
+            self._spill_file = None
+            self._index_file = None
+            if self.delete_spill and self.spill_path is not None:
+                for p in [self.spill_path,self.spill_path+'.idx']:
+                    if os.path.exists(p):
+                        os.remove(p)
+                self.spill_path = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def n_in_memory(self):
+        return len(self._buffer)
+
+    def latest(self,n=1):
+        """Return a list of the latest n results held in memory."""
+        with self._lock:
+            n = min(n,len(self._buffer))
+            return [self._buffer[i] for i in range(len(self._buffer)-n,len(self._buffer))]
+
+    def stats_dict(self):
+        """Return a dict of {key:statistics dict} for the stat_keys."""
+        with self._lock:
+            return OrderedDict([(k,st.as_dict()) for k,st in self.stats.items()])
+
+    def __len__(self):
+        return self._n_total
+
+    def __getitem__(self,idx):
+        if isinstance(idx,slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += self._n_total
+        if idx < 0 or idx >= self._n_total:
+            raise IndexError('result index out of range')
+        with self._lock:
+            n_spilled = self._n_total - len(self._buffer)
+            if idx >= n_spilled:
+                return self._buffer[idx-n_spilled]
+            return self._load_spilled(idx)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
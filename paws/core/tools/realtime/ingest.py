@@ -0,0 +1,241 @@
+"""
+Tools for handing newly-arrived files to workflows in realtime.
+
+WriteCompletionFilter holds back files that are still being written.
+RealtimeIngest executes a workflow for each ready file
+on a pool of worker threads, each with its own copy of the workflow,
+and hands back results in the order the files arrived.
+"""
+from __future__ import print_function
+import os
+import time
+import threading
+import traceback
+from collections import OrderedDict
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+class WriteCompletionFilter(object):
+    """
+    Hold newly-detected files until they are completely written.
+
+    A file is considered complete when its size and modification time
+    have not changed for `settle_time` seconds.
+    If `header_ext` is given (e.g. '.txt' for SSRL beamline 1-5),
+    a file is instead considered complete as soon as
+    a header file with the same base name and that extension exists,
+    since the header is written after the image.
+    Files that are deleted while pending,
+    or that are not complete within `max_pending_time` seconds
+    (e.g. files that stay empty, or whose header never appears),
+    are dropped, so that they are not waited for indefinitely.
+
+    Parameters
+    ----------
+    settle_time : float
+        time in seconds that size and mtime must hold steady
+    header_ext : str, optional
+        extension of a header file whose appearance
+        marks the image file as complete
+    max_pending_time : float, optional
+        time in seconds after which an incomplete file is dropped-
+        if None, files are kept pending until they are complete or deleted
+    """
+
+    def __init__(self,settle_time=0.1,header_ext=None,max_pending_time=60.):
+        super(WriteCompletionFilter,self).__init__()
+        self.settle_time = settle_time
+        self.header_ext = header_ext
+        self.max_pending_time = max_pending_time
+        # path : [size, mtime, time at which size and mtime were last seen to change,
+        # time at which the path was added]
+        self.pending = OrderedDict()
+        # (path, reason) for each path dropped since the last pop_dropped()
+        self.dropped = []
+
+    def add(self,path):
+        if not path in self.pending:
+            t = time.time()
+            self.pending[path] = [None,None,t,t]
+
+    def n_pending(self):
+        return len(self.pending)
+
+    def is_ready(self,path,now=None):
+        if now is None:
+            now = time.time()
+        if self.header_ext is not None:
+            return os.path.exists(os.path.splitext(path)[0]+self.header_ext)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        rec = self.pending[path]
+        if st.st_size != rec[0] or st.st_mtime != rec[1]:
+            rec[0] = st.st_size
+            rec[1] = st.st_mtime
+            rec[2] = now
+            return self.settle_time <= 0 and st.st_size > 0
+        return st.st_size > 0 and now - rec[2] >= self.settle_time
+
+    def pop_ready(self):
+        """
+        Return the pending paths that are now complete, in arrival order,
+        and stop tracking them.
+        Paths that no longer exist, and paths pending
+        for more than max_pending_time, are dropped (see pop_dropped()).
+        """
+        now = time.time()
+        rdy = []
+        for p,rec in list(self.pending.items()):
+            if not os.path.exists(p):
+                self.pending.pop(p)
+                self.dropped.append((p,'deleted'))
+            elif self.is_ready(p,now):
+                self.pending.pop(p)
+                rdy.append(p)
+            elif self.max_pending_time is not None and now - rec[3] > self.max_pending_time:
+                self.pending.pop(p)
+                self.dropped.append((p,'not complete after {} s'.format(self.max_pending_time)))
+        return rdy
+
+    def pop_dropped(self):
+        """
+        Return a list of (path, reason) for the paths dropped
+        since the last call, in the order they were dropped.
+        """
+        d = self.dropped
+        self.dropped = []
+        return d
+
+class RealtimeIngest(object):
+    """
+    Execute a Workflow for each submitted file path, on a pool of threads.
+
+    Each worker thread executes its own clone of the Workflow,
+    so that several files can be processed at once.
+    Results are committed in submission (arrival) order,
+    even if a later file finishes first.
+
+    Parameters
+    ----------
+    workflow : Workflow
+        the Workflow to be executed for each file
+    input_name : str
+        name of the workflow input where the file paths will be used
+    n_workers : int
+        number of worker threads.
+        The first worker uses `workflow` itself;
+        the others use copies made by Workflow.clone_wf().
+    metrics : LatencyMetrics, optional
+        if provided, the timestamps of each file 
+        (see LatencyMetrics.record_timestamps())
+        are recorded here when its result is committed
+    """
+
+    def __init__(self,workflow,input_name,n_workers=1,metrics=None):
+        super(RealtimeIngest,self).__init__()
+        self.input_name = input_name
+        self.n_workers = max(int(n_workers),1)
+        self.metrics = metrics
+        self.message_callback = workflow.message_callback
+        self._jobs = queue.Queue()
+        self._results = {}
+        self._results_lock = threading.Lock()
+        self._results_ready = threading.Condition(self._results_lock)
+        self._n_submitted = 0
+        self._n_committed = 0
+        self._threads = []
+        for iw in range(self.n_workers):
+            if iw == 0:
+                wf = workflow
+            else:
+                wf = workflow.clone_wf()
+            th = threading.Thread(target=self._work,args=(wf,))
+            th.daemon = True
+            th.start()
+            self._threads.append(th)
+
+    def _work(self,wf):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            idx,path,ts = job
+            ts['started'] = time.time()
+            inp_dict = OrderedDict()
+            inp_dict[self.input_name] = path
+            try:
+                wf.set_wf_input(self.input_name,path)
+                wf.execute()
+                out_dict = wf.wf_outputs_dict()
+            except Exception as ex:
+                self.message_callback('Error processing {}: {}{}{}'
+                .format(path,ex,os.linesep,traceback.format_exc()))
+                out_dict = OrderedDict()
+            for i,(op_tag,t) in enumerate(wf.op_times.items()):
+                if i == 0:
+                    # the first Operation is expected to read the file
+                    ts['read'] = t
+                ts['op:'+op_tag] = t
+            ts['finished'] = time.time()
+            with self._results_lock:
+                self._results[idx] = (inp_dict,out_dict,ts)
+                self._results_ready.notify_all()
+
+    def submit(self,path,timestamps=None):
+        """
+        Queue a file path for processing. Returns its sequence index.
+        Optional `timestamps` is an OrderedDict of {event:time}
+        for events that happened before submission (e.g. 'detected', 'ready').
+        """
+        idx = self._n_submitted
+        self._n_submitted += 1
+        ts = OrderedDict(timestamps or [])
+        if not 'ready' in ts:
+            ts['ready'] = time.time()
+        self._jobs.put((idx,path,ts))
+        return idx
+
+    def n_queued(self):
+        """Number of submitted files that are waiting for a worker."""
+        return self._jobs.qsize()
+
+    def n_in_flight(self):
+        """Number of submitted files whose results have not been committed."""
+        return self._n_submitted - self._n_committed
+
+    def collect(self,timeout=0.):
+        """
+        Return a list of (input_dict,output_dict) results
+        that are ready to be committed in arrival order,
+        waiting up to `timeout` seconds for the next one.
+        """
+        t_end = time.time() + timeout
+        res = []
+        with self._results_lock:
+            while not self._n_committed in self._results:
+                remaining = t_end - time.time()
+                if remaining <= 0 or self.n_in_flight() == 0:
+                    break
+                self._results_ready.wait(remaining)
+            while self._n_committed in self._results:
+                inp_dict,out_dict,ts = self._results.pop(self._n_committed)
+                ts['committed'] = time.time()
+                if self.metrics is not None:
+                    self.metrics.record_timestamps(ts)
+                res.append((inp_dict,out_dict))
+                self._n_committed += 1
+        return res
+
+    def close(self):
+        """Stop the workers after the queued jobs are done."""
+        for th in self._threads:
+            self._jobs.put(None)
+        for th in self._threads:
+            th.join()
+        self._threads = []
+
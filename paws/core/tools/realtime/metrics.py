@@ -0,0 +1,122 @@
+"""
+Latency metrics for realtime execution.
+"""
+from __future__ import print_function
+import os
+import time
+import json
+import threading
+from collections import deque, OrderedDict
+
+def percentile(sorted_vals,pct):
+    """Nearest-rank percentile of an already-sorted list of values."""
+    if not sorted_vals:
+        return None
+    idx = int(round(pct/100.*(len(sorted_vals)-1)))
+    return sorted_vals[idx]
+
+class LatencyMetrics(object):
+    """
+    Collect per-stage latencies and queue depths during realtime execution.
+
+    Latencies (in seconds) are recorded by stage name.
+    Percentiles are computed over the latest `window` samples of each stage.
+    Queue depths are recorded as gauges, which hold their latest value.
+
+    Parameters
+    ----------
+    window : int
+        number of recent samples kept for each stage
+    """
+
+    def __init__(self,window=10000):
+        super(LatencyMetrics,self).__init__()
+        self.window = window
+        self.samples = OrderedDict()
+        self.counts = OrderedDict()
+        self.gauges = OrderedDict()
+        self.t_start = time.time()
+        self._lock = threading.Lock()
+
+    def record(self,stage,seconds):
+        with self._lock:
+            if not stage in self.samples:
+                self.samples[stage] = deque(maxlen=self.window)
+                self.counts[stage] = 0
+            self.samples[stage].append(seconds)
+            self.counts[stage] += 1
+
+    def record_timestamps(self,ts):
+        """
+        Record the stage latencies for one file,
+        given an OrderedDict of its {event:timestamp}.
+        Events 'detected', 'ready', 'started', 'read' and 'committed'
+        are recognized; any event named 'op:<op_tag>'
+        is taken as the completion time of that Operation.
+        """
+        def interval(stage,ev1,ev2):
+            if ev1 in ts and ev2 in ts:
+                self.record(stage,ts[ev2]-ts[ev1])
+        interval('write_wait','detected','ready')
+        interval('queue_wait','ready','started')
+        interval('detect_to_read','detected','read')
+        interval('execution','started','finished')
+        interval('commit_wait','finished','committed')
+        interval('total','detected','committed')
+        t_prev = ts.get('started')
+        for ev,t in ts.items():
+            if ev.startswith('op:'):
+                if t_prev is not None:
+                    self.record(ev,t-t_prev)
+                t_prev = t
+
+    def set_gauge(self,name,val):
+        with self._lock:
+            self.gauges[name] = val
+
+    def metrics_dict(self):
+        """
+        Return a dict of the current metrics:
+        'latency' holds {stage:{count,mean,p50,p95,p99,max}} (seconds),
+        'queue_depth' holds the latest value of each gauge.
+        """
+        with self._lock:
+            lat = OrderedDict()
+            for stage,smp in self.samples.items():
+                vals = sorted(smp)
+                d = OrderedDict()
+                d['count'] = self.counts[stage]
+                d['mean'] = sum(vals)/len(vals)
+                d['p50'] = percentile(vals,50)
+                d['p95'] = percentile(vals,95)
+                d['p99'] = percentile(vals,99)
+                d['max'] = vals[-1]
+                lat[stage] = d
+            md = OrderedDict()
+            md['time'] = time.time()
+            md['uptime'] = md['time'] - self.t_start
+            md['latency'] = lat
+            md['queue_depth'] = OrderedDict(self.gauges)
+        return md
+
+    def dump(self,path):
+        """
+        Save the current metrics to `path`.
+        If path ends in .csv, one row per stage is appended to the file.
+        Otherwise, the file is overwritten with the metrics as JSON.
+        """
+        md = self.metrics_dict()
+        if os.path.splitext(path)[1].lower() == '.csv':
+            write_header = not os.path.exists(path)
+            with open(path,'a') as f:
+                if write_header:
+                    f.write('time,stage,count,mean,p50,p95,p99,max'+os.linesep)
+                for stage,d in md['latency'].items():
+                    f.write('{},{},{},{},{},{},{},{}'.format(md['time'],stage,
+                    d['count'],d['mean'],d['p50'],d['p95'],d['p99'],d['max'])+os.linesep)
+                for nm,val in md['queue_depth'].items():
+                    f.write('{},queue_depth:{},{},,,,,'.format(md['time'],nm,val)+os.linesep)
+        else:
+            with open(path,'w') as f:
+                json.dump(md,f,indent=2)
+
@@ -0,0 +1,227 @@
+"""
+Tools for detecting new files in a directory as they arrive.
+
+On Linux, the kernel's inotify interface is used (through ctypes),
+so that new files are reported as soon as they are closed or moved
+into the watched directory. Elsewhere, or if inotify is not available,
+the directory is scanned incrementally: the scan is skipped
+whenever the directory modification time has not changed,
+and previously reported paths are kept in a set.
+"""
+from __future__ import print_function
+import os
+import sys
+import time
+import errno
+import fnmatch
+import select
+import struct
+import ctypes
+import ctypes.util
+from collections import deque
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None
+
+# inotify flags, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_event_header = struct.Struct('iIII')
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError,AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int,ctypes.c_char_p,ctypes.c_uint32]
+    return libc
+
+_libc = _load_libc()
+
+def inotify_available():
+    """Return True if the inotify interface can be used on this platform."""
+    return _libc is not None
+
+class FileWatcher(object):
+    """
+    Watch a directory for new files whose names match a glob-style pattern.
+
+    New paths are collected in arrival order into FileWatcher.queue
+    and handed out by FileWatcher.next_path().
+    Each path is reported only once.
+
+    Parameters
+    ----------
+    dirpath : str
+        path to the directory to be watched
+    regex : str
+        glob-style pattern (e.g. '*.tif') used to filter file names
+    include_existing_files : bool
+        if True, files that are already in the directory
+        are queued (sorted by modification time) before any new arrivals
+    use_inotify : bool
+        if True (default), use inotify where it is available.
+        If False, or if inotify is not available,
+        fall back to incremental directory scanning.
+    """
+
+    def __init__(self,dirpath,regex,include_existing_files=True,use_inotify=True):
+        super(FileWatcher,self).__init__()
+        self.dirpath = dirpath
+        self.rx = regex
+        self.paths_done = set()
+        self.queue = deque()
+        self._fd = None
+        self._dir_mtime = None
+        self._scan_time = None
+        if use_inotify and inotify_available():
+            self._start_inotify()
+        existing_paths = self._scan()
+        self.paths_done.update(existing_paths)
+        if include_existing_files:
+            self.queue.extend(existing_paths)
+
+    def _start_inotify(self):
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+        dp = os.path.abspath(self.dirpath)
+        if not isinstance(dp,bytes):
+            dp = dp.encode(sys.getfilesystemencoding())
+        wd = _libc.inotify_add_watch(fd,dp,IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(fd)
+            return
+        self._fd = fd
+
+    def uses_inotify(self):
+        return self._fd is not None
+
+    def _scan(self):
+        """
+        Scan the directory and return a list of matching paths
+        that have not yet been reported, sorted by modification time.
+        The scan is skipped if the directory has not changed
+        since the last complete scan.
+        """
+        try:
+            st = os.stat(self.dirpath)
+        except OSError:
+            return []
+        now = time.time()
+        # a directory mtime within one second of the last scan
+        # may hide later changes on filesystems with coarse timestamps
+        if (st.st_mtime == self._dir_mtime
+        and self._scan_time is not None
+        and self._scan_time - st.st_mtime > 1.):
+            return []
+        self._dir_mtime = st.st_mtime
+        self._scan_time = now
+        new_files = []
+        if scandir is not None:
+            for entry in scandir(self.dirpath):
+                p = os.path.join(self.dirpath,entry.name)
+                if (p not in self.paths_done and fnmatch.fnmatch(entry.name,self.rx)
+                and entry.is_file()):
+                    new_files.append((entry.stat().st_mtime,p))
+        else:
+            for fnm in os.listdir(self.dirpath):
+                p = os.path.join(self.dirpath,fnm)
+                if (p not in self.paths_done and fnmatch.fnmatch(fnm,self.rx)
+                and os.path.isfile(p)):
+                    new_files.append((os.path.getmtime(p),p))
+        new_files.sort()
+        return [p for mt,p in new_files]
+
+    def _read_events(self,timeout):
+        """Read pending inotify events, waiting up to `timeout` seconds."""
+        rdy = select.select([self._fd],[],[],timeout)[0]
+        if not rdy:
+            return []
+        try:
+            buf = os.read(self._fd,65536)
+        except OSError as ex:
+            if ex.errno == errno.EAGAIN:
+                return []
+            raise
+        new_files = []
+        overflow = False
+        i = 0
+        while i + _event_header.size <= len(buf):
+            wd,mask,cookie,nmlen = _event_header.unpack_from(buf,i)
+            i += _event_header.size
+            nm = buf[i:i+nmlen].rstrip(b'\0')
+            i += nmlen
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif nm:
+                if not isinstance(nm,str):
+                    nm = nm.decode(sys.getfilesystemencoding())
+                if fnmatch.fnmatch(nm,self.rx):
+                    new_files.append(os.path.join(self.dirpath,nm))
+        if overflow:
+            # the kernel dropped events: fall back to a full scan
+            self._dir_mtime = None
+            new_files.extend(self._scan())
+        return new_files
+
+    def poll(self,timeout=0.):
+        """
+        Check for new files, waiting up to `timeout` seconds for arrivals.
+        New paths are appended to FileWatcher.queue.
+
+        Returns
+        -------
+        n_new : int
+            number of paths added to the queue
+        """
+        n_new = 0
+        t_end = time.time() + timeout
+        while True:
+            if self._fd is not None:
+                new_files = self._read_events(max(t_end-time.time(),0.))
+            else:
+                new_files = self._scan()
+            for p in new_files:
+                if not p in self.paths_done:
+                    self.paths_done.add(p)
+                    self.queue.append(p)
+                    n_new += 1
+            remaining = t_end - time.time()
+            if n_new > 0 or remaining <= 0:
+                return n_new
+            if self._fd is None:
+                time.sleep(min(remaining,0.01))
+
+    def next_path(self,timeout=0.):
+        """
+        Return the earliest-arrived path that has not yet been handed out,
+        waiting up to `timeout` seconds for one to arrive.
+        Returns None if no new path was found.
+        """
+        if not self.queue:
+            self.poll(timeout)
+        if self.queue:
+            return self.queue.popleft()
+        return None
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
@@ -1,6 +1,5 @@
 from collections import OrderedDict
 
-import yaml
 import sklearn
 from sklearn import preprocessing,linear_model
 from collections import OrderedDict
@@ -20,7 +19,7 @@ class SaxsClassifier(object):
             yml_file = os.path.join(d,'modeling_data','scalers_and_models.yml')
 
         s_and_m_file = open(yml_file,'rb')
-        s_and_m = yaml.load(s_and_m_file)
+        s_and_m = pawstools.yaml_load(s_and_m_file)
 
         sk_version = s_and_m['version']
         cur_version = list(map(int,sklearn.__version__.split('.')))
@@ -7,11 +7,17 @@ import copy
 import numpy as np
 from scipy.optimize import minimize as scipimin
 
-def compute_saxs(q,flags,params):
+from . import saxs_table
+
+def compute_saxs(q,flags,params,exact=False):
     """Compute a SAXS intensity spectrum given some parameters.
 
     TODO: Document the equation.
 
+    Unless `exact` is True, the spherical form factor term
+    is interpolated from sphere_table() wherever q*r0_sphere and sigma_sphere
+    are within the table, to within a few parts in 1E3.
+
     Parameters
     ----------
     q : array
@@ -32,6 +38,9 @@ def compute_saxs(q,flags,params):
         - 'I0_sphere': spherical form factor scattering intensity scaling factor 
         - 'r0_sphere': mean sphere size (Angstrom) 
         - 'sigma_sphere': fractional standard deviation of sphere size 
+    exact : bool
+        if True, always integrate the spherical form factor
+        over the size distribution (see spherical_normal_saxs())
 
     Returns
     ------- 
@@ -60,10 +69,102 @@ def compute_saxs(q,flags,params):
             I0_sph = params['I0_sphere']
             r0_sph = params['r0_sphere']
             sigma_sph = params['sigma_sphere']
-            I_sph = spherical_normal_saxs(q,r0_sph,sigma_sph)
+            if exact:
+                I_sph = spherical_normal_saxs(q,r0_sph,sigma_sph)
+            else:
+                I_sph = tabulated_normal_saxs(q,r0_sph,sigma_sph)
             I += I0_sph*I_sph
     return I
 
+def compute_saxs_jacobian(q,flags,params):
+    """Compute a SAXS intensity spectrum and its derivatives with respect to params.
+
+    The spherical form factor term is always integrated
+    over the size distribution (as in compute_saxs() with exact=True).
+
+    Parameters
+    ----------
+    q : array
+        Array of q values at which saxs intensity should be computed.
+    flags : dict
+        Flags for scatterer populations (see compute_saxs()).
+    params : dict
+        Scattering equation parameters (see compute_saxs()).
+
+    Returns
+    -------
+    I : array
+        Array of scattering intensities for each of the input q values
+    dI : array
+        Array of shape (len(q),len(params)) of the derivatives of I
+        with respect to each of the params, in the order of params.keys().
+        Derivatives with respect to params that do not enter I are zero.
+    """
+    q = np.asarray(q,dtype=float)
+    b_flag = flags['bad_data']
+    s_flag = flags['diffraction_peaks']
+    I = np.zeros(len(q))
+    d = {}
+    if not b_flag and not s_flag:
+        pre_flag = flags['precursor_scattering']
+        f_flag = flags['form_factor_scattering']
+        I = params['I0_floor']*np.ones(len(q))
+        d['I0_floor'] = np.ones(len(q))
+        if pre_flag:
+            rg_pre = params['rg_precursor']
+            G_pre = params['G_precursor']
+            I += guinier_porod(q,rg_pre,4,G_pre)
+            d['G_precursor'],d['rg_precursor'] = guinier_porod_jacobian(q,rg_pre,4,G_pre)
+        if f_flag:
+            I0_sph = params['I0_sphere']
+            I_sph,dI_dr0,dI_dsigma = spherical_normal_saxs_jacobian(
+                q,params['r0_sphere'],params['sigma_sphere'])
+            I += I0_sph*I_sph
+            d['I0_sphere'] = I_sph
+            d['r0_sphere'] = I0_sph*dI_dr0
+            d['sigma_sphere'] = I0_sph*dI_dsigma
+    dI = np.zeros((len(q),len(params)))
+    for i,k in enumerate(params.keys()):
+        if k in d:
+            dI[:,i] = d[k]
+    return I,dI
+
+# q*r0 below which spherical_normal_saxs() integrates by Gauss-Hermite quadrature
+gh_qr_max = 1.
+# number of Gauss-Hermite nodes
+n_gh_nodes = 40
+_gh_nodes = {}
+
+def gauss_hermite_nodes(n=None):
+    """
+    Gauss-Hermite nodes and weights for averaging over a standard normal
+    distribution: mean(f(z)) is approximated by sum(w*f(t)).
+    The nodes are computed once for each n.
+    """
+    if n is None:
+        n = n_gh_nodes
+    tw = _gh_nodes.get(n)
+    if tw is None:
+        t,w = np.polynomial.hermite.hermgauss(n)
+        tw = (np.sqrt(2.)*t,w/np.sqrt(np.pi))
+        for a in tw:
+            a.flags.writeable = False
+        _gh_nodes[n] = tw
+    return tw
+
+def sphere_ff(x):
+    """Spherical form factor amplitude 3*(sin(x)-x*cos(x))/x**3, equal to 1 at x=0."""
+    x = np.asarray(x,dtype=float)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        f = 3.*(np.sin(x)-x*np.cos(x))/x**3
+    small = np.abs(x) < 1.E-2
+    f[small] = 1.-x[small]**2/10.
+    return f
+
+def normal_r6_moment(r0,sigma_r):
+    """Mean of r**6 for radii r normally distributed about r0 with width sigma_r."""
+    return r0**6+15*r0**4*sigma_r**2+45*r0**2*sigma_r**4+15*sigma_r**6
+
 def spherical_normal_saxs(q,r0,sigma):
     """Compute SAXS intensity of a normally-distributed sphere population.
 
@@ -72,6 +173,14 @@ def spherical_normal_saxs(q,r0,sigma):
     The returned intensity is normalized 
     such that I(q=0) is equal to 1.
 
+    The intensity is the average of V(r)**2*sphere_ff(q*r)**2
+    over the size distribution, divided by the average of V(r)**2.
+    For q*r0 < gh_qr_max, the average is computed by Gauss-Hermite quadrature,
+    as one (n_gh_nodes x nq) matrix product.
+    At larger q*r0, where the integrand oscillates too fast for the quadrature,
+    the closed form of the average over the normal distribution is used.
+    The normalization (the average of r**6) is computed analytically.
+
     Parameters
     ----------
     q : array
@@ -86,30 +195,165 @@ def spherical_normal_saxs(q,r0,sigma):
     I : array
         Array of scattering intensities for each of the input q values
     """
-    q_zero = (q == 0)
-    q_nz = np.invert(q_zero) 
-    I = np.zeros(q.shape)
-    if sigma < 1E-9:
-        x = q*r0
-        V_r0 = float(4)/3*np.pi*r0**3
-        I[q_nz] = V_r0**2 * (3.*(np.sin(x[q_nz])-x[q_nz]*np.cos(x[q_nz]))*x[q_nz]**-3)**2
-        I_zero = V_r0**2 
-    else:
-        sigma_r = sigma*r0
-        dr = sigma_r*0.02
-        rmin = np.max([r0-5*sigma_r,dr])
-        rmax = r0+5*sigma_r
-        I_zero = 0
-        for ri in np.arange(rmin,rmax,dr):
-            xi = q*ri
-            V_ri = float(4)/3*np.pi*ri**3
-            # The normal-distributed density of particles with radius r_i:
-            rhoi = 1./(np.sqrt(2*np.pi)*sigma_r)*np.exp(-1*(r0-ri)**2/(2*sigma_r**2))
-            I_zero += V_ri**2 * rhoi*dr
-            I[q_nz] += V_ri**2 * rhoi*dr*(3.*(np.sin(xi[q_nz])-xi[q_nz]*np.cos(xi[q_nz]))*xi[q_nz]**-3)**2
-    if any(q_zero):
-        I[q_zero] = I_zero
-    I = I/I_zero 
+    q = np.asarray(q,dtype=float)
+    r0 = float(r0)
+    sigma_r = max(float(sigma),0.)*r0
+    I_zero = normal_r6_moment(r0,sigma_r)
+    I = np.empty(q.shape)
+    idx_gh = np.abs(q)*r0 < gh_qr_max
+    if np.any(idx_gh):
+        t,w = gauss_hermite_nodes()
+        r = r0+sigma_r*t
+        f = sphere_ff(np.outer(r,q[idx_gh]))
+        I[idx_gh] = np.dot(w*r**6,f*f)
+    idx_cf = np.invert(idx_gh)
+    if np.any(idx_cf):
+        I[idx_cf] = _normal_r6_ff2(q[idx_cf],r0,sigma_r)
+    I[q == 0] = I_zero
+    return I/I_zero
+
+def _normal_r6_ff2(q,r0,sigma_r):
+    """
+    Closed form of the mean of r**6*sphere_ff(q*r)**2
+    for r normally distributed about r0 with width sigma_r.
+    Uses x**6*sphere_ff(x)**2/9 = (1+x**2)/2 + Re(((x**2-1)/2+i*x)*exp(2i*x)),
+    and mean(g(r)*exp(i*k*r)) = exp(i*k*r0-(k*sigma_r)**2/2)*mean(g(r+i*k*sigma_r**2)).
+    Loses precision for q*r0 much smaller than 1.
+    """
+    k = 2*q
+    s2 = sigma_r**2
+    phi = np.exp(1j*k*r0-k**2*s2/2)
+    m = r0+1j*k*s2
+    osc = phi*((q**2*(m**2+s2)-1)/2+1j*q*m)
+    return 9.*((1+q**2*(r0**2+s2))/2+osc.real)/q**6
+
+def sphere_ff_deriv(x,f=None):
+    """
+    Derivative of sphere_ff(x), 3*sin(x)/x**2 - 3*sphere_ff(x)/x.
+    f, if given, is sphere_ff(x).
+    """
+    x = np.asarray(x,dtype=float)
+    if f is None:
+        f = sphere_ff(x)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        df = 3.*np.sin(x)/x**2-3.*f/x
+    small = np.abs(x) < 1.E-2
+    df[small] = -x[small]/5.
+    return df
+
+def normal_r6_moment_deriv(r0,sigma_r):
+    """Derivatives of normal_r6_moment(r0,sigma_r) with respect to r0 and sigma_r."""
+    return (6*r0**5+60*r0**3*sigma_r**2+90*r0*sigma_r**4,
+        30*r0**4*sigma_r+180*r0**2*sigma_r**3+90*sigma_r**5)
+
+def spherical_normal_saxs_jacobian(q,r0,sigma):
+    """
+    Compute spherical_normal_saxs(q,r0,sigma)
+    and its derivatives with respect to r0 and sigma.
+
+    Returns
+    -------
+    I : array
+        normalized intensity (see spherical_normal_saxs())
+    dI_dr0 : array
+        derivative of I with respect to r0
+    dI_dsigma : array
+        derivative of I with respect to sigma
+    """
+    q = np.asarray(q,dtype=float)
+    r0 = float(r0)
+    sigma = max(float(sigma),0.)
+    sigma_r = sigma*r0
+    # mean of r**6*sphere_ff(q*r)**2, and its derivatives
+    # with respect to r0 and sigma_r (at fixed sigma_r and r0, respectively)
+    N = np.empty(q.shape)
+    dN_dr0 = np.empty(q.shape)
+    dN_ds = np.empty(q.shape)
+    idx_gh = np.abs(q)*r0 < gh_qr_max
+    if np.any(idx_gh):
+        t,w = gauss_hermite_nodes()
+        r = r0+sigma_r*t
+        x = np.outer(r,q[idx_gh])
+        f = sphere_ff(x)
+        df = sphere_ff_deriv(x,f)
+        # derivative of r**6*f(q*r)**2 with respect to r
+        g = (6*r**5)[:,np.newaxis]*f*f+(2*r**6)[:,np.newaxis]*f*df*q[idx_gh]
+        N[idx_gh] = np.dot(w*r**6,f*f)
+        dN_dr0[idx_gh] = np.dot(w,g)
+        dN_ds[idx_gh] = np.dot(w*t,g)
+    idx_cf = np.invert(idx_gh)
+    if np.any(idx_cf):
+        N[idx_cf],dN_dr0[idx_cf],dN_ds[idx_cf] = _normal_r6_ff2_jacobian(q[idx_cf],r0,sigma_r)
+    D = normal_r6_moment(r0,sigma_r)
+    dD_dr0,dD_ds = normal_r6_moment_deriv(r0,sigma_r)
+    I = N/D
+    I[q == 0] = 1.
+    # sigma_r = sigma*r0
+    dI_dr0 = (dN_dr0+sigma*dN_ds-I*(dD_dr0+sigma*dD_ds))/D
+    dI_dsigma = r0*(dN_ds-I*dD_ds)/D
+    return I,dI_dr0,dI_dsigma
+
+def _normal_r6_ff2_jacobian(q,r0,sigma_r):
+    """
+    _normal_r6_ff2(q,r0,sigma_r) and its derivatives
+    with respect to r0 and sigma_r.
+    """
+    k = 2*q
+    s2 = sigma_r**2
+    phi = np.exp(1j*k*r0-k**2*s2/2)
+    m = r0+1j*k*s2
+    A = (q**2*(m**2+s2)-1)/2+1j*q*m
+    dA_dr0 = q**2*m+1j*q
+    dm_ds = 2j*k*sigma_r
+    dA_ds = q**2*(m*dm_ds+sigma_r)+1j*q*dm_ds
+    N = 9.*((1+q**2*(r0**2+s2))/2+(phi*A).real)/q**6
+    dN_dr0 = 9.*(q**2*r0+(phi*(1j*k*A+dA_dr0)).real)/q**6
+    dN_ds = 9.*(q**2*sigma_r+(phi*(dA_ds-k**2*sigma_r*A)).real)/q**6
+    return N,dN_dr0,dN_ds
+
+# grid of sphere_table(): u = q*r0 from 0 to sphere_table_u_max in steps of sphere_table_du,
+# sigma from sphere_table_sigma_min to sphere_table_sigma_max in steps of sphere_table_dsigma.
+# Off the grid, the interpolated intensities are within about 2e-3 (relative)
+# of spherical_normal_saxs(), the largest errors being near the minima at small sigma.
+sphere_table_u_max = 100.
+sphere_table_du = 0.005
+sphere_table_sigma_min = 0.02
+sphere_table_sigma_max = 0.5
+sphere_table_dsigma = 0.005
+
+def sphere_table():
+    """
+    Table of spherical_normal_saxs() over u = q*r0 and sigma
+    (see saxs_table.IntensityTable).
+    The table is built on the first use (in about a second)
+    and saved to the paws scratch directory.
+    """
+    grid = (sphere_table_u_max,sphere_table_du,
+        sphere_table_sigma_min,sphere_table_sigma_max,sphere_table_dsigma)
+    key = saxs_table.table_key('spherical_normal_saxs',*grid)
+    return saxs_table.cached_table(key,
+        partial(saxs_table.build_table,_unit_normal_saxs,*grid))
+
+def _unit_normal_saxs(u,sigma):
+    return spherical_normal_saxs(u,1.,sigma)
+
+def tabulated_normal_saxs(q,r0,sigma):
+    """
+    spherical_normal_saxs(q,r0,sigma), interpolated from sphere_table()
+    where q*r0 and sigma are within the table, and computed elsewhere.
+    """
+    q = np.asarray(q,dtype=float)
+    tbl = sphere_table()
+    if not tbl.covers_sigma(sigma):
+        return spherical_normal_saxs(q,r0,sigma)
+    u = q*r0
+    idx_tbl = tbl.covers(u)
+    if np.all(idx_tbl):
+        return tbl.interpolate(u,sigma)
+    I = np.empty(q.shape)
+    I[idx_tbl] = tbl.interpolate(u[idx_tbl],sigma)
+    idx_ex = np.invert(idx_tbl)
+    I[idx_ex] = spherical_normal_saxs(q[idx_ex],r0,sigma)
     return I
 
 def guinier_porod(q,r_g,porod_exponent,guinier_factor):
@@ -142,6 +386,34 @@ def guinier_porod(q,r_g,porod_exponent,guinier_factor):
     return I
 
 
+def guinier_porod_jacobian(q,r_g,porod_exponent,guinier_factor):
+    """
+    Derivatives of guinier_porod(q,r_g,porod_exponent,guinier_factor)
+    with respect to guinier_factor and r_g.
+
+    Returns
+    -------
+    dI_dG : array
+        derivative with respect to guinier_factor
+    dI_drg : array
+        derivative with respect to r_g
+    """
+    q_splice = 1./r_g * np.sqrt(3./2*porod_exponent**2)
+    idx_guinier = (q <= q_splice)
+    idx_porod = (q > q_splice)
+    dI_dG = np.zeros(q.shape)
+    dI_drg = np.zeros(q.shape)
+    if any(idx_guinier):
+        qg = q[idx_guinier]
+        dI_dG[idx_guinier] = np.exp(-1./3*qg**2*r_g**2)
+        dI_drg[idx_guinier] = -2./3*qg**2*r_g*guinier_factor*dI_dG[idx_guinier]
+    if any(idx_porod):
+        dI_dG[idx_porod] = np.exp(-1./2*porod_exponent)\
+                    * (3./2*porod_exponent)**(1./2*porod_exponent)\
+                    * 1./(r_g**porod_exponent) * 1./(q[idx_porod]**porod_exponent)
+        dI_drg[idx_porod] = -porod_exponent/r_g*guinier_factor*dI_dG[idx_porod]
+    return dI_dG,dI_drg
+
 def profile_spectrum(q_I):
     """Numerical profiling of a SAXS spectrum.
 
@@ -369,14 +641,18 @@ def fit_spectrum(q_I,flags,params,fixed_params,objective='chi2log'):
             # Set up a constraint to keep I(q=0) fixed
             I0_init = np.sum([x_init[i] for i in I_idx.values()])
             cfun = lambda x: np.sum([x[I_idx[k]] for k in I_idx.keys()]) - I0_init
-            c.append({'type':'eq','fun':cfun})
+            cjac = np.zeros(len(params))
+            cjac[list(I_idx.values())] = 1.
+            c.append({'type':'eq','fun':cfun,'jac':lambda x,cjac=cjac: cjac})
     for fixk in fixed_params:
-        cfun = lambda x: x[p_idx[fixk]] - params[fixk]
-        c.append({'type':'eq','fun':cfun})
+        # bind the index and value now, not when the constraint is evaluated
+        cfun = lambda x,i=p_idx[fixk],v=params[fixk]: x[i] - v
+        cjac = np.zeros(len(params))
+        cjac[p_idx[fixk]] = 1.
+        c.append({'type':'eq','fun':cfun,'jac':lambda x,cjac=cjac: cjac})
     # --- end constraints ---
 
     rpt = OrderedDict()
-    saxs_fun = lambda q,x,p: compute_saxs_with_substitutions(q,flags,params,x)
     p_opt = copy.deepcopy(params) 
     # Only proceed if there is work to do.
     if not f_pks:
@@ -396,10 +672,15 @@ def fit_spectrum(q_I,flags,params,fixed_params,objective='chi2log'):
             logImean_fit = np.mean(logI_fit)
             logIstd_fit = np.std(logI_fit)
             logIs_fit = (logI_fit-logImean_fit)/logIstd_fit
-            fit_obj = lambda x: compute_chi2(
-            (np.log(saxs_fun(q_fit,x,params))-logImean_fit)/logIstd_fit , logIs_fit)
-            #fit_obj = lambda x: compute_chi2(
-            res = scipimin(fit_obj,x_init,
+            # chi2 of the standardized log intensities, and its gradient:
+            # d(chi2)/dx = sum(2*resid/(logIstd_fit*I)*dI/dx)
+            def fit_obj_jac(x):
+                I_x,dI_x = compute_saxs_jacobian(q_fit,flags,
+                    OrderedDict(zip(params.keys(),x)))
+                resid = (np.log(I_x)-logImean_fit)/logIstd_fit - logIs_fit
+                return np.sum(resid**2),np.dot(2*resid/(logIstd_fit*I_x),dI_x)
+            fit_obj = lambda x: fit_obj_jac(x)[0]
+            res = scipimin(fit_obj_jac,x_init,jac=True,
                 #method='SLSQP',
                 bounds=x_bounds,
                 options={'ftol':1E-3},constraints=c)
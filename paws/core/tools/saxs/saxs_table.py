@@ -0,0 +1,172 @@
+"""
+Tabulated, normalized SAXS intensities for realtime fitting.
+
+The normalized intensity of a population of spheres
+with normally distributed radii (mean r0, fractional standard deviation sigma)
+depends on q and r0 only through u = q*r0,
+so a single table of log(I) over a uniform (sigma, u) grid
+serves every radius and q grid.
+Intensities are interpolated in log(I), linearly in u
+and cubically (over four rows) in sigma,
+where log(I) curves too strongly near the form factor minima
+for linear interpolation.
+Tables are built once (see saxs_fit.sphere_table())
+and saved to the paws scratch directory,
+from where later processes load them (memory-mapped).
+"""
+from __future__ import print_function
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ... import pawstools
+
+table_dir = os.path.join(pawstools.paws_scratch_dir,'saxs_tables')
+# increment when the tabulated quantities change, to invalidate saved tables
+table_version = 1
+
+class IntensityTable(object):
+    """
+    log(I) tabulated on a uniform grid of sigma (rows) and u = q*r0 (columns).
+
+    Parameters
+    ----------
+    logI : array
+        log of the normalized intensity, of shape (n_sigma,n_u)
+    u_max : float
+        largest tabulated u (the grid starts at u = 0)
+    sigma_min : float
+        smallest tabulated sigma
+    sigma_max : float
+        largest tabulated sigma
+    """
+
+    def __init__(self,logI,u_max,sigma_min,sigma_max):
+        super(IntensityTable,self).__init__()
+        self.logI = logI
+        self.u_max = float(u_max)
+        self.sigma_min = float(sigma_min)
+        self.sigma_max = float(sigma_max)
+        n_sigma,n_u = logI.shape
+        if n_sigma < 4:
+            raise ValueError('[{}] cubic interpolation in sigma needs at least 4 sigma rows, got {}'
+            .format(__name__,n_sigma))
+        self.du = self.u_max/(n_u-1)
+        self.dsigma = (self.sigma_max-self.sigma_min)/(n_sigma-1)
+
+    def covers_sigma(self,sigma):
+        return self.sigma_min <= sigma <= self.sigma_max
+
+    def covers(self,u):
+        """Boolean array, True where u is within the table."""
+        u = np.asarray(u)
+        return (u >= 0) & (u <= self.u_max)
+
+    def interpolate(self,u,sigma):
+        """
+        Normalized intensity at u = q*r0 (array) for one sigma,
+        interpolated in log(I), linearly in u
+        and with a cubic (Lagrange) polynomial through the four nearest sigma rows.
+        u and sigma must be within the table (see covers() and covers_sigma()).
+        """
+        n_sigma,n_u = self.logI.shape
+        x = np.asarray(u,dtype=float)/self.du
+        i = np.minimum(x.astype(np.int64),n_u-2)
+        a = x-i
+        y = (float(sigma)-self.sigma_min)/self.dsigma
+        # rows j-1 to j+2, shifted inwards at the edges of the table
+        j = min(max(int(y),1),n_sigma-3)
+        b = y-j
+        w_sigma = [-b*(b-1.)*(b-2.)/6.,(b+1.)*(b-1.)*(b-2.)/2.,
+            -(b+1.)*b*(b-2.)/2.,(b+1.)*b*(b-1.)/6.]
+        logI = np.zeros(x.shape)
+        for row,w in zip(self.logI[j-1:j+3],w_sigma):
+            logI += w*((1.-a)*row[i]+a*row[i+1])
+        return np.exp(logI)
+
+def build_table(intensity_fn,u_max,du,sigma_min,sigma_max,dsigma):
+    """
+    Tabulate intensity_fn(u,sigma), the normalized intensity
+    as a function of an array u = q*r0 and a float sigma.
+    """
+    n_u = int(round(u_max/du))+1
+    n_sigma = int(round((sigma_max-sigma_min)/dsigma))+1
+    u = np.linspace(0.,u_max,n_u)
+    sigmas = np.linspace(sigma_min,sigma_max,n_sigma)
+    logI = np.empty((n_sigma,n_u))
+    for j,sig in enumerate(sigmas):
+        logI[j] = np.log(intensity_fn(u,sig))
+    return IntensityTable(logI,u_max,sigma_min,sigma_max)
+
+def table_key(*args):
+    """Hash of the json representation of args."""
+    return hashlib.sha1(json.dumps([table_version]+list(args)).encode('utf-8')).hexdigest()
+
+def save_table(tbl,key,dir_path=None):
+    """
+    Save tbl to dir_path (default table_dir) under key.
+    The array is written under a temporary name and renamed,
+    and the header is written last,
+    so that concurrent readers never see a partially written table.
+    """
+    dir_path = dir_path or table_dir
+    if not os.path.exists(dir_path):
+        try:
+            os.makedirs(dir_path)
+        except OSError:
+            # created by another process
+            pass
+    fd,tmp = tempfile.mkstemp(suffix='.npy',dir=dir_path)
+    with os.fdopen(fd,'wb') as f:
+        np.save(f,tbl.logI)
+    os.rename(tmp,os.path.join(dir_path,'{}_logI.npy'.format(key)))
+    hdr = dict(u_max=tbl.u_max,sigma_min=tbl.sigma_min,sigma_max=tbl.sigma_max)
+    fd,tmp = tempfile.mkstemp(suffix='.json',dir=dir_path)
+    with os.fdopen(fd,'w') as f:
+        json.dump(hdr,f)
+    os.rename(tmp,os.path.join(dir_path,'{}.json'.format(key)))
+
+def load_table(key,dir_path=None):
+    """
+    Load the table saved under key, memory-mapped,
+    or return None if there is no such table.
+    """
+    dir_path = dir_path or table_dir
+    hdr = os.path.join(dir_path,'{}.json'.format(key))
+    if not os.path.exists(hdr):
+        return None
+    with open(hdr,'r') as f:
+        d = json.load(f)
+    logI = np.load(os.path.join(dir_path,'{}_logI.npy'.format(key)),mmap_mode='r')
+    return IntensityTable(logI,d['u_max'],d['sigma_min'],d['sigma_max'])
+
+# tables already loaded or built in this process
+_tables = OrderedDict()
+_tables_lock = threading.Lock()
+
+def cached_table(key,build_fn,dir_path=None):
+    """
+    Return the table for key: from memory, from disk, or by calling build_fn()
+    (and saving the result to disk).
+    """
+    with _tables_lock:
+        tbl = _tables.get(key)
+    if tbl is not None:
+        return tbl
+    tbl = load_table(key,dir_path)
+    if tbl is None:
+        tbl = build_fn()
+        save_table(tbl,key,dir_path)
+    with _tables_lock:
+        _tables[key] = tbl
+    return tbl
+
+def clear_tables():
+    """Forget the tables loaded or built in this process."""
+    with _tables_lock:
+        _tables.clear()
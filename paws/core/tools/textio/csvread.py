@@ -0,0 +1,106 @@
+"""
+Fast readers for numeric csv files.
+
+read_csv() reads a file in one pass.
+With numpy versions whose np.loadtxt is implemented in C (1.23 and later),
+it uses np.loadtxt.
+With older versions, whose np.loadtxt parses line by line in python,
+it parses all of the numbers in a single call to numpy's C string parser.
+read_csv_files() reads a list of files on a pool of threads
+and stacks the results into one array.
+"""
+from __future__ import print_function
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+def _np_version():
+    return tuple(int(v) for v in np.__version__.split('.')[:2])
+
+# np.loadtxt is implemented in C from numpy 1.23
+loadtxt_is_fast = _np_version() >= (1,23)
+
+def read_csv(file_path,delimiter=',',comments='#',ndmin=2):
+    """
+    Read a numeric csv file into an array of floats.
+
+    Lines that start with `comments` (e.g. np.savetxt headers) are skipped.
+    The result has the same shape as
+    np.loadtxt(file_path,delimiter=delimiter,ndmin=ndmin):
+    by default, an n_rows-by-n_columns array,
+    even if there is only one row or one column.
+
+    Parameters
+    ----------
+    file_path : str
+        path to the csv file
+    delimiter : str
+        column delimiter
+    comments : str
+        prefix of lines to be skipped
+    ndmin : int
+        minimum number of dimensions of the result (0, 1 or 2)-
+        with 0 or 1, a file of one row or one column gives a 1d array,
+        as with the default of np.loadtxt
+
+    Returns
+    -------
+    a : numpy.ndarray
+        array of the values in the file
+    """
+    if loadtxt_is_fast:
+        return np.loadtxt(file_path,dtype=float,delimiter=delimiter,
+            comments=comments,ndmin=ndmin)
+    with open(file_path,'r') as f:
+        txt = f.read()
+    lines = [l for l in txt.splitlines()
+        if l.strip() and not l.lstrip().startswith(comments)]
+    if not lines:
+        return np.loadtxt(file_path,dtype=float,delimiter=delimiter,
+            comments=comments,ndmin=ndmin)
+    n_cols = lines[0].count(delimiter)+1
+    txt = ' '.join(lines)
+    if delimiter.strip():
+        txt = txt.replace(delimiter,' ')
+    a = np.fromstring(txt,dtype=float,sep=' ')
+    if a.size != n_cols*len(lines):
+        # irregular rows or unparseable entries:
+        # fall back on np.loadtxt, which reports what went wrong
+        return np.loadtxt(file_path,dtype=float,delimiter=delimiter,
+            comments=comments,ndmin=ndmin)
+    a = a.reshape(len(lines),n_cols)
+    if ndmin < 2:
+        a = np.squeeze(a)
+        if ndmin == 1:
+            a = np.atleast_1d(a)
+    return a
+
+def read_csv_files(file_paths,n_workers=4,delimiter=',',comments='#',ndmin=2):
+    """
+    Read a list of numeric csv files of the same shape
+    into one array of shape (len(file_paths),)+file_shape.
+
+    Files are read by read_csv() (with the given ndmin)
+    on a pool of n_workers threads.
+    Raises a ValueError if the files do not all have the same shape.
+    """
+    def read_one(p):
+        return read_csv(p,delimiter,comments,ndmin)
+    n_workers = max(min(int(n_workers),len(file_paths)),1)
+    if n_workers == 1:
+        arrs = [read_one(p) for p in file_paths]
+    else:
+        pool = ThreadPool(n_workers)
+        try:
+            arrs = pool.map(read_one,file_paths)
+        finally:
+            pool.close()
+            pool.join()
+    if not arrs:
+        return np.zeros(0)
+    shp = arrs[0].shape
+    for p,a in zip(file_paths,arrs):
+        if a.shape != shp:
+            raise ValueError('[{}] {} has shape {}, expected {}'
+            .format(__name__,p,a.shape,shp))
+    return np.stack(arrs)
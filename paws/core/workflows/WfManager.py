@@ -10,6 +10,7 @@ from ..operations import Operation as opmod
 from ..operations.Operation import Operation#, Batch, Realtime        
 from ..operations import optools
 from .. import pawstools
+from ..tools.image import precision
 
 class WfManager(object):
     """
@@ -141,6 +142,10 @@ class WfManager(object):
         wfins = wf_spec.pop('WORKFLOW_INPUTS')
         wfouts = wf_spec.pop('WORKFLOW_OUTPUTS')
         opflags = wf_spec.pop('OP_ENABLE_FLAGS')
+        # workflows saved before dtype policies were introduced
+        # run with the default policy (no dtype conversion)
+        self.workflows[wfname].set_dtype_policy(
+            wf_spec.pop('DTYPE_POLICY',precision.default_policy))
         for inpname,inpval in wfins.items():
             self.workflows[wfname].connect_wf_input(inpname,inpval)
         for outname,outval in wfouts.items():
@@ -4,11 +4,13 @@ import copy
 from functools import partial
 import traceback
 import os
+import time
 
 from ..models.TreeModel import TreeModel
 from ..operations import Operation as opmod
 from ..operations.Operation import Operation
 from ..operations import optools
+from ..tools.image import precision
 
 class Workflow(TreeModel):
     """
@@ -24,6 +26,10 @@ class Workflow(TreeModel):
         self.outputs = OrderedDict()
         self.message_callback = print
         self.data_callback = None
+        # completion time of each Operation in the latest execution
+        self.op_times = OrderedDict()
+        # floating-point precision of image and integration Operations
+        self.dtype_policy = precision.default_policy
 
     #def __getitem__(self,key):
     #    optags = self.keys()
@@ -58,6 +64,7 @@ class Workflow(TreeModel):
         # NOTE: is it ok if I don't copy.copy the callbacks? 
         new_wf.message_callback = self.message_callback
         new_wf.data_callback = self.data_callback
+        new_wf.dtype_policy = self.dtype_policy
         for op_tag in self.list_op_tags():
             op = self.get_data_from_uri(op_tag)
             new_wf.add_op(op_tag,op.clone_op())
@@ -69,9 +76,21 @@ class Workflow(TreeModel):
 
     def add_op(self,op_tag,op):
         op.message_callback = self.message_callback
+        op.dtype_policy = self.dtype_policy
         op.data_callback = partial( self.set_op_item,op_tag )
         self.set_item(op_tag,op)
 
+    def set_dtype_policy(self,policy):
+        """
+        Set the floating-point precision ('float64' or 'float32')
+        of the image and integration Operations in this Workflow,
+        or None to leave their dtypes unchanged.
+        """
+        precision.float_dtype(policy)
+        self.dtype_policy = policy
+        for op in self.op_dict().values():
+            op.dtype_policy = policy
+
     def build_tree(self,x):
         """
         Reimplemented TreeModel.build_tree() 
@@ -149,6 +168,7 @@ class Workflow(TreeModel):
         for k in bad_diag_keys:
             self.message_callback('WARNING- {} is not ready: {}'.format(k,diag[k]))
         self.message_callback('workflow queue:'+os.linesep+self.print_stack(stk))
+        self.op_times = OrderedDict()
         for lst in stk:
             self.message_callback('running: {}'.format(lst))
             for op_tag in lst: 
@@ -157,6 +177,7 @@ class Workflow(TreeModel):
                     if il.tp == opmod.workflow_item:
                         self.set_op_item(op_tag,'inputs.'+inpnm,self.locate_input(il))
                 op.run() 
+                self.op_times[op_tag] = time.time()
                 for outnm,outdata in op.outputs.items():
                     self.set_op_item(op_tag,'outputs.'+outnm,outdata)
 
@@ -222,6 +243,7 @@ class Workflow(TreeModel):
         wf_dict['WORKFLOW_INPUTS'] = self.inputs
         wf_dict['WORKFLOW_OUTPUTS'] = self.outputs
         wf_dict['OP_ENABLE_FLAGS'] = self.op_enable_flags()
+        wf_dict['DTYPE_POLICY'] = self.dtype_policy
         return wf_dict
 
     def build_op_from_dict(self,op_setup,op_manager):
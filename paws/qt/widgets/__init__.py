@@ -7,6 +7,7 @@ from matplotlib.figure import Figure
 from ...core.operations.Operation import Operation
 from ...core.workflows.Workflow import Workflow 
 from ...core.plugins.PawsPlugin import PawsPlugin
+from ...core.tools.batch.store import BatchStore
 from .. import qttools
 from .OpWidget import OpWidget
 from .WorkflowGraphView import WorkflowGraphView
@@ -48,6 +49,7 @@ def make_widget(itm):
     or isinstance(itm,int) 
     or isinstance(itm,dict) 
     or isinstance(itm,list) 
+    or isinstance(itm,BatchStore)
     or isinstance(itm,str)
     or isinstance(itm,unicode)):    
         t = display_text_fast(itm)
@@ -3,6 +3,7 @@
 from ...core.operations import Operation as opmod
 from ...core.operations.Operation import Operation
 from ...core.operations.optools import FileSystemIterator
+from ...core.tools.batch.store import BatchStore
 
 unit_indent='&nbsp;&nbsp;&nbsp;&nbsp;'
 
@@ -13,8 +14,8 @@ def display_text(itm,indent=unit_indent):
         t = '(dict)'
         for k,v in itm.items():
             t += '<br>' + indent + '{}: {}'.format(k,display_text(v,indent+unit_indent))
-    elif isinstance(itm,list):
-        t = '(list)'
+    elif isinstance(itm,(list,BatchStore)):
+        t = '({})'.format(type(itm).__name__)
         for i in range(len(itm)):
             t += '<br>' + indent + '{}: {}'.format(i,display_text(itm[i],indent+unit_indent))
     elif isinstance(itm,opmod.InputLocator):
@@ -46,8 +47,8 @@ def display_text_fast(itm,indent=unit_indent):
         for k,v in itm.items()[:ndisp]:
             t += '<br>' + indent + '{}: {}'.format(k,display_text_fast(v,indent+unit_indent))
         t += suffix 
-    elif isinstance(itm,list):
-        t = '(list)'
+    elif isinstance(itm,(list,BatchStore)):
+        t = '({})'.format(type(itm).__name__)
         if len(itm) > row_limit:
             suffix = '<br>'+indent+'ETC ...'
             ndisp = row_limit 
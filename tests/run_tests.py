@@ -5,6 +5,16 @@ import os
 import paws.api
 import test_api
 import test_op
+import test_realtime
+import test_image
+import test_bl15
+import test_hdf5
+import test_batch
+import test_pif
+import test_citrination
+import test_integration
+import test_saxs
+import test_textio
 
 runner = unittest.TextTestRunner(verbosity=3)
 
@@ -52,6 +62,76 @@ print('======================================================================')
 
 # TODO: Test plugins
 
+print('======================================================================')
+print('--- testing realtime tools ---'+os.linesep)
+realtime_tests = unittest.TestLoader().loadTestsFromTestCase(test_realtime.TestRealtime)
+runner.run(realtime_tests)
+print(os.linesep+'--- done testing realtime tools ---')
+print('======================================================================')
+
+print('======================================================================')
+print('--- testing image tools ---'+os.linesep)
+image_tests = unittest.TestLoader().loadTestsFromTestCase(test_image.TestImage)
+runner.run(image_tests)
+print(os.linesep+'--- done testing image tools ---')
+print('======================================================================')
+
+print('======================================================================')
+print('--- testing beamline 1-5 tools ---'+os.linesep)
+bl15_tests = unittest.TestLoader().loadTestsFromTestCase(test_bl15.TestBL15)
+runner.run(bl15_tests)
+print(os.linesep+'--- done testing beamline 1-5 tools ---')
+print('======================================================================')
+
+print('======================================================================')
+print('--- testing hdf5 tools ---'+os.linesep)
+hdf5_tests = unittest.TestLoader().loadTestsFromTestCase(test_hdf5.TestHDF5)
+runner.run(hdf5_tests)
+print(os.linesep+'--- done testing hdf5 tools ---')
+print('======================================================================')
+
+print('======================================================================')
+print('--- testing batch tools ---'+os.linesep)
+batch_tests = unittest.TestLoader().loadTestsFromTestCase(test_batch.TestBatch)
+runner.run(batch_tests)
+print(os.linesep+'--- done testing batch tools ---')
+print('======================================================================')
+
+print('======================================================================')
+print('--- testing pif tools ---'+os.linesep)
+pif_tests = unittest.TestLoader().loadTestsFromTestCase(test_pif.TestPIF)
+runner.run(pif_tests)
+print(os.linesep+'--- done testing pif tools ---')
+print('======================================================================')
+
+print('======================================================================')
+print('--- testing citrination uploads ---'+os.linesep)
+ctn_tests = unittest.TestLoader().loadTestsFromTestCase(test_citrination.TestCitrination)
+runner.run(ctn_tests)
+print(os.linesep+'--- done testing citrination uploads ---')
+print('======================================================================')
+
+print('======================================================================')
+print('--- testing integration tools ---'+os.linesep)
+integration_tests = unittest.TestLoader().loadTestsFromTestCase(test_integration.TestIntegration)
+runner.run(integration_tests)
+print(os.linesep+'--- done testing integration tools ---')
+print('======================================================================')
+
+print('======================================================================')
+print('--- testing text io tools ---'+os.linesep)
+textio_tests = unittest.TestLoader().loadTestsFromTestCase(test_textio.TestTextIO)
+runner.run(textio_tests)
+print(os.linesep+'--- done testing text io tools ---')
+print('======================================================================')
+
+print('======================================================================')
+print('--- testing saxs tools ---'+os.linesep)
+saxs_tests = unittest.TestLoader().loadTestsFromTestCase(test_saxs.TestSAXS)
+runner.run(saxs_tests)
+print(os.linesep+'--- done testing saxs tools ---')
+print('======================================================================')
+
 print('======================================================================')
 print('--- testing api for workflows ---'+os.linesep)
 api_tests = unittest.TestSuite()
@@ -60,6 +140,8 @@ api_tests.addTest(test_api.TestAPI('test_add_op',paw))
 api_tests.addTest(test_api.TestAPI('test_execute',paw))
 api_tests.addTest(test_api.TestAPI('test_save',paw))
 api_tests.addTest(test_api.TestAPI('test_load',paw))
+api_tests.addTest(test_api.TestAPI('test_save_load_json',paw))
+api_tests.addTest(test_api.TestAPI('test_dtype_policy',paw))
 runner.run(api_tests)
 print(os.linesep+'--- done testing api for workflows ---')
 print('======================================================================')
@@ -37,6 +37,43 @@ class TestAPI(unittest.TestCase):
         from paws.core import pawstools
         self.paw.load_from_wfl(os.path.join(pawstools.paws_scratch_dir,'test.wfl'))
 
+    def test_save_load_json(self):
+        import os
+        import numpy as np
+        import paws.api
+        from paws.core import pawstools
+        il = self.paw.get_op('listprimes','test').input_locator['n_primes']
+        n_primes = il.val
+        # array-valued inputs are saved to the side-car .npz file
+        il.val = np.arange(10)
+        json_path = os.path.join(pawstools.paws_scratch_dir,'test.json')
+        self.paw.save_to_wfl(json_path)
+        il.val = n_primes
+        self.assertTrue(os.path.exists(os.path.join(pawstools.paws_scratch_dir,'test.npz')))
+        paw = paws.api.start()
+        paw.load_from_wfl(json_path)
+        val = paw.get_op('listprimes','test').input_locator['n_primes'].val
+        self.assertTrue(np.array_equal(val,np.arange(10)))
+
+    def test_dtype_policy(self):
+        import os
+        import paws.api
+        from paws.core import pawstools
+        # the default policy leaves dtypes unchanged
+        self.assertIsNone(self.paw.get_wf('test').dtype_policy)
+        self.assertIsNone(self.paw.get_op('listprimes','test').dtype_policy)
+        self.paw.set_dtype_policy('float32','test')
+        self.assertEqual(self.paw.get_op('listprimes','test').dtype_policy,'float32')
+        with self.assertRaises(ValueError):
+            self.paw.set_dtype_policy('float16','test')
+        json_path = os.path.join(pawstools.paws_scratch_dir,'test_dtype.json')
+        self.paw.save_to_wfl(json_path)
+        self.paw.set_dtype_policy(None,'test')
+        paw = paws.api.start()
+        paw.load_from_wfl(json_path)
+        self.assertEqual(paw.get_wf('test').dtype_policy,'float32')
+        self.assertEqual(paw.get_op('listprimes','test').dtype_policy,'float32')
+
 if __name__ == '__main__':
     unittest.main()
 
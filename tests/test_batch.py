@@ -0,0 +1,84 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_batch_store(self):
+        import numpy as np
+        from paws.core.tools.batch.store import BatchStore, batch_column
+        # small memory budget, so that q_I is memory-mapped
+        b = BatchStore(4,max_bytes=500,spill_dir=self.dirpath)
+        self.assertEqual(len(b),4)
+        self.assertIsNone(b[3])
+        for i in range(4):
+            b[i] = {'T':20.+i,'q_I':np.ones((50,2))*i,'flags':{'bad_data':i==2}}
+        b.append({'T':30.,'q_I':np.zeros((50,2))})
+        self.assertEqual(len(b),5)
+        self.assertEqual(len(os.listdir(self.dirpath)),1)
+        self.assertTrue(np.array_equal(b.column('T'),[20.,21.,22.,23.,30.]))
+        self.assertEqual(b.column('q_I').shape,(5,50,2))
+        self.assertEqual(list(b[4].keys()),['T','q_I'])
+        self.assertTrue(b[2]['flags']['bad_data'])
+        vals,present = batch_column(b,'flags')
+        self.assertEqual(list(present),[True,True,True,True,False])
+        # a value of a new shape turns the column into a list
+        b[0] = {'T':20.,'q_I':np.ones((10,2))}
+        self.assertIsInstance(b.column('q_I'),list)
+        self.assertEqual(len(os.listdir(self.dirpath)),0)
+        self.assertEqual(b[1]['q_I'].shape,(50,2))
+        b.close()
+
+    def test_batch_store_items(self):
+        import numpy as np
+        from paws.core.models.TreeModel import TreeModel
+        from paws.core.tools.batch.store import BatchStore
+        b = BatchStore(3,spill_dir=self.dirpath)
+        for i in range(3):
+            b[i] = {'T':20.+i,'n':i,'q_I':np.ones((5,2))*i,'params':{'r0':float(i)}}
+        # items are copies, with python scalars
+        d = b[1]
+        self.assertIs(type(d['T']),float)
+        self.assertIs(type(d['n']),int)
+        d['q_I'][:] = -1.
+        d['params']['r0'] = -1.
+        self.assertEqual(b[1]['q_I'][0,0],1.)
+        self.assertEqual(b[1]['params']['r0'],1.)
+        # batch items are indexed by TreeModel uris, like a list of dicts
+        tm = TreeModel()
+        tm.set_item('batch_outputs',b)
+        self.assertEqual(tm.n_children('batch_outputs'),3)
+        self.assertEqual(tm.build_uri(tm.get_from_uri('batch_outputs.2.params.r0')),
+            'batch_outputs.2.params.r0')
+        self.assertEqual(tm.get_data_from_uri('batch_outputs.2.T'),22.)
+        self.assertEqual(tm.get_data_from_uri('batch_outputs.2.params.r0'),2.)
+        b.close()
+
+    def test_batch_store_tree(self):
+        import numpy as np
+        from paws.core.models.TreeModel import TreeModel
+        from paws.core.tools.batch.store import BatchStore
+        class NoCopyStore(BatchStore):
+            def __getitem__(self,idx):
+                raise AssertionError('batch item {} was copied'.format(idx))
+        # small memory budget, so that q_I is memory-mapped
+        b = NoCopyStore(4,max_bytes=500,spill_dir=self.dirpath)
+        for i in range(3):
+            b[i] = {'T':20.+i,'q_I':np.ones((50,2))*i,'params':{'r0':float(i)}}
+        self.assertEqual(len(os.listdir(self.dirpath)),1)
+        self.assertEqual(b.item_keys(1),['T','q_I','params'])
+        self.assertIsNone(b.item_keys(3))
+        # the tree is built from the stored values, without copying items
+        tree = TreeModel().build_tree(b)
+        self.assertEqual(list(tree.keys()),['0','1','2','3'])
+        self.assertEqual(list(tree['2'].keys()),['T','q_I','params'])
+        self.assertEqual(list(tree['2']['params'].keys()),['r0'])
+        self.assertIsNone(tree['3'])
+        b.close()
@@ -0,0 +1,63 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+hdr_template = 'User: someone, time: Mon Jun 05 12:{:02d}:00 2017\n'\
+    '{:.1f} C\n'\
+    'TEMP = {:.1f}, CTEMP = 25.0\n'\
+    'I0 = {:.1f}, I1 = 1.0\n'
+
+class TestBL15(unittest.TestCase):
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        for i in range(5):
+            with open(os.path.join(self.dirpath,'img_{:04d}.txt'.format(i)),'w') as f:
+                f.write(hdr_template.format(i,20.+10*i,20.+10*i,100.+i))
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_parse_header(self):
+        from paws.core.tools.bl15.headers import parse_header
+        d = parse_header(os.path.join(self.dirpath,'img_0002.txt'))
+        self.assertEqual(list(d.keys()),['User','time','TEMP','CTEMP','I0','I1'])
+        self.assertEqual(d['time'],'Mon Jun 05 12:02:00 2017')
+        self.assertEqual(d['TEMP'],40.)
+
+    def test_header_index(self):
+        from paws.core.tools.bl15.headers import HeaderIndex, header_time
+        db_path = os.path.join(self.dirpath,'headers.sqlite')
+        idx = HeaderIndex(db_path)
+        self.assertEqual(idx.update(self.dirpath),5)
+        self.assertEqual(idx.update(self.dirpath),0)
+        p = idx.closest('TEMP',44.)
+        self.assertEqual(os.path.split(p)[1],'img_0002.txt')
+        self.assertEqual(idx.get_header(filename='img_0002')['TEMP'],40.)
+        t0 = header_time('Mon Jun 05 12:01:00 2017')
+        ts = idx.time_series('I0',t0,t0+120.)
+        self.assertEqual([v for t,v,p in ts],[101.,102.,103.])
+        self.assertEqual([p for p,v in idx.in_range('TEMP',30.,50.)],
+            [os.path.join(self.dirpath,'img_000{}.txt'.format(i)) for i in [1,2,3]])
+        idx.close()
+        # re-open the saved index and pick up a new file
+        with open(os.path.join(self.dirpath,'img_0005.txt'),'w') as f:
+            f.write(hdr_template.format(5,70.,70.,105.))
+        idx = HeaderIndex(db_path)
+        self.assertEqual(idx.update(self.dirpath),1)
+        self.assertEqual(idx.n_files(),6)
+        idx.close()
+
+    def test_header_index_transaction(self):
+        from paws.core.tools.bl15.headers import HeaderIndex
+        idx = HeaderIndex(os.path.join(self.dirpath,'headers.sqlite'))
+        stmts = []
+        idx._db.set_trace_callback(stmts.append)
+        # all new files are indexed in a single transaction
+        self.assertEqual(idx.update(self.dirpath),5)
+        self.assertEqual(len([s for s in stmts if s.strip().upper().startswith('BEGIN')]),1)
+        self.assertEqual(len([s for s in stmts if s.strip().upper().startswith('COMMIT')]),1)
+        self.assertEqual(idx.n_files(),5)
+        self.assertEqual(idx.get_header(filename='img_0004')['I0'],104.)
+        idx.close()
@@ -0,0 +1,122 @@
+from __future__ import print_function
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import threading
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from urllib.request import Request, urlopen
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from urllib2 import Request, urlopen
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Stand-in for the Citrination upload endpoint: fails the first n_fail requests."""
+
+    def do_POST(self):
+        srv = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if srv.n_fail > 0:
+            srv.n_fail -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        srv.uploads.append((self.path,json.loads(body.decode('utf-8'))))
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'{"success": true}')
+
+    def log_message(self,*args):
+        pass
+
+class TestCitrination(unittest.TestCase):
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+        self.server = HTTPServer(('127.0.0.1',0),StandInHandler)
+        self.server.uploads = []
+        self.server.n_fail = 0
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        url = 'http://127.0.0.1:{}/datasets/'.format(self.server.server_address[1])
+        def upload(file_path,dsid):
+            with open(file_path,'rb') as f:
+                req = Request(url+str(dsid),data=f.read())
+            return json.loads(urlopen(req).read().decode('utf-8'))
+        self.upload = upload
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dirpath)
+
+    def pifs(self,n,prefix):
+        import pypif.obj as pifobj
+        pifs = []
+        for i in range(n):
+            p = pifobj.ChemicalSystem()
+            p.uid = prefix+str(i)
+            pifs.append(p)
+        return pifs
+
+    def test_upload_queue(self):
+        from paws.core.tools.citrination.uploads import UploadQueue
+        q = UploadQueue(self.upload,self.dirpath,batch_size=100,max_wait=10.,backoff=0.01)
+        # queued records persist until they are uploaded
+        for i in range(5):
+            q.put(self.pifs(50,'a{}_'.format(i)),12)
+        q.put(self.pifs(10,'b'),13)
+        q.close()
+        q = UploadQueue(self.upload,self.dirpath,batch_size=100,max_wait=10.,backoff=0.01)
+        self.assertEqual(q.n_pending(),260)
+        self.server.n_fail = 2
+        q.start()
+        self.assertTrue(q.flush(timeout=10.))
+        q.close()
+        self.assertEqual(q.n_uploaded,260)
+        self.assertEqual(len(q.errors),2)
+        paths = [u[0] for u in self.server.uploads]
+        self.assertEqual(paths,['/datasets/12']*3+['/datasets/13'])
+        self.assertEqual([len(u[1]) for u in self.server.uploads],[100,100,50,10])
+        self.assertEqual(self.server.uploads[2][1][-1]['uid'],'a4_49')
+        self.assertEqual(sorted(os.listdir(self.dirpath)),['.lock','failed'])
+
+    def test_upload_failure(self):
+        from paws.core.tools.citrination.uploads import UploadQueue
+        self.server.n_fail = 10
+        q = UploadQueue(self.upload,self.dirpath,max_wait=0.,max_retries=2,backoff=0.01)
+        q.start()
+        q.put(self.pifs(3,'c'),12)
+        q.flush(timeout=10.)
+        q.close()
+        self.assertEqual(q.n_failed,3)
+        self.assertEqual(len(os.listdir(os.path.join(self.dirpath,'failed'))),1)
+
+    def test_session_queues(self):
+        from paws.core.tools.citrination.uploads import \
+            UploadQueue, QueueDirInUse, open_session_queue
+        # concurrent queues never share a directory
+        q1 = open_session_queue(self.upload,self.dirpath,max_wait=10.)
+        q2 = open_session_queue(self.upload,self.dirpath,max_wait=10.)
+        self.assertEqual(os.path.basename(q1.queue_dir),'queue_0000')
+        self.assertEqual(os.path.basename(q2.queue_dir),'queue_0001')
+        with self.assertRaises(QueueDirInUse):
+            UploadQueue(self.upload,q1.queue_dir)
+        q1.put(self.pifs(4,'d'),12)
+        q2.put(self.pifs(2,'e'),12)
+        self.assertEqual((q1.n_pending(),q2.n_pending()),(4,2))
+        # the next session picks up the records of a closed one
+        q1.close()
+        q3 = open_session_queue(self.upload,self.dirpath,max_wait=0.)
+        self.assertEqual(q3.queue_dir,q1.queue_dir)
+        self.assertEqual(q3.n_pending(),4)
+        q3.start()
+        self.assertTrue(q3.flush(timeout=10.))
+        q3.close()
+        q2.close()
+        self.assertEqual([u[1][0]['uid'] for u in self.server.uploads],['d0'])
+        self.assertEqual(q2.n_pending(),2)
+
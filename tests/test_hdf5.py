@@ -0,0 +1,60 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+class TestHDF5(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import h5py
+        except ImportError as ex:
+            self.skipTest('Caught ImportError: {}'.format(ex))
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_appender(self):
+        import numpy as np
+        import h5py
+        from paws.core.tools.hdf5.appender import open_appender, close_appender
+        p = os.path.join(self.dirpath,'results.h5')
+        app = open_appender(p,chunk_rows=4)
+        self.assertIs(open_appender(p),app)
+        for i in range(10):
+            item = {'q_I':np.ones((20,2))*i,'params':{'r0':float(i)}}
+            if i == 5:
+                item.pop('params')
+            self.assertEqual(app.append(item),i)
+        close_appender(p)
+        # re-open and append to the same datasets
+        app = open_appender(p)
+        self.assertEqual(app.n_items(),10)
+        app.append({'q_I':np.zeros((20,2)),'params':{'r0':10.}})
+        close_appender(p)
+        with h5py.File(p,'r') as f:
+            self.assertEqual(f['entry/q_I'].shape,(11,20,2))
+            self.assertEqual(f['entry/q_I'].chunks,(4,20,2))
+            self.assertEqual(f['entry/q_I'].maxshape,(None,20,2))
+            self.assertTrue(np.isnan(f['entry/params/r0'][5]))
+            self.assertEqual(f['entry/params/r0'][10],10.)
+
+    def test_append_images(self):
+        import numpy as np
+        import h5py
+        from paws.core.tools.hdf5.appender import open_appender, close_appender
+        p = os.path.join(self.dirpath,'images.h5')
+        app = open_appender(p,chunk_rows=16)
+        imgs = [np.random.RandomState(i).rand(300,400) for i in range(3)]
+        for i,img in enumerate(imgs):
+            app.append({'image':img,'thumb':img[::10,::10].astype(np.float32)})
+        close_appender(p)
+        with h5py.File(p,'r') as f:
+            # chunks are capped at about 1 MB:
+            # one row for the 960 kB images, 16 rows for the thumbnails
+            self.assertEqual(f['entry/image'].chunks,(1,300,400))
+            self.assertEqual(f['entry/thumb'].chunks,(16,30,40))
+            self.assertEqual(f['entry/image'].shape,(3,300,400))
+            for i,img in enumerate(imgs):
+                self.assertTrue(np.array_equal(f['entry/image'][i],img))
@@ -0,0 +1,134 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+class TestImage(unittest.TestCase):
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def write_edf(self,filename,img):
+        hdr = '{{\nByteOrder = LowByteFirst ;\nDataType = UnsignedShort ;\n'\
+            'Dim_1 = {} ;\nDim_2 = {} ;\nSize = {} ;\n'.format(
+            img.shape[1],img.shape[0],img.nbytes)
+        hdr = hdr + ' '*(1022-len(hdr)) + '}\n'
+        p = os.path.join(self.dirpath,filename)
+        with open(p,'wb') as f:
+            f.write(hdr.encode('ascii'))
+            f.write(img.astype('<u2').tobytes())
+        return p
+
+    def test_memmap_edf(self):
+        import numpy as np
+        from paws.core.tools.image import memmap
+        img = np.arange(12*7,dtype=np.uint16).reshape(12,7)
+        p = self.write_edf('img.edf',img)
+        mm = memmap.memmap_image(p)
+        self.assertIsInstance(mm,np.memmap)
+        self.assertFalse(mm.flags.writeable)
+        self.assertTrue(np.array_equal(mm,img))
+
+    def test_memmap_tif(self):
+        import numpy as np
+        import tifffile
+        from paws.core.tools.image import memmap
+        img = np.arange(64*48,dtype=np.uint16).reshape(64,48)
+        p = os.path.join(self.dirpath,'img.tif')
+        tifffile.imwrite(p,img,rowsperstrip=8)
+        mm = memmap.memmap_image(p)
+        self.assertIsInstance(mm,np.memmap)
+        self.assertFalse(mm.flags.writeable)
+        self.assertTrue(np.array_equal(mm,img))
+        # compressed and tiled images can not be memory-mapped
+        p_zip = os.path.join(self.dirpath,'img_zip.tif')
+        tifffile.imwrite(p_zip,img,compression='zlib')
+        self.assertIsNone(memmap.memmap_tif(p_zip))
+        p_tiled = os.path.join(self.dirpath,'img_tiled.tif')
+        tifffile.imwrite(p_tiled,img,tile=(16,16))
+        self.assertIsNone(memmap.memmap_tif(p_tiled))
+
+    def test_mmap_inputs(self):
+        import numpy as np
+        import tifffile
+        from paws.core.operations.IO.IMAGE.LoadTif import LoadTif
+        from paws.core.operations.IO.IMAGE.FabIOOpen import FabIOOpen
+        img = np.arange(32*24,dtype=np.uint16).reshape(32,24)
+        p_tif = os.path.join(self.dirpath,'img.tif')
+        tifffile.imwrite(p_tif,img)
+        p_zip = os.path.join(self.dirpath,'img_zip.tif')
+        tifffile.imwrite(p_zip,img,compression='zlib')
+        p_edf = self.write_edf('img.edf',img)
+        for op_cls,paths in [(LoadTif,[p_tif]),(FabIOOpen,[p_tif,p_edf])]:
+            for p in paths:
+                op = op_cls()
+                op.inputs['file_path'] = p
+                op.inputs['mmap'] = True
+                op.run()
+                self.assertIsInstance(op.outputs['image_data'],np.memmap)
+                self.assertTrue(np.array_equal(op.outputs['image_data'],img))
+            # a compressed image falls back to a normal read
+            op = op_cls()
+            op.inputs['file_path'] = p_zip
+            op.inputs['mmap'] = True
+            op.run()
+            self.assertNotIsInstance(op.outputs['image_data'],np.memmap)
+            self.assertTrue(np.array_equal(op.outputs['image_data'],img))
+            self.assertEqual(op.outputs['filename'],'img_zip')
+
+    def test_image_cache(self):
+        import numpy as np
+        from paws.core.tools.image.cache import ImageCache
+        img = np.zeros((10,10),dtype=np.uint16)
+        p1 = self.write_edf('img1.edf',img)
+        p2 = self.write_edf('img2.edf',img+1)
+        from paws.core.tools.image import memmap
+        loader = lambda p: np.array(memmap.memmap_edf(p))
+        c = ImageCache(max_bytes=img.nbytes)
+        a1 = c.load(p1,loader)
+        self.assertFalse(a1.flags.writeable)
+        self.assertIs(c.load(p1,loader),a1)
+        self.assertEqual((c.hits,c.misses),(1,1))
+        # loading a second image evicts the first
+        c.load(p2,loader)
+        self.assertIsNone(c.get(p1))
+        self.assertEqual(c.stats()['evictions'],1)
+        # a modified file is re-read
+        st = os.stat(p2)
+        os.utime(p2,(st.st_atime,st.st_mtime+10))
+        self.assertIsNone(c.get(p2))
+
+    def test_cached_image_ops(self):
+        import numpy as np
+        import tifffile
+        from paws.core.tools.image.cache import image_cache
+        from paws.core.operations.IO.IMAGE.LoadTif import LoadTif
+        img = np.arange(16*8,dtype=np.uint16).reshape(16,8)
+        p = os.path.join(self.dirpath,'cached.tif')
+        tifffile.imwrite(p,img)
+        # the cache is off by default
+        n_hits = image_cache.stats()['hits']
+        op = LoadTif()
+        op.inputs['file_path'] = p
+        op.run()
+        self.assertTrue(np.array_equal(op.outputs['image_data'],img))
+        self.assertIsNone(image_cache.get(p))
+        for i in range(2):
+            op = LoadTif()
+            op.inputs['file_path'] = p
+            op.inputs['use_cache'] = True
+            op.run()
+            out = op.outputs['image_data']
+            # image_data can be modified in place without touching the cache
+            self.assertTrue(out.flags.writeable)
+            self.assertTrue(np.array_equal(out,img))
+            out += 1
+        self.assertEqual(image_cache.stats()['hits'],n_hits+1)
+        self.assertTrue(np.array_equal(image_cache.get(p),img))
+
+if __name__ == '__main__':
+    unittest.main()
+
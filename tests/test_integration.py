@@ -0,0 +1,459 @@
+import unittest
+import shutil
+import tempfile
+
+import numpy as np
+
+class TestIntegration(unittest.TestCase):
+
+    def setUp(self):
+        self.poni = dict(dist=0.2,poni1=0.01,poni2=0.012,rot1=0.,rot2=0.,rot3=0.,
+            pixel1=1.e-4,pixel2=1.e-4,wavelength=1.e-10)
+        self.shape = (200,240)
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def run_saved_wf(self,paw,wfname):
+        # save the workflow, load it into a new api, and execute it there
+        import os
+        import paws.api
+        wfl_path = os.path.join(self.dirpath,wfname+'.json')
+        paw.save_to_wfl(wfl_path)
+        paw2 = paws.api.start()
+        paw2.load_from_wfl(wfl_path)
+        paw2.execute(wfname)
+        return paw2
+
+    def test_integrator_workflow(self):
+        import paws.api
+        paw = paws.api.start()
+        for op_uri in ['PROCESSING.INTEGRATION.BuildPyFAIIntegrator',
+            'PROCESSING.INTEGRATION.ApplyIntegrator1d']:
+            paw.activate_op(op_uri)
+        paw.add_wf('integration')
+        paw.add_op('build','PROCESSING.INTEGRATION.BuildPyFAIIntegrator')
+        paw.add_op('integrate','PROCESSING.INTEGRATION.ApplyIntegrator1d')
+        paw.set_input('build','poni_dict',self.poni,'basic')
+        img = np.random.rand(*self.shape)
+        paw.set_input('integrate','image_data',img,'basic')
+        paw.set_input('integrate','integrator','build.outputs.integrator')
+        paw.set_input('integrate','npt',50)
+        # the optional detector_shape and mask inputs are left unset
+        paw2 = self.run_saved_wf(paw,'integration')
+        self.assertIsNotNone(paw2.get_output('build','integrator','integration'))
+        self.assertEqual(paw2.get_output('integrate','I','integration').shape,(50,))
+
+    def test_pyfai_profiles(self):
+        from paws.core.tools.integration import integration
+        # these legacy helpers take images indexed (column, row)
+        img = np.random.rand(self.shape[1],self.shape[0])
+        q,I,color,key = integration.radialintegratepyFAI(img,AIdict=self.poni,nq=50)
+        self.assertEqual((len(q),len(I)),(50,50))
+        # masked pixels (mask zero) are left out
+        msk = np.ones(img.shape)
+        msk[:,:50] = 0
+        hot = img*msk+5.*(1-msk)
+        q,I,color,key = integration.radialintegratepyFAI(hot,msk,self.poni,nq=50)
+        self.assertLess(np.nanmax(I),1.)
+        chi,I_chi,color,key = integration.chiintegratepyFAI(hot,msk,self.poni,nq=50,nchi=36)
+        self.assertEqual(len(chi),36)
+        self.assertLess(max(v for v in I_chi if v is not None),1.)
+        chi,I_chi,color,key = integration.chiintegratepyFAI(img,None,self.poni,nq=50,nchi=36)
+        self.assertEqual(len(I_chi),36)
+
+    def test_integrator_registry(self):
+        from paws.core.tools.integration.registry import IntegratorRegistry
+        reg = IntegratorRegistry(max_size=2)
+        ai = reg.get(self.poni,self.shape)
+        # equal calibrations give the same integrator, whatever the number types
+        pd = dict(self.poni)
+        pd['dist'] = np.float64(0.2)
+        self.assertIs(reg.get(pd,list(self.shape)),ai)
+        msk = np.zeros(self.shape,dtype=bool)
+        msk[:10,:] = True
+        ai_msk = reg.get(self.poni,self.shape,msk)
+        self.assertIsNot(ai_msk,ai)
+        self.assertIs(reg.get(self.poni,self.shape,msk.copy()),ai_msk)
+        # least recently used integrator is evicted
+        reg.get(self.poni)
+        self.assertEqual(len(reg),2)
+        self.assertIsNot(reg.get(self.poni,self.shape),ai)
+        self.assertEqual((reg.n_hits,reg.n_misses),(2,4))
+
+    def test_persisted_lut(self):
+        from paws.core.tools.integration.registry import build_integrator
+        from paws.core.tools.integration import lut
+        ai = build_integrator(self.poni)
+        img = np.random.rand(*self.shape)*100.
+        msk = np.zeros(self.shape,dtype=bool)
+        msk[:20,:] = True
+        res = ai.integrate1d(img,100,unit='q_A^-1',polarization_factor=0.9,
+            mask=msk,method=('no','histogram','cython'))
+        l = lut.pyfai_lut(ai,self.shape,100,'q_A^-1',0.9,msk,dir_path=self.dirpath)
+        self.assertTrue(np.allclose(l.centers,res.radial))
+        self.assertTrue(np.allclose(l.integrate(img),res.intensity,rtol=1.e-5))
+        # stacks are integrated in one pass
+        I2 = l.integrate(np.array([img,2*img]))
+        self.assertTrue(np.allclose(I2[1],2*l.integrate(img)))
+        # a new process loads the saved LUT, memory-mapped
+        lut._luts.clear()
+        l2 = lut.pyfai_lut(ai,self.shape,100,'q_A^-1',0.9,msk,dir_path=self.dirpath)
+        self.assertIsInstance(l2.indices,np.memmap)
+        self.assertTrue(np.array_equal(l2.integrate(img),l.integrate(img)))
+
+    def test_binning_engine(self):
+        from paws.core.tools.integration.registry import build_integrator
+        from paws.core.tools.integration.binning import BinningEngine
+        pd = dict(self.poni,rot1=0.05,rot2=-0.03,rot3=0.1)
+        ai = build_integrator(pd)
+        img = np.random.rand(*self.shape)*100.
+        msk = np.zeros(self.shape,dtype=bool)
+        msk[:20,:] = True
+        eng = BinningEngine(pd,self.shape,100,unit='q_A^-1',polz_factor=0.9,mask=msk,persist=False)
+        res = ai.integrate1d(img,100,unit='q_A^-1',polarization_factor=0.9,
+            mask=msk,method=('no','histogram','cython'))
+        q,I = eng.integrate1d(img)
+        self.assertTrue(np.allclose(q,res.radial))
+        self.assertTrue(np.allclose(I,res.intensity,rtol=1.e-5))
+        eng = BinningEngine(pd,self.shape,50,36,unit='2th_deg',mask=msk,persist=False)
+        res = ai.integrate2d(img,50,36,unit='2th_deg',mask=msk,method=('no','histogram','cython'))
+        I,tth,chi = eng.integrate2d(np.array([img,img]))
+        self.assertEqual(I.shape,(2,36,50))
+        self.assertTrue(np.allclose(chi,res.azimuthal,atol=1.e-4))
+        self.assertTrue(np.allclose(I[1],res.intensity,rtol=1.e-5))
+
+    def test_integrate_stack(self):
+        import os
+        import fabio
+        from paws.core.tools.integration.binning import BinningEngine
+        from paws.core.tools.integration.stack import integrate_stack
+        eng = BinningEngine(self.poni,self.shape,80,persist=False)
+        st = np.random.rand(10,self.shape[0],self.shape[1]).astype(np.float32)
+        I = integrate_stack(eng.lut,st,n_threads=3,chunk_size=3)
+        self.assertEqual(I.shape,(10,80))
+        self.assertTrue(np.allclose(I[7],eng.integrate(st[7])))
+        fl = []
+        for i in range(4):
+            fl.append(os.path.join(self.dirpath,'img{}.tif'.format(i)))
+            fabio.tifimage.TifImage(data=st[i]).write(fl[-1])
+        self.assertTrue(np.allclose(integrate_stack(eng.lut,fl,n_threads=2,chunk_size=1),I[:4]))
+
+    def test_stack_ops(self):
+        import os
+        import fabio
+        from paws.core.tools.integration.registry import build_integrator
+        from paws.core.operations.PROCESSING.INTEGRATION.ApplyIntegratorStack1d \
+            import ApplyIntegratorStack1d
+        from paws.core.operations.PROCESSING.INTEGRATION.ApplyIntegratorStack2d \
+            import ApplyIntegratorStack2d
+        ai = build_integrator(self.poni)
+        st = (np.random.rand(5,self.shape[0],self.shape[1])*100.).astype(np.float32)
+        msk = np.zeros(self.shape,dtype=bool)
+        msk[:20,:] = True
+        fl = []
+        for i in range(3):
+            fl.append(os.path.join(self.dirpath,'img{}.tif'.format(i)))
+            fabio.tifimage.TifImage(data=st[i]).write(fl[-1])
+        op2 = ApplyIntegratorStack2d()
+        op2.inputs['image_stack'] = st
+        op2.inputs['integrator'] = ai
+        op2.inputs['npt_rad'] = 60
+        # 37 chi bins: no bin edge falls on a pixel center, where binning would tie
+        op2.inputs['npt_azim'] = 37
+        op2.inputs['mask'] = msk
+        op2.inputs['n_threads'] = 2
+        op2.run()
+        res = ai.integrate2d(st[3],60,37,unit='q_A^-1',polarization_factor=1.,
+            mask=msk,method=('no','histogram','cython'))
+        I = op2.outputs['I_at_q_chi']
+        self.assertEqual(I.shape,(5,37,60))
+        self.assertEqual(op2.outputs['chi'].shape,(37,))
+        self.assertTrue(np.allclose(op2.outputs['q'],res.radial))
+        self.assertTrue(np.allclose(op2.outputs['chi'],res.azimuthal,atol=1.e-4))
+        self.assertTrue(np.allclose(I[3],res.intensity,rtol=1.e-5))
+        # a list of files gives the same intensities
+        op2.inputs['image_stack'] = None
+        op2.inputs['file_list'] = fl
+        op2.run()
+        self.assertTrue(np.allclose(op2.outputs['I_at_q_chi'],I[:3]))
+        op1 = ApplyIntegratorStack1d()
+        op1.inputs['file_list'] = fl
+        op1.inputs['integrator'] = ai
+        op1.inputs['npt'] = 60
+        op1.inputs['mask'] = msk
+        op1.run()
+        res = ai.integrate1d(st[2],60,unit='q_A^-1',polarization_factor=1.,
+            mask=msk,method=('no','histogram','cython'))
+        self.assertEqual(op1.outputs['I'].shape,(3,60))
+        self.assertTrue(np.allclose(op1.outputs['q'],res.radial))
+        self.assertTrue(np.allclose(op1.outputs['I'][2],res.intensity,rtol=1.e-5))
+
+    def test_stack_workflow(self):
+        import os
+        import fabio
+        import paws.api
+        paw = paws.api.start()
+        for op_uri in ['PROCESSING.INTEGRATION.BuildPyFAIIntegrator',
+            'PROCESSING.INTEGRATION.ApplyIntegratorStack1d',
+            'PROCESSING.INTEGRATION.ApplyIntegratorStack2d']:
+            paw.activate_op(op_uri)
+        paw.add_wf('stack')
+        paw.add_op('build','PROCESSING.INTEGRATION.BuildPyFAIIntegrator')
+        paw.add_op('stack1d','PROCESSING.INTEGRATION.ApplyIntegratorStack1d')
+        paw.add_op('stack2d','PROCESSING.INTEGRATION.ApplyIntegratorStack2d')
+        paw.set_input('build','poni_dict',self.poni,'basic')
+        st = np.random.rand(3,self.shape[0],self.shape[1]).astype(np.float32)
+        fl = []
+        for i in range(3):
+            fl.append(os.path.join(self.dirpath,'img{}.tif'.format(i)))
+            fabio.tifimage.TifImage(data=st[i]).write(fl[-1])
+        # one op reads the stack, the other the files; masks are left unset
+        paw.set_input('stack1d','image_stack',st)
+        paw.set_input('stack1d','integrator','build.outputs.integrator')
+        paw.set_input('stack1d','npt',40)
+        paw.set_input('stack2d','file_list',fl)
+        paw.set_input('stack2d','integrator','build.outputs.integrator')
+        paw.set_input('stack2d','npt_rad',40)
+        paw.set_input('stack2d','npt_azim',12)
+        paw2 = self.run_saved_wf(paw,'stack')
+        self.assertEqual(paw2.get_output('stack1d','I','stack').shape,(3,40))
+        I2 = paw2.get_output('stack2d','I_at_q_chi','stack')
+        self.assertEqual(I2.shape,(3,12,40))
+        self.assertEqual(paw2.get_output('stack2d','chi','stack').shape,(12,))
+
+    def test_remesh(self):
+        from pyFAI import geometry
+        from paws.core.tools.integration import remesh
+        geo = geometry.Geometry(0.28,0.005,0.04,0,0,0)
+        geo.set_wavelength(1.24E-10)
+        geo.set_pixel1(1.72E-04)
+        geo.set_pixel2(1.72E-04)
+        img = np.random.rand(*self.shape)*100.
+        alpha_i = np.deg2rad(0.14)
+        m = remesh.remesh_map(img.shape,geo,alpha_i)
+        self.assertIs(remesh.remesh_map(img.shape,geo,alpha_i),m)
+        # per-pixel reference: the nearest (truncated) pixel of the inverse map
+        rows = m.map_y.astype(int)
+        cols = m.map_x.astype(int)
+        ref = np.array([img[i,j] for i,j in zip(rows.ravel(),cols.ravel())]).reshape(rows.shape)
+        ref[m.mask] = 0.
+        qimg,qpar,qvrt = remesh.remesh(img,geo,alpha_i,n_threads=2)
+        self.assertTrue(np.array_equal(qimg,np.rot90(ref,3)))
+        # threads come from the shared pool, which is reused across calls
+        from paws.core.tools.integration import lut
+        pool = lut.thread_pool(2)
+        qimg2,qpar,qvrt = remesh.remesh(img*2.,geo,alpha_i,n_threads=2)
+        self.assertTrue(np.array_equal(qimg2,2.*qimg))
+        self.assertIs(lut.thread_pool(2),pool)
+        self.assertEqual(qpar.shape,qimg.shape)
+        qimg1,qpar,qvrt = remesh.remesh(img,geo,alpha_i,order=1)
+        self.assertTrue(np.all(qimg1[np.rot90(m.mask,3)] == 0.))
+
+
+    def test_remesh_workflow(self):
+        import paws.api
+        paw = paws.api.start()
+        for op_uri in ['PROCESSING.INTEGRATION.BuildPyFAIIntegrator',
+            'PROCESSING.INTEGRATION.Remesh',
+            'PROCESSING.INTEGRATION.RemeshXIntegration',
+            'PROCESSING.INTEGRATION.RemeshZIntegration']:
+            paw.activate_op(op_uri)
+        paw.add_wf('gixs')
+        paw.add_op('build','PROCESSING.INTEGRATION.BuildPyFAIIntegrator')
+        paw.add_op('remesh','PROCESSING.INTEGRATION.Remesh')
+        paw.add_op('xcut','PROCESSING.INTEGRATION.RemeshXIntegration')
+        paw.add_op('zcut','PROCESSING.INTEGRATION.RemeshZIntegration')
+        paw.set_input('build','poni_dict',self.poni,'basic')
+        paw.set_input('remesh','image_data',np.random.rand(*self.shape),'basic')
+        paw.set_input('remesh','geom','build.outputs.integrator')
+        paw.set_input('remesh','alpha_i',np.deg2rad(0.14))
+        paw.set_input('remesh','n_threads',2)
+        # the optional masks, and the q axis each cut does not use, are left unset
+        paw.set_input('xcut','image_data','remesh.outputs.I')
+        paw.set_input('xcut','q_par','remesh.outputs.q_par')
+        paw.set_input('zcut','image_data','remesh.outputs.I')
+        paw.set_input('zcut','q_norm','remesh.outputs.q_norm')
+        paw2 = self.run_saved_wf(paw,'gixs')
+        I = paw2.get_output('remesh','I','gixs')
+        self.assertIsNotNone(I)
+        self.assertEqual(paw2.get_output('xcut','I','gixs').shape,(I.shape[0],))
+        self.assertEqual(paw2.get_output('zcut','I','gixs').shape,(I.shape[1],))
+
+    def test_line_cuts(self):
+        from pyFAI import geometry
+        from paws.core.tools.integration import integration, remesh
+        img = np.random.rand(3,*self.shape)*100.
+        mask = np.random.rand(*self.shape) > 0.2
+        cut = np.zeros(self.shape,dtype=bool)
+        cut[50:80,:] = True
+        cut[:,100:200] = True
+        # reference: masked-array averages
+        valid = mask & cut
+        ref_x = np.ma.masked_array(img[0],mask=~valid).mean(axis=0).filled(0.)
+        ref_z = np.ma.masked_array(img[0],mask=~valid).mean(axis=1).filled(0.)
+        qx,I_x = integration.xintegrate(img[0],mask,self.poni,cut)
+        qz,I_z = integration.zintegrate(img,mask,self.poni,cut)
+        self.assertEqual(qx.shape,(self.shape[1],))
+        self.assertEqual(qz.shape,(self.shape[0],))
+        self.assertTrue(np.allclose(I_x,ref_x))
+        self.assertTrue(np.allclose(I_z[0],ref_z))
+        self.assertEqual(I_z.shape,(3,self.shape[0]))
+        self.assertIs(integration.line_axes(self.poni,self.shape)[0],qx)
+        self.assertTrue(qx[0] < 0. and qx[-1] > 0.)
+        # remeshed images: q_par along the rows, q_norm along the columns
+        geo = geometry.Geometry(0.28,0.005,0.04,0,0,0)
+        geo.set_wavelength(1.24E-10)
+        geo.set_pixel1(1.72E-04)
+        geo.set_pixel2(1.72E-04)
+        qimg,qpar,qvrt = remesh.remesh(img[0],geo,np.deg2rad(0.14))
+        qx,I_x = integration.remeshxintegrate(qimg,None,None,qvrt,qpar)
+        self.assertTrue(np.allclose(qx,qpar[:,0]/10.))
+        self.assertTrue(np.allclose(I_x,qimg.mean(axis=1)))
+        qz,I_z = integration.remeshzintegrate(qimg,None,None,qvrt,qpar)
+        self.assertTrue(np.allclose(qz,qvrt[0,:]/10.))
+        self.assertTrue(np.allclose(I_z,qimg.mean(axis=0)))
+        qp_ax,qn_ax = remesh.remesh_axes(img[0].shape,geo,np.deg2rad(0.14))
+        self.assertTrue(np.allclose(qp_ax,qpar[:,0]))
+        self.assertTrue(np.allclose(qn_ax,qvrt[0,:]))
+
+    def test_default_policy(self):
+        from pyFAI import geometry
+        from paws.core.tools.image import precision
+        from paws.core.operations.PROCESSING.BASIC.Rotation import Rotation
+        from paws.core.operations.PROCESSING.INTEGRATION.Remesh import Remesh
+        img = (np.random.rand(*self.shape)*100.).astype(np.float32)
+        self.assertIs(precision.cast_float(img),img)
+        self.assertEqual(precision.as_float([1,2]).dtype,np.array([1,2]).dtype)
+        # without a policy, rotations are views and float32 images stay float32
+        op = Rotation()
+        op.inputs['image_data'] = img
+        op.run()
+        self.assertIsNone(op.dtype_policy)
+        self.assertIs(op.outputs['image_data'].base,img)
+        op.dtype_policy = 'float64'
+        op.run()
+        self.assertEqual(op.outputs['image_data'].dtype,np.float64)
+        geo = geometry.Geometry(0.28,0.005,0.04,0,0,0)
+        geo.set_wavelength(1.24E-10)
+        geo.set_pixel1(1.72E-04)
+        geo.set_pixel2(1.72E-04)
+        op = Remesh()
+        op.inputs['image_data'] = img
+        op.inputs['geom'] = geo
+        op.inputs['alpha_i'] = np.deg2rad(0.14)
+        op.run()
+        I32 = op.outputs['I']
+        self.assertEqual(I32.dtype,np.float32)
+        op.dtype_policy = 'float64'
+        op.run()
+        self.assertEqual(op.outputs['I'].dtype,np.float64)
+        self.assertTrue(np.array_equal(op.outputs['I'],I32))
+
+    def test_mask_cache(self):
+        from paws.core.tools.integration import masks, keys
+        det = np.random.rand(*self.shape) > 0.9
+        beamstop = np.zeros(self.shape,dtype=np.int8)
+        beamstop[90:110,110:130] = 1
+        roi = masks.arc_roi(self.shape,(120,100),20,80,-45,45)
+        # reference: the arc computed directly
+        y,x = np.indices(self.shape)
+        r = np.sqrt((x-120.)**2+(y-100.)**2)
+        th = np.degrees(np.arctan2(y-100.,x-120.))
+        ref_roi = (r > 20) & (r < 80) & (th > -45) & (th < 45)
+        self.assertTrue(np.array_equal(roi,ref_roi))
+        valid = masks.combined_mask(self.shape,valid=roi,masked=[det,beamstop])
+        self.assertTrue(np.array_equal(valid,ref_roi & ~det & ~beamstop.astype(bool)))
+        self.assertFalse(valid.flags.writeable)
+        self.assertIs(masks.combined_mask(self.shape,valid=roi.copy(),masked=[det,beamstop]),valid)
+        self.assertEqual(keys.mask_digest(valid),keys.mask_digest(valid.copy()))
+        pyfai_mask = masks.combined_mask(self.shape,valid=roi,masked=[det,beamstop],invert=True)
+        self.assertTrue(np.array_equal(pyfai_mask,~valid))
+        pm = masks.PackedMask(valid)
+        self.assertTrue(np.array_equal(pm.unpack(),valid))
+        self.assertEqual(pm.nbytes,int(np.ceil(valid.size/8.)))
+        with self.assertRaises(ValueError):
+            masks.combined_mask((10,10),valid=roi)
+
+    def test_mask_keys(self):
+        import gc
+        from paws.core.tools.integration import masks
+        mgr = masks._manager
+        det = np.random.rand(*self.shape) > 0.9
+        # pixel (0,0) is left unmasked, to be masked by an in-place edit below
+        det[0,0] = False
+        det.flags.writeable = False
+        beamstop = np.zeros(self.shape,dtype=np.int8)
+        beamstop[90:110,110:130] = 1
+        beamstop.flags.writeable = False
+        n_hits,n_misses = mgr.n_hits,mgr.n_misses
+        m = masks.combined_mask(self.shape,masked=[det,beamstop],invert=True)
+        self.assertEqual(mgr.n_misses,n_misses+1)
+        n_hash = [0]
+        hash_array = masks._hash_array
+        def counted(a):
+            n_hash[0] += 1
+            return hash_array(a)
+        masks._hash_array = counted
+        try:
+            # read-only arrays are recognized without hashing their content again
+            for i in range(5):
+                self.assertIs(masks.combined_mask(self.shape,masked=[det,beamstop],invert=True),m)
+            self.assertEqual(n_hash[0],0)
+            self.assertEqual((mgr.n_hits,mgr.n_misses),(n_hits+5,n_misses+1))
+            # a read-only copy is hashed once, and hits the cache
+            bs2 = beamstop.copy()
+            bs2.flags.writeable = False
+            for i in range(2):
+                self.assertIs(masks.combined_mask(self.shape,masked=[det,bs2],invert=True),m)
+            self.assertEqual(n_hash[0],1)
+            # writeable arrays are hashed on every call,
+            # so masks edited in place give a new combined mask
+            bs_w = np.array(beamstop)
+            self.assertIs(masks.combined_mask(self.shape,masked=[det,bs_w],invert=True),m)
+            bs_w[0,0] = 1
+            m_w = masks.combined_mask(self.shape,masked=[det,bs_w],invert=True)
+            self.assertTrue(m_w[0,0])
+            self.assertFalse(m[0,0])
+            self.assertEqual(n_hash[0],3)
+            self.assertEqual(mgr.n_misses,n_misses+2)
+            # a read-only view of a writeable array is hashed too
+            v = bs_w.view()
+            v.flags.writeable = False
+            masks.content_key(v)
+            masks.content_key(v)
+            self.assertEqual(n_hash[0],5)
+        finally:
+            masks._hash_array = hash_array
+        n_seen = len(masks._seen)
+        del bs2
+        gc.collect()
+        self.assertEqual(len(masks._seen),n_seen-1)
+
+    def test_tiled_binning(self):
+        from paws.core.tools.integration import binning
+        mask = np.zeros(self.shape,dtype=bool)
+        # fully masked rows leave some tiles empty
+        mask[:30,:] = True
+        eng = binning.BinningEngine(self.poni,self.shape,100,npt_azim=36,
+            mask=mask,persist=False)
+        img = np.random.rand(2,*self.shape)
+        ref = eng.integrate(img)
+        for n_threads,tile_rows in [(1,16),(3,None),(4,7)]:
+            I = eng.integrate(img,n_threads,tile_rows)
+            self.assertTrue(np.allclose(I,ref))
+        self.assertTrue(np.allclose(eng.integrate(img[0],2),ref[0]))
+
+    def test_float32_policy(self):
+        from paws.core.tools.integration import binning, integration
+        eng = binning.BinningEngine(self.poni,self.shape,100,persist=False)
+        img = (np.random.rand(*self.shape)*1.e4).astype(np.float32)
+        ref = eng.integrate(img.astype(np.float64))
+        I = eng.integrate(img,dtype=np.float32)
+        self.assertEqual(I.dtype,np.float32)
+        # bins are summed in float64: only the final cast rounds
+        self.assertTrue(np.allclose(I,ref.astype(np.float32),rtol=1.e-6))
+        qx,I_x = integration.xintegrate(img,None,self.poni,dtype=np.float32)
+        self.assertEqual(I_x.dtype,np.float32)
+        self.assertTrue(np.allclose(I_x,img.astype(np.float64).mean(axis=0),rtol=1.e-6))
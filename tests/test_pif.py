@@ -0,0 +1,99 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+class TestPIF(unittest.TestCase):
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_bulk_pifs(self):
+        import numpy as np
+        import pypif.obj as pifobj
+        from pypif import pif
+        from paws.core.tools.pif import bulk
+        q = np.linspace(0.01,0.3,20)
+        I = np.random.rand(3,20)
+        pifs = bulk.scattering_pifs(['a','b','c'],q,I,tags=['t'])
+        # same records as with one pypif.obj.Scalar per point
+        p = pifobj.Property()
+        p.name = 'SAXS intensity'
+        p.scalars = [pifobj.Scalar(v) for v in I[1].tolist()]
+        p.units = 'arb'
+        p.conditions = [pifobj.Value('scattering vector',
+            [pifobj.Scalar(v) for v in q.tolist()],None,None,None,'1/Angstrom')]
+        self.assertEqual(pif.dumps(pifs[1].properties[0]),pif.dumps(p))
+        self.assertEqual(pifs[1].properties[0].scalars[3].value,I[1,3])
+        for cmp in [False,True]:
+            fp = os.path.join(self.dirpath,'p.jsonl'+('.gz' if cmp else ''))
+            with bulk.PifJSONLWriter(fp,cmp) as w:
+                w.write(pifs[:2])
+            with bulk.PifJSONLWriter(fp,cmp,append=True) as w:
+                w.write(pifs[2])
+            recs = bulk.read_jsonl(fp)
+            self.assertEqual([r.uid for r in recs],['a','b','c'])
+            self.assertEqual(len(recs[2].properties[0].scalars),20)
+
+    def test_set_scalars_fallback(self):
+        import numpy as np
+        from pypif import pif
+        from paws.core.tools.pif import bulk
+        q_I = np.array([np.linspace(0.01,0.3,10),np.random.rand(10)]).T
+        p_fast = bulk.q_I_property(q_I,'I')
+        ok = bulk.pypif_scalars_ok
+        try:
+            # the public pypif setter gives the same records
+            bulk.pypif_scalars_ok = False
+            p_public = bulk.q_I_property(q_I,'I')
+        finally:
+            bulk.pypif_scalars_ok = ok
+        self.assertIsInstance(p_public.scalars,list)
+        self.assertEqual(pif.dumps(p_fast),pif.dumps(p_public))
+
+    def test_pif_ops(self):
+        import numpy as np
+        from collections import OrderedDict
+        from paws.core.tools.pif import bulk
+        from paws.core.tools.batch.store import BatchStore
+        from paws.core.operations.PACKAGING.PIF.PifBatchScatteringIntensity \
+            import PifBatchScatteringIntensity
+        from paws.core.operations.IO.PIF.SavePIFAsJSONL import SavePIFAsJSONL
+        q = np.linspace(0.01,0.3,15)
+        I = np.random.RandomState(0).rand(4,15)
+        b_store = BatchStore(4,spill_dir=self.dirpath)
+        for i in range(4):
+            if i != 2:
+                b_store[i] = OrderedDict(q_I=np.array([q,I[i]]).T)
+        # a list of dicts with spectra on different q grids
+        b_list = [{'q_I':np.array([q*(1+i),I[i]]).T} for i in range(3)]
+        for b_out,uids,q_last in [(b_store,['s0','s1','s3'],q),(b_list,['s0','s1','s2'],q*3)]:
+            op = PifBatchScatteringIntensity()
+            op.inputs['batch_outputs'] = b_out
+            op.inputs['q_I_key'] = 'q_I'
+            op.inputs['uid_prefix'] = 's'
+            op.run()
+            pifs = op.outputs['pifs']
+            self.assertEqual([p.uid for p in pifs],uids)
+            for compress in [False,True]:
+                op = SavePIFAsJSONL()
+                op.inputs['pif'] = pifs[:1]
+                op.inputs['file_path'] = os.path.join(self.dirpath,'batch.jsonl')
+                op.inputs['compress'] = compress
+                op.inputs['append'] = False
+                op.run()
+                op.inputs['pif'] = pifs[1:]
+                op.inputs['append'] = True
+                op.run()
+                self.assertEqual(op.outputs['n_records'],2)
+                self.assertEqual(op.outputs['file_path'].endswith('.gz'),compress)
+                recs = bulk.read_jsonl(op.outputs['file_path'])
+                self.assertEqual([r.uid for r in recs],uids)
+                prop = recs[-1].properties[0]
+                self.assertEqual([s.value for s in prop.scalars],I[int(uids[-1][1:])].tolist())
+                self.assertEqual([s.value for s in prop.conditions[0].scalars],q_last.tolist())
+                self.assertEqual(prop.units,'counts')
+        b_store.close()
@@ -0,0 +1,170 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+class TestRealtime(unittest.TestCase):
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def touch(self,filename):
+        with open(os.path.join(self.dirpath,filename),'w') as f:
+            f.write('0')
+
+    def check_watcher(self,use_inotify):
+        from paws.core.tools.realtime.watcher import FileWatcher
+        self.touch('old.tif')
+        w = FileWatcher(self.dirpath,'*.tif',False,use_inotify)
+        self.assertIsNone(w.next_path())
+        for fnm in ['a.tif','b.txt','c.tif']:
+            self.touch(fnm)
+        paths = [w.next_path(1.),w.next_path(1.)]
+        self.assertEqual(sorted(os.path.basename(p) for p in paths),['a.tif','c.tif'])
+        self.assertIsNone(w.next_path(0.05))
+        w.close()
+
+    def test_watcher_inotify(self):
+        from paws.core.tools.realtime.watcher import inotify_available
+        if not inotify_available():
+            self.skipTest('inotify is not available on this platform')
+        self.check_watcher(True)
+
+    def test_watcher_scan(self):
+        self.check_watcher(False)
+
+    def test_file_system_iterator(self):
+        from paws.core.operations.optools import FileSystemIterator
+        self.touch('old.tif')
+        it = FileSystemIterator(self.dirpath,'*.tif',True)
+        self.assertEqual(os.path.basename(it.next()),'old.tif')
+        self.assertIsNone(it.next())
+        self.assertEqual(len(it.paths_done),1)
+
+    def test_write_completion(self):
+        import time
+        from paws.core.tools.realtime.ingest import WriteCompletionFilter
+        p = os.path.join(self.dirpath,'a.tif')
+        self.touch('a.tif')
+        f = WriteCompletionFilter(0.05)
+        f.add(p)
+        self.assertEqual(f.pop_ready(),[])
+        time.sleep(0.06)
+        self.assertEqual(f.pop_ready(),[p])
+        f = WriteCompletionFilter(10.,'.txt')
+        f.add(p)
+        self.assertEqual(f.pop_ready(),[])
+        self.touch('a.txt')
+        self.assertEqual(f.pop_ready(),[p])
+
+    def test_write_filter_drops(self):
+        import time
+        from paws.core.tools.realtime.ingest import WriteCompletionFilter
+        p_del = os.path.join(self.dirpath,'deleted.tif')
+        p_empty = os.path.join(self.dirpath,'empty.tif')
+        self.touch('deleted.tif')
+        open(p_empty,'w').close()
+        f = WriteCompletionFilter(10.,max_pending_time=10.)
+        f.add(p_del)
+        self.assertEqual(f.pop_ready(),[])
+        # deleted files are dropped at once
+        os.remove(p_del)
+        self.assertEqual(f.pop_ready(),[])
+        self.assertEqual([p for p,reason in f.pop_dropped()],[p_del])
+        self.assertEqual(f.n_pending(),0)
+        # files that stay empty are dropped after max_pending_time
+        f = WriteCompletionFilter(0.,max_pending_time=0.1)
+        f.add(p_empty)
+        self.assertEqual(f.pop_ready(),[])
+        time.sleep(0.15)
+        self.assertEqual(f.pop_ready(),[])
+        self.assertEqual([p for p,reason in f.pop_dropped()],[p_empty])
+        self.assertEqual(f.n_pending(),0)
+        self.assertEqual(f.pop_dropped(),[])
+        # as are files whose header never appears
+        p = os.path.join(self.dirpath,'a.tif')
+        self.touch('a.tif')
+        f = WriteCompletionFilter(0.,'.txt',max_pending_time=0.1)
+        f.add(p)
+        self.assertEqual(f.pop_ready(),[])
+        time.sleep(0.15)
+        self.assertEqual(f.pop_ready(),[])
+        self.assertEqual([p for p,reason in f.pop_dropped()],[p])
+
+    def test_ingest_order(self):
+        import paws.api
+        paw = paws.api.start()
+        paw.activate_op('TESTS.Identity')
+        paw.add_wf('ingest_test')
+        paw.add_op('ident','TESTS.Identity','ingest_test')
+        paw.add_wf_input('path','ident.inputs.data','ingest_test')
+        paw.add_wf_output('path_out','ident.outputs.data','ingest_test')
+        wf = paw.get_wf('ingest_test')
+        wf.message_callback = lambda msg: None
+        from paws.core.tools.realtime.ingest import RealtimeIngest
+        ingest = RealtimeIngest(wf,'path',4)
+        paths = ['p{}'.format(i) for i in range(20)]
+        for p in paths:
+            ingest.submit(p)
+        results = []
+        while ingest.n_in_flight() > 0:
+            results.extend(ingest.collect(1.))
+        ingest.close()
+        self.assertEqual([out['path_out'] for inp,out in results],paths)
+
+    def test_ring_buffer(self):
+        from paws.core.tools.realtime.buffer import ResultRingBuffer
+        spill_path = os.path.join(self.dirpath,'spill.pkl')
+        rb = ResultRingBuffer(3,spill_path,['x'])
+        for i in range(10):
+            rb.append({'x':float(i),'y':[i]})
+        self.assertEqual(len(rb),10)
+        self.assertEqual(rb.n_in_memory(),3)
+        self.assertEqual([r['y'][0] for r in rb],list(range(10)))
+        self.assertEqual(rb[-1]['x'],9.)
+        st = rb.stats_dict()['x']
+        self.assertEqual(st['count'],10)
+        self.assertAlmostEqual(st['mean'],4.5)
+        self.assertEqual((st['min'],st['max']),(0.,9.))
+        self.assertEqual(os.path.getsize(spill_path+'.idx'),8*7)
+        # a spill file that was provided is kept when the buffer is closed
+        rb.close()
+        self.assertTrue(os.path.exists(spill_path))
+        self.assertRaises(IndexError,rb.__getitem__,0)
+        self.assertEqual(rb[-1]['x'],9.)
+        tmp_path = os.path.join(self.dirpath,'tmp_spill.pkl')
+        rb = ResultRingBuffer(2,tmp_path,delete_spill=True)
+        for i in range(5):
+            rb.append({'x':float(i)})
+        self.assertEqual(rb[1]['x'],1.)
+        del rb
+        self.assertFalse(os.path.exists(tmp_path))
+        self.assertFalse(os.path.exists(tmp_path+'.idx'))
+
+    def test_latency_metrics(self):
+        import json
+        from collections import OrderedDict
+        from paws.core.tools.realtime.metrics import LatencyMetrics
+        m = LatencyMetrics()
+        for i in range(100):
+            ts = OrderedDict([('detected',0.),('ready',0.1),('started',0.2),
+                ('op:read',0.3),('finished',0.4),('committed',0.5+i*0.01)])
+            m.record_timestamps(ts)
+        m.set_gauge('in_flight',3)
+        md = m.metrics_dict()
+        self.assertEqual(md['latency']['total']['count'],100)
+        self.assertAlmostEqual(md['latency']['total']['p50'],1.,places=6)
+        self.assertAlmostEqual(md['latency']['total']['p99'],1.48,places=6)
+        self.assertAlmostEqual(md['latency']['op:read']['max'],0.1,places=6)
+        self.assertEqual(md['queue_depth']['in_flight'],3)
+        json_path = os.path.join(self.dirpath,'metrics.json')
+        m.dump(json_path)
+        with open(json_path) as f:
+            self.assertIn('latency',json.load(f))
+
+if __name__ == '__main__':
+    unittest.main()
+
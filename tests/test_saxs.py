@@ -0,0 +1,105 @@
+import unittest
+import shutil
+import tempfile
+
+import numpy as np
+
+def _direct_normal_saxs(q,r0,sigma,n=4001):
+    # dense sum over the size distribution, for reference
+    sigma_r = sigma*r0
+    r = np.linspace(max(r0-6*sigma_r,1.E-6),r0+6*sigma_r,n)
+    rho = np.exp(-(r-r0)**2/(2*sigma_r**2))*r**6
+    x = np.outer(r,q)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        f = 3.*(np.sin(x)-x*np.cos(x))/x**3
+    f[x == 0] = 1.
+    return np.dot(rho,f**2)/np.sum(rho)
+
+class TestSAXS(unittest.TestCase):
+
+    def setUp(self):
+        self.q = np.linspace(0.,0.6,301)
+        self.flags = dict(bad_data=False,diffraction_peaks=False,
+            precursor_scattering=True,form_factor_scattering=True)
+        self.params = dict(I0_floor=0.1,G_precursor=2.,rg_precursor=4.,
+            I0_sphere=100.,r0_sphere=40.,sigma_sphere=0.08)
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_spherical_normal_saxs(self):
+        from paws.core.tools.saxs.saxs_fit import spherical_normal_saxs
+        for r0 in [5.,40.,150.]:
+            for sigma in [0.02,0.1,0.3]:
+                I = spherical_normal_saxs(self.q,r0,sigma)
+                I_ref = _direct_normal_saxs(self.q,r0,sigma)
+                self.assertEqual(I[0],1.)
+                self.assertLess(np.max(np.abs(I-I_ref)/I_ref),1.E-4)
+        # monodisperse limit
+        x = self.q*20.
+        I = spherical_normal_saxs(self.q,20.,0.)
+        I_mono = (3.*(np.sin(x[1:])-x[1:]*np.cos(x[1:]))/x[1:]**3)**2
+        self.assertTrue(np.allclose(I[1:],I_mono,rtol=1.E-8,atol=1.E-14))
+
+    def test_sphere_table(self):
+        from paws.core.tools.saxs import saxs_fit, saxs_table
+        build = lambda: saxs_table.build_table(saxs_fit._unit_normal_saxs,
+            20.,0.01,0.05,0.2,0.005)
+        key = saxs_table.table_key('test',self.dirpath)
+        tbl = saxs_table.cached_table(key,build,self.dirpath)
+        saxs_table.clear_tables()
+        tbl_loaded = saxs_table.cached_table(key,None,self.dirpath)
+        self.assertIsNot(tbl_loaded,tbl)
+        self.assertTrue(np.array_equal(tbl_loaded.logI,tbl.logI))
+        for sigma in [0.05,0.093,0.2]:
+            I_tbl = tbl_loaded.interpolate(self.q*30.,sigma)
+            I = saxs_fit.spherical_normal_saxs(self.q,30.,sigma)
+            self.assertLess(np.max(np.abs(I_tbl-I)/I),5.E-3)
+        # the tabulated fast path of compute_saxs, and points beyond the table
+        q = np.linspace(0.,4.,401)
+        I_fast = saxs_fit.compute_saxs(q,self.flags,self.params)
+        I_exact = saxs_fit.compute_saxs(q,self.flags,self.params,exact=True)
+        self.assertLess(np.max(np.abs(I_fast-I_exact)/I_exact),5.E-3)
+        self.assertTrue(np.array_equal(I_fast[q*40. > saxs_fit.sphere_table_u_max],
+            I_exact[q*40. > saxs_fit.sphere_table_u_max]))
+
+    def test_sphere_table_off_grid(self):
+        from paws.core.tools.saxs import saxs_fit
+        q = np.linspace(0.,0.8,2001)
+        for r0 in [10.,50.,80.]:
+            idx = q*r0 <= saxs_fit.sphere_table_u_max
+            # sigma values between the rows of the table
+            for sigma in [0.0213,0.0337,0.0512,0.1234,0.3333,0.4999]:
+                I_tbl = saxs_fit.tabulated_normal_saxs(q[idx],r0,sigma)
+                I = saxs_fit.spherical_normal_saxs(q[idx],r0,sigma)
+                self.assertLess(np.max(np.abs(I_tbl-I)/I),2.E-3)
+        I_tbl = saxs_fit.tabulated_normal_saxs(q,50.,0.0337)
+        I = saxs_fit.spherical_normal_saxs(q,50.,0.0337)
+        self.assertLess(np.max(np.abs(I_tbl-I)/I),5.E-4)
+
+    def test_saxs_jacobian(self):
+        from collections import OrderedDict
+        from paws.core.tools.saxs import saxs_fit
+        params = OrderedDict(sorted(self.params.items()))
+        I,dI = saxs_fit.compute_saxs_jacobian(self.q,self.flags,params)
+        self.assertTrue(np.allclose(I,saxs_fit.compute_saxs(self.q,self.flags,params,exact=True)))
+        for i,k in enumerate(params.keys()):
+            h = 1.E-6*params[k]
+            p_hi = OrderedDict(params)
+            p_hi[k] += h
+            p_lo = OrderedDict(params)
+            p_lo[k] -= h
+            dI_fd = (saxs_fit.compute_saxs(self.q,self.flags,p_hi,exact=True)
+                -saxs_fit.compute_saxs(self.q,self.flags,p_lo,exact=True))/(2*h)
+            self.assertLess(np.max(np.abs(dI[:,i]-dI_fd)),1.E-5*np.max(np.abs(dI_fd)))
+        # fit noisy data, holding the floor fixed
+        q = np.linspace(0.01,0.5,300)
+        q_I = np.array([q,saxs_fit.compute_saxs(q,self.flags,self.params,exact=True)
+            *(1.+0.05*np.random.RandomState(0).randn(len(q)))]).T
+        guess = OrderedDict(params)
+        guess.update(I0_sphere=70.,r0_sphere=46.,sigma_sphere=0.12,rg_precursor=6.)
+        p_opt,rpt = saxs_fit.fit_spectrum(q_I,self.flags,guess,['I0_floor'])
+        self.assertLess(rpt['objective_after'],rpt['objective_before'])
+        self.assertAlmostEqual(p_opt['I0_floor'],self.params['I0_floor'])
+        self.assertLess(abs(p_opt['r0_sphere']-40.),1.)
@@ -0,0 +1,93 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+class TestTextIO(unittest.TestCase):
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def write_csv(self,filename,txt):
+        p = os.path.join(self.dirpath,filename)
+        with open(p,'w') as f:
+            f.write(txt)
+        return p
+
+    def read_with(self,use_loadtxt,p,**kwargs):
+        from paws.core.tools.textio import csvread
+        fast = csvread.loadtxt_is_fast
+        try:
+            csvread.loadtxt_is_fast = use_loadtxt
+            return csvread.read_csv(p,**kwargs)
+        finally:
+            csvread.loadtxt_is_fast = fast
+
+    def read_both(self,p,**kwargs):
+        # read with np.loadtxt and with the single-call numpy string parser
+        return self.read_with(True,p,**kwargs),self.read_with(False,p,**kwargs)
+
+    def test_read_csv(self):
+        a = np.random.RandomState(0).rand(50,3)
+        p = os.path.join(self.dirpath,'a.csv')
+        np.savetxt(p,a,delimiter=',',header='q, I, dI')
+        for ndmin in [0,2]:
+            for b in self.read_both(p,ndmin=ndmin):
+                self.assertTrue(np.array_equal(b,np.loadtxt(p,delimiter=',')))
+        # header, comment and blank lines
+        p = self.write_csv('comments.csv','# q, I\n1.0,2.0\n\n# comment\n3.0,4.5\n')
+        for b in self.read_both(p):
+            self.assertTrue(np.array_equal(b,[[1.,2.],[3.,4.5]]))
+        # one row and one column
+        p_row = self.write_csv('row.csv','# x, y\n1.5,2.5\n')
+        p_col = self.write_csv('col.csv','1.\n2.\n3.\n')
+        for b in self.read_both(p_row):
+            self.assertEqual(b.shape,(1,2))
+        for b in self.read_both(p_col):
+            self.assertEqual(b.shape,(3,1))
+        for b in self.read_both(p_row,ndmin=0):
+            self.assertEqual(b.shape,(2,))
+        # irregular rows fall back on np.loadtxt, which raises
+        p_bad = self.write_csv('bad.csv','1.,2.\n3.\n')
+        for use_loadtxt in [True,False]:
+            self.assertRaises(ValueError,self.read_with,use_loadtxt,p_bad)
+
+    def test_csv_ops(self):
+        from paws.core.operations.IO.CSV.CSVToXYData import CSVToXYData
+        from paws.core.operations.IO.CSV.CSVToArray import CSVToArray
+        from paws.core.operations.IO.CSV.CSVFilesToArray import CSVFilesToArray
+        # a single row of x,y data
+        op = CSVToXYData()
+        op.inputs['file_path'] = self.write_csv('row.csv','0.1,20.\n')
+        op.run()
+        self.assertTrue(np.array_equal(op.outputs['x_y'],[[0.1,20.]]))
+        # CSVToArray keeps the shapes of np.loadtxt
+        op = CSVToArray()
+        op.inputs['file_path'] = self.write_csv('col.csv','1.\n2.\n')
+        op.run()
+        self.assertEqual(op.outputs['array'].shape,(2,))
+        # a stack of files, read in parallel
+        arrs = [np.random.RandomState(i).rand(20,2) for i in range(6)]
+        paths = []
+        for i,a in enumerate(arrs):
+            paths.append(os.path.join(self.dirpath,'spec_{}.csv'.format(i)))
+            np.savetxt(paths[-1],a,delimiter=',')
+        op = CSVFilesToArray()
+        op.inputs['file_list'] = paths
+        op.inputs['n_workers'] = 3
+        op.run()
+        self.assertEqual(op.outputs['array'].shape,(6,20,2))
+        self.assertTrue(np.array_equal(op.outputs['array'],
+            [np.loadtxt(p,delimiter=',') for p in paths]))
+        # files of different shapes can not be stacked
+        from paws.core.tools.textio.csvread import read_csv_files
+        paths.append(self.write_csv('short.csv','1.,2.\n'))
+        self.assertRaises(ValueError,read_csv_files,paths)
+
+if __name__ == '__main__':
+    unittest.main()